@@ -0,0 +1,83 @@
+"""asyncio front-end for the manager layer"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+class AsyncRunner:
+    """Owns an event loop on a background thread so Tk code can schedule remote work"""
+    def __init__(self, max_workers=16):
+        # paramiko blocks, so calls run on a small shared pool instead of a thread per click
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='remote')
+        self.loop = asyncio.new_event_loop()
+        self.loop.set_default_executor(self.executor)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+    
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+    
+    def wrap(self, manager):
+        """Return an async view of a manager, e.g. await runner.wrap(server).get_status()"""
+        return AsyncProxy(manager, self)
+    
+    def submit(self, coro, callback=None, timeout=None):
+        """Schedule a coroutine from any thread, callback(result, error) runs when it finishes"""
+        if timeout is not None:
+            coro = asyncio.wait_for(coro, timeout)
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        
+        if callback:
+            def done(f):
+                if f.cancelled():
+                    callback(None, asyncio.CancelledError())
+                elif f.exception():
+                    callback(None, f.exception())
+                else:
+                    callback(f.result(), None)
+            future.add_done_callback(done)
+        return future
+    
+    def run(self, coro, timeout=None):
+        """Block the calling thread until the coroutine finishes, not for use on the Tk thread"""
+        return self.submit(coro, timeout=timeout).result()
+    
+    async def gather(self, *coros, limit=None, return_exceptions=True):
+        """gather() with an optional cap on how many coroutines run at once"""
+        if limit is None:
+            return await asyncio.gather(*coros, return_exceptions=return_exceptions)
+        
+        semaphore = asyncio.Semaphore(limit)
+        
+        async def bounded(coro):
+            async with semaphore:
+                return await coro
+        
+        return await asyncio.gather(*(bounded(c) for c in coros),
+                                    return_exceptions=return_exceptions)
+    
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.executor.shutdown(wait=False)
+
+class AsyncProxy:
+    """Exposes every method of a blocking manager as a coroutine"""
+    def __init__(self, target, runner):
+        self._target = target
+        self._runner = runner
+    
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return attr
+        
+        @functools.wraps(attr)
+        async def call(*args, **kwargs):
+            # Timeouts and cancellation come from asyncio.wait_for / task.cancel();
+            # the remote call itself still ends at its own SSH timeout
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._runner.executor,
+                                              functools.partial(attr, *args, **kwargs))
+        
+        return call
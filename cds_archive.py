@@ -0,0 +1,82 @@
+"""AppCDS archive for the server jar, rebuilt whenever the jar, mods or java change"""
+import json
+import time
+from paths import STATE_DIR
+
+ARCHIVE = f'{STATE_DIR}/server.jsa'
+STAMP = f'{STATE_DIR}/server.jsa.stamp'
+BOOT_LOG = f'{STATE_DIR}/boot-times.jsonl'
+
+# -XX:ArchiveClassesAtExit (dynamic archives) arrived in JDK 13
+MIN_JAVA = 13
+
+class ClassDataSharing:
+    """Decides per start whether to dump a new dynamic CDS archive, use the current one, or skip it
+    
+    The archive is written by the JVM when the server exits cleanly, so the
+    first start after a change pays nothing extra and the one after that
+    boots from the archive. Only classes from the built-in loaders (the
+    server jar and its libraries) get archived, mods loaded by Fabric/Forge
+    class loaders still load normally.
+    """
+    def __init__(self, ssh_manager, minecraft_dir="/root/minecraft"):
+        self.ssh = ssh_manager
+        self.mc_dir = minecraft_dir
+    
+    def _fingerprint_script(self, profile):
+        # Size and mtime of every jar the archive was built from, plus the JVM and collector
+        return (f"{{ stat -c '%n %s %Y' server.jar mods/*.jar 2>/dev/null; "
+                f"java -version 2>&1 | head -n 1; echo '{profile}'; }} | md5sum | cut -d' ' -f1")
+    
+    def prepare(self, java_major, profile):
+        """Returns (mode, args): mode is 'use', 'dump' or 'off'; args go before -jar"""
+        if not java_major or java_major < MIN_JAVA:
+            return 'off', []
+        
+        output, _ = self.ssh.execute(
+            f"cd {self.mc_dir} && mkdir -p {STATE_DIR} && "
+            f"now=$({self._fingerprint_script(profile)}) && "
+            f"if [ -s {ARCHIVE} ] && [ \"$(cat {STAMP} 2>/dev/null)\" = \"$now\" ]; then echo use; "
+            # Stale or missing: drop it and stamp what the next archive will be built from
+            f"else rm -f {ARCHIVE} && echo \"$now\" > {STAMP} && echo dump; fi"
+        )
+        mode = output.strip().split('\n')[-1] if output.strip() else 'off'
+        if mode == 'use':
+            return mode, [f'-XX:SharedArchiveFile={ARCHIVE}']
+        if mode == 'dump':
+            return mode, [f'-XX:ArchiveClassesAtExit={ARCHIVE}']
+        return 'off', []
+    
+    def invalidate(self):
+        """Throw the archive away, the next start builds a fresh one"""
+        self.ssh.execute(f"rm -f {self.mc_dir}/{ARCHIVE} {self.mc_dir}/{STAMP}")
+    
+    def record_boot(self, mode, seconds, reported_seconds=None):
+        """Append one startup time so runs with and without the archive can be compared"""
+        entry = json.dumps({'time': int(time.time()), 'mode': mode, 'seconds': round(seconds, 2),
+                            'reported_seconds': reported_seconds})
+        self.ssh.execute(f"mkdir -p {self.mc_dir}/{STATE_DIR} && "
+                         f"echo '{entry}' >> {self.mc_dir}/{BOOT_LOG} && "
+                         f"tail -n 200 {self.mc_dir}/{BOOT_LOG} > {self.mc_dir}/{BOOT_LOG}.tmp && "
+                         f"mv {self.mc_dir}/{BOOT_LOG}.tmp {self.mc_dir}/{BOOT_LOG}")
+    
+    def boot_stats(self, recent=20):
+        """{'use': {...}, 'dump': {...}, 'off': {...}} with count, avg and best seconds per mode"""
+        output, _ = self.ssh.execute(f"tail -n 200 {self.mc_dir}/{BOOT_LOG} 2>/dev/null", retry=True)
+        by_mode = {}
+        for line in output.strip().split('\n'):
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            by_mode.setdefault(entry['mode'], []).append(entry['seconds'])
+        
+        stats = {}
+        for mode, times in by_mode.items():
+            times = times[-recent:]
+            stats[mode] = {'count': len(times), 'avg': sum(times) / len(times), 'best': min(times)}
+        # Dump runs boot without sharing, so they count towards the baseline too
+        baseline = (by_mode.get('off', []) + by_mode.get('dump', []))[-recent:]
+        if 'use' in stats and baseline:
+            stats['saved_seconds'] = sum(baseline) / len(baseline) - stats['use']['avg']
+        return stats
@@ -0,0 +1,323 @@
+"""Chunk pre-generation around a point, paced by TPS and paused while players are on"""
+import json
+import math
+import re
+import shlex
+import threading
+import time
+from collections import deque
+from paths import STATE_DIR
+from server_ping import PingError
+
+STATE_FILE = f'{STATE_DIR}/pregen.json'
+# forceload takes at most 256 chunks per command
+MAX_BATCH = 16
+
+# "[Chunky] Task running for minecraft:overworld. Processed: 1234 chunks (5.67%), ETA: 0:12:34, Rate: 45.6 cps"
+_CHUNKY_PROGRESS = re.compile(r'Processed: (\d+) chunks \(([\d.]+)%\)(?:, ETA: ([\d:]+))?(?:, Rate: ([\d.]+) cps)?')
+_CHUNKY_FINISHED = re.compile(r'Task finished for')
+
+def batch_order(radius, batch):
+    """Offsets of batch x batch chunk squares covering radius chunks, innermost ring first"""
+    rings = math.ceil((radius + 1) / batch - 0.5)
+    squares = [(x, z) for x in range(-rings, rings + 1) for z in range(-rings, rings + 1)]
+    return sorted(squares, key=lambda s: (max(abs(s[0]), abs(s[1])), s[0], s[1]))
+
+def _seconds(clock):
+    """'1:02:03' -> 3723"""
+    total = 0
+    for part in clock.split(':'):
+        total = total * 60 + int(part)
+    return total
+
+class Pregenerator:
+    """Drives Chunky when it is installed, otherwise walks the area with batched forceload
+    
+    Progress is kept in STATE_FILE on the server, so a restart of the
+    server (or of this app) carries on from the last batch.
+    """
+    def __init__(self, server, interval=5, min_tps=18.0, batch=8):
+        self.server = server
+        self.interval = interval
+        self.min_tps = min_tps
+        self.batch = min(batch, MAX_BATCH)
+        self.listeners = []
+        self.state = None
+        self.reason = None
+        self._per_step = 1
+        self._rates = deque(maxlen=24)
+        self._pid = None
+        self._stopped = threading.Event()
+        self._thread = None
+    
+    def add_listener(self, callback):
+        """callback(progress) from the pregen thread after every step"""
+        self.listeners.append(callback)
+    
+    def detect(self):
+        """'chunky' when the Chunky plugin or mod is in the server directory, else 'forceload'"""
+        output, _ = self.server.ssh.execute(
+            f"ls {self.server.mc_dir}/plugins {self.server.mc_dir}/mods 2>/dev/null | grep -i '^chunky.*\\.jar$'"
+        )
+        return 'chunky' if output.strip() else 'forceload'
+    
+    def start(self, radius, center=(0, 0), world='minecraft:overworld', strategy=None):
+        """Begin a new task, radius in blocks around center (x, z)"""
+        self.stop(wait=True)
+        strategy = strategy or self.detect()
+        self.state = {
+            'strategy': strategy,
+            'world': world,
+            'center': list(center),
+            'radius': int(radius),
+            'status': 'running',
+            'next': 0,
+            'done': 0,
+            'total': None,
+            'eta': None,
+            'rate': None,
+            'started': time.time(),
+            # forceload areas still held, forced chunks survive restarts so this is saved too
+            'loaded': [],
+        }
+        if strategy == 'forceload':
+            self.state['total'] = len(batch_order(radius // 16, self.batch)) * self.batch ** 2
+        else:
+            x, z = center
+            self._send([f"chunky world {world}", f"chunky center {x} {z}", f"chunky radius {int(radius)}",
+                        "chunky start", "chunky confirm"])
+        self._pid = self.server.backend.status()['pid']
+        self._save()
+        self._run_thread()
+    
+    def resume(self):
+        """Pick up a task left running on the server, True if there was one"""
+        output, _ = self.server.ssh.execute(f"cat {self.server.mc_dir}/{STATE_FILE} 2>/dev/null", retry=True)
+        try:
+            state = json.loads(output)
+        except ValueError:
+            return False
+        self.state = state
+        if state.get('status') in ('running', 'paused'):
+            self._run_thread()
+            return True
+        return False
+    
+    def pause(self):
+        """Hold the task until resume_task(), unlike automatic pauses it stays held"""
+        if self.state and self.state['status'] == 'running':
+            self.state['status'] = 'held'
+            self._hold(True)
+            self._save()
+    
+    def resume_task(self):
+        if self.state and self.state['status'] == 'held':
+            self.state['status'] = 'running'
+            self._save()
+            self._run_thread()
+    
+    def cancel(self):
+        self.stop(wait=True)
+        if not self.state:
+            return
+        if self.state['strategy'] == 'chunky':
+            self._send(["chunky cancel", "chunky confirm"])
+        else:
+            self._unload_all()
+        self.state['status'] = 'cancelled'
+        self._save()
+        self._emit()
+    
+    def stop(self, wait=False):
+        """Stop driving the task without changing it, it resumes on the next resume()"""
+        self._stopped.set()
+        if wait and self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.interval + 5)
+    
+    def _run_thread(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+    
+    def _run(self):
+        while not self._stopped.is_set() and self.state and self.state['status'] in ('running', 'paused'):
+            try:
+                self.step()
+            except Exception as e:
+                self.reason = f"error: {e}"
+            self._emit()
+            self._stopped.wait(self.interval)
+    
+    def _emit(self):
+        progress = self.progress()
+        for callback in list(self.listeners):
+            try:
+                callback(progress)
+            except Exception:
+                pass
+    
+    def _send(self, commands):
+        return self.server.send_commands(commands)
+    
+    def _save(self):
+        self.server.ssh.execute(f"mkdir -p {self.server.mc_dir}/{STATE_DIR} && "
+                                f"echo {shlex.quote(json.dumps(self.state))} > {self.server.mc_dir}/{STATE_FILE}")
+    
+    def _throttle_reason(self):
+        """Why generation should wait right now, None when it can go on"""
+        try:
+            if self.server.ping()['online'] > 0:
+                return "players online"
+        except PingError:
+            return "server not answering"
+        latest = self.server.ticks.latest()
+        # Only trust a recent sample, an old one says nothing about the current load
+        if latest and time.time() - latest['time'] < self.server.ticks.period() * 3 and latest['tps'] < self.min_tps:
+            return f"TPS {latest['tps']:.1f}"
+        return None
+    
+    def step(self):
+        """One round: check the server is free, then move the task along"""
+        pid = self.server.backend.status()['pid']
+        if not pid:
+            # Nothing to tell a stopped server, it gets a continue once it is back
+            self._pid = None
+            self._set_paused("server stopped")
+            return
+        # Also true on the first step after resume(), Chunky does not carry on by itself
+        restarted = pid != self._pid
+        self._pid = pid
+        
+        reason = self._throttle_reason()
+        if reason:
+            self._set_paused(reason)
+            return
+        if self.state['status'] == 'paused' or restarted:
+            self._hold(False)
+            self.state['status'] = 'running'
+        self.reason = None
+        
+        if self.state['strategy'] == 'chunky':
+            self._chunky_step()
+        else:
+            self._forceload_step()
+        self._save()
+    
+    def _set_paused(self, reason):
+        self.reason = reason
+        if self.state['status'] == 'running':
+            self.state['status'] = 'paused'
+            if self._pid:
+                self._hold(True)
+            self._save()
+        # Rates from before a pause would make the ETA look better than it is
+        self._rates.clear()
+    
+    def _hold(self, paused):
+        """Tell the generator to stop or carry on, forceload just stops adding batches"""
+        if self.state['strategy'] == 'chunky':
+            self._send(["chunky pause" if paused else "chunky continue"])
+        elif paused:
+            self._unload_all()
+    
+    def _chunky_step(self):
+        output = self._send(["chunky progress"])[0]
+        if output is None:
+            # Console only, Chunky also prints its progress to the log
+            output, _ = self.server.ssh.execute(
+                f"tail -n 300 {self.server.mc_dir}/logs/latest.log 2>/dev/null | grep -E 'Processed:|Task finished' | tail -n 1"
+            )
+        if _CHUNKY_FINISHED.search(output):
+            self.state.update({'status': 'done', 'eta': 0})
+            return
+        match = _CHUNKY_PROGRESS.search(output)
+        if not match:
+            return
+        done, percent = int(match.group(1)), float(match.group(2))
+        self.state['done'] = done
+        self.state['total'] = int(done * 100 / percent) if percent > 0 else None
+        self.state['eta'] = _seconds(match.group(3)) if match.group(3) else None
+        self.state['rate'] = float(match.group(4)) if match.group(4) else None
+        if percent >= 100:
+            self.state['status'] = 'done'
+    
+    def _forceload_step(self):
+        order = batch_order(self.state['radius'] // 16, self.batch)
+        if self.state['next'] >= len(order):
+            self._unload_all()
+            self.state.update({'status': 'done', 'eta': 0})
+            return
+        
+        # More squares per step while the server keeps up, fewer once it starts to slip
+        latest = self.server.ticks.latest()
+        if latest and latest['tps'] >= 19.5:
+            self._per_step = min(self._per_step + 1, 8)
+        elif latest and latest['tps'] < 19:
+            self._per_step = max(self._per_step // 2, 1)
+        
+        cx, cz = (c // 16 for c in self.state['center'])
+        commands = []
+        squares = order[self.state['next']:self.state['next'] + self._per_step]
+        for bx, bz in squares:
+            x1, z1 = (cx + bx * self.batch - self.batch // 2) * 16, (cz + bz * self.batch - self.batch // 2) * 16
+            area = f"{x1} {z1} {x1 + self.batch * 16 - 1} {z1 + self.batch * 16 - 1}"
+            commands.append(f"execute in {self.state['world']} run forceload add {area}")
+            self.state['loaded'].append(area)
+        # Keep the last step's squares loaded a little longer so they finish generating
+        while len(self.state['loaded']) > len(squares) * 2:
+            commands.append(f"execute in {self.state['world']} run forceload remove {self.state['loaded'].pop(0)}")
+        self._send(commands)
+        
+        self.state['next'] += len(squares)
+        self.state['done'] = min(self.state['next'] * self.batch ** 2, self.state['total'])
+        self._rates.append((time.monotonic(), self.state['done']))
+        if len(self._rates) >= 2 and self._rates[-1][0] > self._rates[0][0]:
+            (t0, d0), (t1, d1) = self._rates[0], self._rates[-1]
+            self.state['rate'] = (d1 - d0) / (t1 - t0)
+            if self.state['rate'] > 0:
+                self.state['eta'] = (self.state['total'] - self.state['done']) / self.state['rate']
+    
+    def _unload_all(self):
+        if self.state.get('loaded'):
+            self._send([f"execute in {self.state['world']} run forceload remove {area}"
+                        for area in self.state['loaded']])
+            self.state['loaded'] = []
+    
+    def progress(self):
+        """{'status', 'reason', 'strategy', 'done', 'total', 'percent', 'rate', 'eta'}, None without a task"""
+        if not self.state:
+            return None
+        state = self.state
+        total = state.get('total')
+        return {
+            'status': state['status'],
+            'reason': self.reason,
+            'strategy': state['strategy'],
+            'done': state['done'],
+            'total': total,
+            'percent': 100.0 * state['done'] / total if total else None,
+            'rate': state.get('rate'),
+            'eta': state.get('eta'),
+        }
+
+def describe(progress):
+    """One line for the UI: percent, chunks/s, ETA and why it is waiting"""
+    if not progress:
+        return "No pre-generation task"
+    if progress['status'] == 'done':
+        return f"Pre-generation finished, {progress['done']:,} chunks"
+    if progress['status'] == 'cancelled':
+        return "Pre-generation cancelled"
+    parts = [f"{progress['percent']:.1f}%" if progress['percent'] is not None else f"{progress['done']:,} chunks"]
+    if progress['rate']:
+        parts.append(f"{progress['rate']:.0f} chunks/s")
+    if progress['eta']:
+        hours, rest = divmod(int(progress['eta']), 3600)
+        parts.append(f"ETA {hours}h {rest // 60:02d}m" if hours else f"ETA {rest // 60}m {rest % 60:02d}s")
+    if progress['status'] == 'held':
+        parts.append("paused")
+    elif progress['reason']:
+        parts.append(f"waiting: {progress['reason']}")
+    return "Pre-generating " + ", ".join(parts)
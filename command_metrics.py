@@ -0,0 +1,203 @@
+"""Per-command latency instrumentation for remote calls"""
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float('inf'))
+
+_QUOTED = re.compile(r"'[^']*'|\"[^\"]*\"")
+_NUMBER = re.compile(r"\b\d+(\.\d+)?\b")
+_MARKER = re.compile(r"__MSM_[0-9a-f]+__")
+_SPACES = re.compile(r"\s+")
+
+# Frames from these files are plumbing, the caller is the first frame outside them
+_INTERNAL_FILES = ('ssh_manager.py', 'local_backend.py', 'command_metrics.py', 'async_api.py',
+                   'transfer_engine.py', 'threading.py', 'contextlib.py')
+
+def normalize_command(command, limit=80):
+    """Collapse arguments so the same call site always gets the same label"""
+    label = _MARKER.sub('…', command)
+    label = _QUOTED.sub("'…'", label)
+    label = _NUMBER.sub('N', label)
+    label = _SPACES.sub(' ', label).strip()
+    if len(label) > limit:
+        label = label[:limit - 1] + '…'
+    return label
+
+def find_caller():
+    """module.function of the code that issued the remote call"""
+    frame = sys._getframe(1)
+    while frame:
+        filename = os.path.basename(frame.f_code.co_filename)
+        if filename not in _INTERNAL_FILES:
+            return f"{os.path.splitext(filename)[0]}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return 'unknown'
+
+def _bucket_index(ms):
+    for i, bound in enumerate(BUCKETS_MS):
+        if ms <= bound:
+            return i
+    return len(BUCKETS_MS) - 1
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+class CommandMetrics:
+    """Aggregates timings per command label and keeps the slowest recent calls"""
+    def __init__(self, recent=1000, top=20, samples_per_label=200):
+        self.top = top
+        self.samples_per_label = samples_per_label
+        self.recent = deque(maxlen=recent)
+        self.labels = {}
+        self.callers = {}
+        self.histogram = [0] * len(BUCKETS_MS)
+        self.started = time.time()
+        self.enabled = True
+        self._lock = threading.Lock()
+    
+    def record(self, command, kind, wall, queue_wait=0.0, bytes_out=0, bytes_in=0,
+               exit_code=None, error=None, caller=None, commands=1):
+        """Store one remote call, wall and queue_wait are in seconds"""
+        if not self.enabled:
+            return
+        
+        entry = {
+            'time': time.time(),
+            'label': normalize_command(command),
+            'kind': kind,
+            'caller': caller or 'unknown',
+            'commands': commands,
+            'wall_ms': wall * 1000,
+            'queue_ms': queue_wait * 1000,
+            'bytes_out': bytes_out,
+            'bytes_in': bytes_in,
+            'exit_code': exit_code,
+            'error': error,
+        }
+        
+        with self._lock:
+            self.recent.append(entry)
+            self.histogram[_bucket_index(entry['wall_ms'])] += 1
+            
+            stats = self.labels.get(entry['label'])
+            if stats is None:
+                stats = self.labels[entry['label']] = {
+                    'count': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                    'queue_ms': 0.0, 'bytes_out': 0, 'bytes_in': 0,
+                    'histogram': [0] * len(BUCKETS_MS),
+                    'samples': deque(maxlen=self.samples_per_label),
+                }
+            stats['count'] += 1
+            stats['total_ms'] += entry['wall_ms']
+            stats['max_ms'] = max(stats['max_ms'], entry['wall_ms'])
+            stats['queue_ms'] += entry['queue_ms']
+            stats['bytes_out'] += bytes_out
+            stats['bytes_in'] += bytes_in
+            stats['histogram'][_bucket_index(entry['wall_ms'])] += 1
+            stats['samples'].append(entry['wall_ms'])
+            # Batches pass a list of exit codes, grep-style probes in them exit non-zero
+            if error or (isinstance(exit_code, int) and exit_code != 0):
+                stats['errors'] += 1
+            
+            caller_stats = self.callers.setdefault(entry['caller'], {
+                'round_trips': 0, 'commands': 0, 'total_ms': 0.0,
+            })
+            caller_stats['round_trips'] += 1
+            caller_stats['commands'] += commands
+            caller_stats['total_ms'] += entry['wall_ms']
+    
+    @contextmanager
+    def measure(self, command, commands=1):
+        """Time one remote call, the backend fills in queue wait, bytes and exit status"""
+        sample = {'kind': 'exec', 'queue_wait': 0.0, 'bytes_out': 0, 'bytes_in': 0,
+                  'exit_code': None, 'error': None}
+        caller = find_caller()
+        start = time.monotonic()
+        try:
+            yield sample
+        except GeneratorExit:
+            # A stream closed early by its reader is not a failure
+            raise
+        except BaseException as e:
+            sample['error'] = type(e).__name__
+            raise
+        finally:
+            self.record(command, sample['kind'], time.monotonic() - start,
+                        queue_wait=sample['queue_wait'],
+                        bytes_out=sample['bytes_out'], bytes_in=sample['bytes_in'],
+                        exit_code=sample['exit_code'], error=sample['error'],
+                        caller=caller, commands=commands)
+    
+    def get_labels(self):
+        """Per-label summary sorted by total time spent"""
+        with self._lock:
+            rows = []
+            for label, stats in self.labels.items():
+                samples = list(stats['samples'])
+                rows.append({
+                    'label': label,
+                    'count': stats['count'],
+                    'errors': stats['errors'],
+                    'total_ms': stats['total_ms'],
+                    'avg_ms': stats['total_ms'] / stats['count'],
+                    'p50_ms': _percentile(samples, 50),
+                    'p95_ms': _percentile(samples, 95),
+                    'max_ms': stats['max_ms'],
+                    'avg_queue_ms': stats['queue_ms'] / stats['count'],
+                    'bytes_out': stats['bytes_out'],
+                    'bytes_in': stats['bytes_in'],
+                    'histogram': list(stats['histogram']),
+                })
+        return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+    
+    def get_callers(self):
+        """Round trips and time per calling function, most expensive first"""
+        with self._lock:
+            rows = [dict(stats, caller=caller) for caller, stats in self.callers.items()]
+        return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+    
+    def get_slowest(self, count=None):
+        """The slowest calls among the recent ones"""
+        with self._lock:
+            recent = list(self.recent)
+        return sorted(recent, key=lambda e: e['wall_ms'], reverse=True)[:count or self.top]
+    
+    def get_histogram(self):
+        with self._lock:
+            counts = list(self.histogram)
+        return [
+            {'le_ms': None if bound == float('inf') else bound, 'count': count}
+            for bound, count in zip(BUCKETS_MS, counts)
+        ]
+    
+    def snapshot(self):
+        return {
+            'started': self.started,
+            'exported': time.time(),
+            'histogram': self.get_histogram(),
+            'labels': self.get_labels(),
+            'callers': self.get_callers(),
+            'slowest': self.get_slowest(),
+        }
+    
+    def export_json(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+    
+    def reset(self):
+        with self._lock:
+            self.recent.clear()
+            self.labels.clear()
+            self.callers.clear()
+            self.histogram = [0] * len(BUCKETS_MS)
+            self.started = time.time()
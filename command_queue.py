@@ -0,0 +1,124 @@
+"""Ordered console command queue that batches and rate limits what reaches the server"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+class CommandQueue:
+    """Sends queued commands in order, several per write, at no more than rate commands a second
+    
+    send_batch(commands) must return one output (or None) per command. It is
+    only ever called from the queue's own thread, so writes never interleave.
+    """
+    def __init__(self, send_batch, rate=10, burst=20, max_batch=32, linger=0.02):
+        self.send_batch = send_batch
+        self.rate = rate
+        self.burst = burst
+        self.max_batch = max_batch
+        # How long the first command waits for others to share its write
+        self.linger = linger
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._tokens = float(burst)
+        self._refilled = time.monotonic()
+        self._closed = False
+        self._thread = None
+        self.stats = {'submitted': 0, 'coalesced': 0, 'sent': 0, 'batches': 0, 'failed': 0,
+                      'throttled_ms': 0.0}
+    
+    def submit(self, command, coalesce=False):
+        """Queue a command, returns a Future for its output
+        
+        With coalesce an identical command that is still waiting is reused
+        instead of queueing another, for idempotent commands like save-all.
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Command queue is closed")
+            self.stats['submitted'] += 1
+            if coalesce:
+                for queued, future in self._pending:
+                    if queued == command:
+                        self.stats['coalesced'] += 1
+                        return future
+            future = Future()
+            self._pending.append((command, future))
+            if not self._thread:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+            return future
+    
+    def submit_many(self, commands):
+        """Queue commands back to back, returns their Futures in the same order"""
+        with self._cond:
+            return [self.submit(command) for command in commands]
+    
+    def pending(self):
+        with self._cond:
+            return len(self._pending)
+    
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+    
+    def _take(self):
+        """Wait for commands and rate budget, then pop the next batch in queue order"""
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if self._closed:
+                return []
+            
+            linger_until = time.monotonic() + self.linger
+            while not self._closed and len(self._pending) < self.max_batch:
+                left = linger_until - time.monotonic()
+                if left <= 0:
+                    break
+                self._cond.wait(left)
+            
+            self._refill()
+            while self._tokens < 1 and not self._closed:
+                delay = (1 - self._tokens) / self.rate
+                self.stats['throttled_ms'] += delay * 1000
+                self._cond.wait(delay)
+                self._refill()
+            if self._closed:
+                return []
+            
+            count = min(len(self._pending), self.max_batch, int(self._tokens))
+            self._tokens -= count
+            return [self._pending.popleft() for _ in range(count)]
+    
+    def _run(self):
+        while True:
+            batch = self._take()
+            if not batch:
+                return
+            # Cancelled futures are dropped, everything else keeps its place
+            batch = [(command, future) for command, future in batch
+                     if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            
+            try:
+                outputs = self.send_batch([command for command, _ in batch])
+            except Exception as e:
+                self.stats['failed'] += len(batch)
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            
+            self.stats['sent'] += len(batch)
+            self.stats['batches'] += 1
+            for (_, future), output in zip(batch, outputs):
+                future.set_result(output)
+    
+    def close(self):
+        """Stop the worker, commands still waiting are cancelled"""
+        with self._cond:
+            self._closed = True
+            while self._pending:
+                self._pending.popleft()[1].cancel()
+            self._cond.notify_all()
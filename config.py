@@ -6,6 +6,43 @@ class Config:
     DEFAULT_MC_DIR = "/root/minecraft"
     DEFAULT_MEMORY = "4G"
     
+    # Seconds to wait on logs/latest.log before giving up on a lifecycle step
+    START_TIMEOUT = 600
+    STOP_TIMEOUT = 120
+    # save-all flush before stopping, then how long SIGTERM gets before SIGKILL
+    SAVE_TIMEOUT = 300
+    TERM_TIMEOUT = 60
+    
+    # Console commands per second (and burst) let through to one server
+    COMMAND_RATE = 10
+    COMMAND_BURST = 20
+    
+    # What hosts the server process: screen, tmux or systemd
+    PROCESS_BACKEND = 'screen'
+    
+    # Seconds between TPS/MSPT samples over RCON, and through the console (where they land in the log)
+    TICK_SAMPLE_INTERVAL = 5
+    TICK_SAMPLE_CONSOLE_INTERVAL = 60
+    
+    # Chunk pre-generation waits below this TPS, checking every interval seconds
+    PREGEN_MIN_TPS = 18.0
+    PREGEN_INTERVAL = 5
+    
+    # Dynamic distances: lowered while MSPT averages above HIGH, raised again once it stays below LOW.
+    # The upper bounds are the server.properties values.
+    DISTANCE_MSPT_HIGH = 45.0
+    DISTANCE_MSPT_LOW = 30.0
+    MIN_VIEW_DISTANCE = 6
+    MIN_SIMULATION_DISTANCE = 4
+    # Console commands for a plugin or mod that changes distances at runtime, e.g.
+    # ["mydistances set {view} {simulation}"]; Carpet is detected without this
+    DISTANCE_COMMANDS = None
+    
+    # Hibernation: minutes without players before stopping, and what the sleeping port tells clients
+    HIBERNATE_IDLE_MINUTES = 15
+    HIBERNATE_MOTD = "Sleeping, join to wake it up"
+    HIBERNATE_KICK = "The server is starting, join again in about {seconds}s"
+    
     COLORS = {
         'bg': '#1e1e1e',
         'fg': '#ffffff',
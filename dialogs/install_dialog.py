@@ -209,14 +209,23 @@ class InstallDialog:
         self.app.log(f"📦 Installing {server_type.upper()} server {version}...")
         self.app.log(f"💾 Memory: {memory}GB")
         
+        def log_line(stream, line):
+            if line.strip():
+                self.app.log(f"   {line}")
+        
+        def run_live(command, timeout=600):
+            """Run a long step and mirror its output into the console as it happens"""
+            exit_code = self.app.ssh.execute_live(command, log_line, timeout=timeout)
+            if exit_code != 0:
+                raise Exception(f"Command failed with exit code {exit_code}: {command.split('&&')[-1].strip()}")
+        
         def install_process():
             try:
                 # Install Java
                 self.app.log("☕ Installing Java 21...")
-                self.app.ssh.execute("apt update -qq", timeout=120)
-                self.app.ssh.execute(
-                    "DEBIAN_FRONTEND=noninteractive apt install -y openjdk-21-jdk-headless wget curl",
-                    timeout=600
+                run_live("apt update -qq", timeout=120)
+                run_live(
+                    "DEBIAN_FRONTEND=noninteractive apt install -y openjdk-21-jdk-headless wget curl"
                 )
                 
                 self.app.log("✅ Java installed!")
@@ -229,7 +238,7 @@ class InstallDialog:
                         f"cd /root/minecraft && wget -q -O fabric-installer.jar "
                         f"https://maven.fabricmc.net/net/fabricmc/fabric-installer/1.0.0/fabric-installer-1.0.0.jar"
                     )
-                    self.app.ssh.execute(
+                    run_live(
                         f"cd /root/minecraft && java -jar fabric-installer.jar server "
                         f"-mcversion {version} -downloadMinecraft"
                     )
@@ -253,7 +262,7 @@ class InstallDialog:
                         f"cd /root/minecraft && wget -q -O forge-installer.jar "
                         f"https://maven.minecraftforge.net/net/minecraftforge/forge/{version}-{forge_ver}/forge-{version}-{forge_ver}-installer.jar"
                     )
-                    self.app.ssh.execute("cd /root/minecraft && java -jar forge-installer.jar --installServer")
+                    run_live("cd /root/minecraft && java -jar forge-installer.jar --installServer")
                 
                 elif server_type == "paper":
                     self.app.log(f"📥 Downloading Paper {version}...")
@@ -303,7 +312,7 @@ motd=A Minecraft Server
                 # Auto start
                 if auto_start:
                     self.app.log("🚀 Starting server...")
-                    self.app.server.start(memory=f"{memory}G")
+                    self.app.server.start(memory=f"{memory}G", wait=False)
                     self.app.log("✅ Server started!")
                 
                 messagebox.showinfo("Success", 
@@ -0,0 +1,235 @@
+"""JVM launch profile dialog"""
+import tkinter as tk
+from tkinter import ttk, scrolledtext
+import threading
+from ui_components import ModernTheme, Card
+from jvm_profiles import PROFILES, GIB, recommend_profile, format_memory
+from process_backends import BACKENDS, available_backends
+
+class LaunchProfileDialog:
+    def __init__(self, parent, app):
+        self.app = app
+        self.host = None
+        self.available = None
+        self.attach = None
+        self.dialog = tk.Toplevel(parent)
+        self.dialog.title("JVM Launch Profile")
+        self.dialog.geometry("760x640")
+        self.dialog.configure(bg=ModernTheme.DARK['bg'])
+        self.dialog.transient(parent)
+        
+        self.profile_var = tk.StringVar(value=self.app.server.launch['profile'])
+        self.create_ui()
+        self.load_host()
+    
+    def create_ui(self):
+        # Header
+        header = tk.Frame(self.dialog, bg=ModernTheme.DARK['surface'],
+                         highlightthickness=1, highlightbackground=ModernTheme.DARK['border'])
+        header.pack(fill=tk.X)
+        
+        tk.Label(header, text="☕ JVM Launch Profile",
+                font=('Segoe UI', 18, 'bold'),
+                bg=ModernTheme.DARK['surface'],
+                fg=ModernTheme.DARK['accent']).pack(side=tk.LEFT, padx=20, pady=15)
+        
+        self.host_label = tk.Label(header, text="Checking host...",
+                                   font=('Segoe UI', 10),
+                                   bg=ModernTheme.DARK['surface'],
+                                   fg=ModernTheme.DARK['text_secondary'])
+        self.host_label.pack(side=tk.RIGHT, padx=20)
+        
+        card = Card(self.dialog)
+        card.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        for name, profile in PROFILES.items():
+            row = tk.Frame(card, bg=ModernTheme.DARK['surface'])
+            row.pack(fill=tk.X, padx=15, pady=4)
+            tk.Radiobutton(row, text=profile['label'], variable=self.profile_var, value=name,
+                          command=self.update_preview,
+                          bg=ModernTheme.DARK['surface'], fg=ModernTheme.DARK['text'],
+                          selectcolor=ModernTheme.DARK['surface_light'],
+                          font=('Segoe UI', 10, 'bold')).pack(anchor='w')
+            tk.Label(row, text=profile['description'],
+                    bg=ModernTheme.DARK['surface'], fg=ModernTheme.DARK['text_secondary'],
+                    font=('Segoe UI', 9)).pack(anchor='w', padx=25)
+        
+        memory_frame = tk.Frame(card, bg=ModernTheme.DARK['surface'])
+        memory_frame.pack(fill=tk.X, padx=15, pady=10)
+        
+        tk.Label(memory_frame, text="Heap (Xms = Xmx):",
+                bg=ModernTheme.DARK['surface'], fg=ModernTheme.DARK['text'],
+                font=('Segoe UI', 10)).pack(side=tk.LEFT)
+        
+        self.memory = ttk.Combobox(memory_frame, width=10,
+                                   values=['Auto', '2G', '4G', '6G', '8G', '10G', '12G', '16G', '24G'])
+        self.memory.set(self.app.server.launch['memory'] or 'Auto')
+        self.memory.bind('<<ComboboxSelected>>', lambda e: self.update_preview())
+        self.memory.bind('<KeyRelease>', lambda e: self.update_preview())
+        self.memory.pack(side=tk.LEFT, padx=10)
+        
+        self.recommend_label = tk.Label(memory_frame, text="",
+                                        bg=ModernTheme.DARK['surface'],
+                                        fg=ModernTheme.DARK['success'],
+                                        font=('Segoe UI', 9))
+        self.recommend_label.pack(side=tk.LEFT, padx=10)
+        
+        cds_frame = tk.Frame(card, bg=ModernTheme.DARK['surface'])
+        cds_frame.pack(fill=tk.X, padx=15, pady=(0, 10))
+        
+        self.cds_var = tk.BooleanVar(value=self.app.server.launch.get('cds', True))
+        tk.Checkbutton(cds_frame, text="Class data sharing archive (Java 13+, faster boots)",
+                      variable=self.cds_var,
+                      bg=ModernTheme.DARK['surface'], fg=ModernTheme.DARK['text'],
+                      selectcolor=ModernTheme.DARK['surface_light'],
+                      font=('Segoe UI', 10)).pack(side=tk.LEFT)
+        
+        tk.Button(cds_frame, text="🗑️ Rebuild archive", command=self.rebuild_archive,
+                 bg=ModernTheme.DARK['surface_light'], fg='white',
+                 font=('Segoe UI', 9), relief='flat',
+                 padx=10, pady=4, cursor='hand2').pack(side=tk.LEFT, padx=10)
+        
+        self.boot_label = tk.Label(cds_frame, text="",
+                                   bg=ModernTheme.DARK['surface'],
+                                   fg=ModernTheme.DARK['text_secondary'],
+                                   font=('Segoe UI', 9))
+        self.boot_label.pack(side=tk.LEFT, padx=10)
+        
+        self.gc_log_var = tk.BooleanVar(value=self.app.server.launch.get('gc_log', True))
+        tk.Checkbutton(card, text="GC log (pause times and allocation rate on the dashboard)",
+                      variable=self.gc_log_var, command=self.update_preview,
+                      bg=ModernTheme.DARK['surface'], fg=ModernTheme.DARK['text'],
+                      selectcolor=ModernTheme.DARK['surface_light'],
+                      font=('Segoe UI', 10)).pack(anchor='w', padx=15, pady=(0, 10))
+        
+        backend_frame = tk.Frame(card, bg=ModernTheme.DARK['surface'])
+        backend_frame.pack(fill=tk.X, padx=15, pady=(0, 10))
+        
+        tk.Label(backend_frame, text="Run the server in:",
+                bg=ModernTheme.DARK['surface'], fg=ModernTheme.DARK['text'],
+                font=('Segoe UI', 10)).pack(side=tk.LEFT)
+        
+        self.backend = ttk.Combobox(backend_frame, width=10, state='readonly', values=list(BACKENDS))
+        self.backend.set(self.app.server.backend.name)
+        self.backend.bind('<<ComboboxSelected>>', lambda e: self.show_backend())
+        self.backend.pack(side=tk.LEFT, padx=10)
+        
+        self.backend_label = tk.Label(backend_frame, text="",
+                                      bg=ModernTheme.DARK['surface'],
+                                      fg=ModernTheme.DARK['text_secondary'],
+                                      font=('Segoe UI', 9))
+        self.backend_label.pack(side=tk.LEFT, padx=10)
+        
+        self.attach_button = tk.Button(backend_frame, text="📋 Copy", command=self.copy_attach,
+                                       bg=ModernTheme.DARK['surface_light'], fg='white',
+                                       font=('Segoe UI', 9), relief='flat',
+                                       padx=10, pady=4, cursor='hand2', state=tk.DISABLED)
+        self.attach_button.pack(side=tk.LEFT)
+        
+        tk.Label(card, text="Command line:",
+                bg=ModernTheme.DARK['surface'], fg=ModernTheme.DARK['text'],
+                font=('Segoe UI', 10, 'bold')).pack(anchor='w', padx=15)
+        
+        self.preview = scrolledtext.ScrolledText(card, wrap=tk.WORD, height=9,
+                                                 bg='#0a0e14', fg='#00ff00',
+                                                 font=('Consolas', 9), relief='flat')
+        self.preview.pack(fill=tk.BOTH, expand=True, padx=15, pady=(5, 15))
+        
+        # Buttons
+        btn_frame = tk.Frame(self.dialog, bg=ModernTheme.DARK['surface'],
+                            highlightthickness=1, highlightbackground=ModernTheme.DARK['border'])
+        btn_frame.pack(fill=tk.X, side=tk.BOTTOM)
+        
+        btn_container = tk.Frame(btn_frame, bg=ModernTheme.DARK['surface'])
+        btn_container.pack(pady=10)
+        
+        tk.Button(btn_container, text="💾 Save", command=self.save,
+                 bg=ModernTheme.DARK['success'], fg='white',
+                 font=('Segoe UI', 10, 'bold'), relief='flat',
+                 padx=15, pady=8, cursor='hand2').pack(side=tk.LEFT, padx=5)
+        
+        tk.Button(btn_container, text="Cancel", command=self.dialog.destroy,
+                 bg=ModernTheme.DARK['surface_light'], fg='white',
+                 font=('Segoe UI', 10, 'bold'), relief='flat',
+                 padx=15, pady=8, cursor='hand2').pack(side=tk.LEFT, padx=5)
+    
+    def load_host(self):
+        def probe():
+            try:
+                host = self.app.server.host_spec(refresh=True)
+                boots = self.app.server.cds.boot_stats()
+                self.available = available_backends(self.app.ssh)
+                self.dialog.after(0, self.show_host, host, boots)
+            except Exception as e:
+                self.dialog.after(0, lambda: self.host_label.config(text=f"Host check failed: {e}"))
+        
+        threading.Thread(target=probe, daemon=True).start()
+    
+    def show_host(self, host, boots):
+        self.host = host
+        java = f"Java {host['java_major']}" if host['java_major'] else "no java found"
+        self.host_label.config(
+            text=f"{host['cores']} cores, {host['mem_total'] / GIB:.1f} GB RAM, {java}"
+        )
+        self.recommend_label.config(text=f"Recommended: {PROFILES[recommend_profile(host)]['label']}")
+        
+        # Boot times recorded by ServerManager.start, with and without the archive
+        parts = []
+        if 'use' in boots:
+            parts.append(f"with archive {boots['use']['avg']:.1f}s avg")
+        for mode in ('off', 'dump'):
+            if mode in boots:
+                parts.append(f"without {boots[mode]['avg']:.1f}s avg")
+                break
+        if 'saved_seconds' in boots:
+            parts.append(f"saves {boots['saved_seconds']:.1f}s")
+        self.boot_label.config(text=", ".join(parts) or "No recorded boots yet")
+        self.show_backend()
+        self.update_preview()
+    
+    def show_backend(self):
+        name = self.backend.get()
+        if self.available is not None and name not in self.available:
+            self.backend_label.config(text=f"{BACKENDS[name].binary} is not installed on this host",
+                                      fg=ModernTheme.DARK['error'])
+            self.attach_button.config(state=tk.DISABLED)
+            return
+        # Same directory and session name as the server manager uses
+        self.attach = BACKENDS[name](self.app.ssh, self.app.server.mc_dir).attach_command()
+        self.backend_label.config(text=f"Console on the host: {self.attach}",
+                                  fg=ModernTheme.DARK['text_secondary'])
+        self.attach_button.config(state=tk.NORMAL)
+    
+    def copy_attach(self):
+        """Put the attach command on the clipboard, to paste into an SSH terminal"""
+        self.dialog.clipboard_clear()
+        self.dialog.clipboard_append(self.attach)
+        self.app.log(f"📋 Copied: {self.attach}")
+    
+    def selected_memory(self):
+        value = self.memory.get().strip()
+        return None if not value or value.lower() == 'auto' else value.upper()
+    
+    def update_preview(self):
+        if not self.host:
+            return
+        plan = self.app.server.launch_plan(self.selected_memory(), self.profile_var.get(),
+                                           self.gc_log_var.get())
+        self.preview.delete(1.0, tk.END)
+        self.preview.insert(tk.END, f"Heap: {format_memory(plan['heap'])}\n\n")
+        self.preview.insert(tk.END, ' '.join(plan['args']) + "\n")
+        for note in plan['notes']:
+            self.preview.insert(tk.END, f"\n⚠️ {note}")
+    
+    def rebuild_archive(self):
+        threading.Thread(target=self.app.server.cds.invalidate, daemon=True).start()
+        self.app.log("📦 Class data archive dropped, the next start builds a new one")
+    
+    def save(self):
+        profile, memory, cds = self.profile_var.get(), self.selected_memory(), self.cds_var.get()
+        self.app.server.launch.update({'profile': profile, 'memory': memory, 'cds': cds,
+                                       'gc_log': self.gc_log_var.get(), 'backend': self.backend.get()})
+        self.app.prefs.set_launch_profile(self.app.ssh.hostname, self.app.server.launch)
+        self.app.log(f"☕ Launch profile: {PROFILES[profile]['label']}, heap {memory or 'auto'} "
+                     "(applies from the next start)")
+        self.dialog.destroy()
@@ -0,0 +1,234 @@
+"""Remote call profiler dialog"""
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+from ui_components import ModernTheme, Card
+from command_metrics import BUCKETS_MS
+
+class MetricsDialog:
+    def __init__(self, parent, app):
+        self.app = app
+        self.refresh_job = None
+        self.labels = []
+        self.dialog = tk.Toplevel(parent)
+        self.dialog.title("Remote Call Profiler")
+        self.dialog.geometry("1100x750")
+        self.dialog.configure(bg=ModernTheme.DARK['bg'])
+        self.dialog.transient(parent)
+        self.dialog.protocol("WM_DELETE_WINDOW", self.close)
+        
+        self.create_ui()
+        self.refresh()
+    
+    def create_ui(self):
+        # Header
+        header = tk.Frame(self.dialog, bg=ModernTheme.DARK['surface'],
+                         highlightthickness=1, highlightbackground=ModernTheme.DARK['border'])
+        header.pack(fill=tk.X)
+        
+        tk.Label(header, text="⏱️ Remote Call Profiler",
+                font=('Segoe UI', 18, 'bold'),
+                bg=ModernTheme.DARK['surface'],
+                fg=ModernTheme.DARK['accent']).pack(side=tk.LEFT, padx=20, pady=15)
+        
+        self.summary_label = tk.Label(header, text="",
+                                      font=('Segoe UI', 10),
+                                      bg=ModernTheme.DARK['surface'],
+                                      fg=ModernTheme.DARK['text_secondary'])
+        self.summary_label.pack(side=tk.RIGHT, padx=20)
+        
+        notebook = ttk.Notebook(self.dialog)
+        notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        # Per-command totals
+        commands_card = Card(notebook)
+        columns = ("Command", "Calls", "Errors", "Total ms", "Avg ms", "p50 ms", "p95 ms",
+                   "Max ms", "Queue ms", "Sent", "Received")
+        self.commands_tree = self.create_tree(commands_card, columns)
+        self.commands_tree.column("Command", width=360)
+        self.commands_tree.bind('<<TreeviewSelect>>', self.on_command_select)
+        notebook.add(commands_card, text="Commands")
+        
+        # Which code paths cost the most round trips
+        callers_card = Card(notebook)
+        self.callers_tree = self.create_tree(callers_card, ("Caller", "Round trips", "Commands", "Total ms", "Avg ms"))
+        self.callers_tree.column("Caller", width=400)
+        notebook.add(callers_card, text="Callers")
+        
+        # Slowest recent calls
+        slow_card = Card(notebook)
+        self.slow_tree = self.create_tree(slow_card, ("Command", "Caller", "Path", "Wall ms", "Queue ms", "Exit", "Error"))
+        self.slow_tree.column("Command", width=360)
+        self.slow_tree.column("Caller", width=220)
+        notebook.add(slow_card, text="Slowest")
+        
+        # Latency histogram, for everything or the selected command
+        hist_card = Card(self.dialog)
+        hist_card.pack(fill=tk.X, padx=10, pady=(0, 10))
+        
+        self.histogram_title = tk.Label(hist_card, text="Latency (all commands)",
+                                        font=('Segoe UI', 10, 'bold'),
+                                        bg=ModernTheme.DARK['surface'],
+                                        fg=ModernTheme.DARK['text'])
+        self.histogram_title.pack(anchor='w', padx=10, pady=(10, 0))
+        
+        self.histogram_canvas = tk.Canvas(hist_card, height=130, bg=ModernTheme.DARK['surface'],
+                                          highlightthickness=0)
+        self.histogram_canvas.pack(fill=tk.X, padx=10, pady=10)
+        
+        # Buttons
+        btn_frame = tk.Frame(self.dialog, bg=ModernTheme.DARK['surface'],
+                            highlightthickness=1, highlightbackground=ModernTheme.DARK['border'])
+        btn_frame.pack(fill=tk.X, side=tk.BOTTOM)
+        
+        btn_container = tk.Frame(btn_frame, bg=ModernTheme.DARK['surface'])
+        btn_container.pack(pady=10)
+        
+        tk.Button(btn_container, text="🔄 Refresh", command=self.refresh,
+                 bg=ModernTheme.DARK['accent'], fg='white',
+                 font=('Segoe UI', 10, 'bold'), relief='flat',
+                 padx=15, pady=8, cursor='hand2').pack(side=tk.LEFT, padx=5)
+        
+        tk.Button(btn_container, text="💾 Export JSON", command=self.export,
+                 bg=ModernTheme.DARK['success'], fg='white',
+                 font=('Segoe UI', 10, 'bold'), relief='flat',
+                 padx=15, pady=8, cursor='hand2').pack(side=tk.LEFT, padx=5)
+        
+        tk.Button(btn_container, text="🗑️ Reset", command=self.reset,
+                 bg=ModernTheme.DARK['error'], fg='white',
+                 font=('Segoe UI', 10, 'bold'), relief='flat',
+                 padx=15, pady=8, cursor='hand2').pack(side=tk.LEFT, padx=5)
+        
+        self.auto_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(btn_container, text="Auto-refresh",
+                      variable=self.auto_var,
+                      bg=ModernTheme.DARK['surface'], fg=ModernTheme.DARK['text'],
+                      selectcolor=ModernTheme.DARK['surface_light'],
+                      font=('Segoe UI', 10)).pack(side=tk.LEFT, padx=10)
+    
+    def create_tree(self, parent, columns):
+        tree = ttk.Treeview(parent, columns=columns, show="headings", height=15)
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, width=80, anchor='w')
+        
+        scrollbar = ttk.Scrollbar(parent, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=10, pady=10)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y, pady=10)
+        return tree
+    
+    @property
+    def metrics(self):
+        return self.app.ssh.metrics if self.app.ssh else None
+    
+    def refresh(self):
+        if self.refresh_job:
+            self.dialog.after_cancel(self.refresh_job)
+            self.refresh_job = None
+        
+        metrics = self.metrics
+        if metrics:
+            self.labels = metrics.get_labels()
+            
+            self.commands_tree.delete(*self.commands_tree.get_children())
+            for row in self.labels:
+                self.commands_tree.insert('', tk.END, iid=row['label'], values=(
+                    row['label'], row['count'], row['errors'],
+                    f"{row['total_ms']:.0f}", f"{row['avg_ms']:.1f}",
+                    f"{row['p50_ms']:.1f}", f"{row['p95_ms']:.1f}", f"{row['max_ms']:.1f}",
+                    f"{row['avg_queue_ms']:.1f}",
+                    self.format_bytes(row['bytes_out']), self.format_bytes(row['bytes_in'])
+                ))
+            
+            self.callers_tree.delete(*self.callers_tree.get_children())
+            for row in metrics.get_callers():
+                self.callers_tree.insert('', tk.END, values=(
+                    row['caller'], row['round_trips'], row['commands'],
+                    f"{row['total_ms']:.0f}", f"{row['total_ms'] / row['round_trips']:.1f}"
+                ))
+            
+            self.slow_tree.delete(*self.slow_tree.get_children())
+            for entry in metrics.get_slowest():
+                self.slow_tree.insert('', tk.END, values=(
+                    entry['label'], entry['caller'], entry['kind'],
+                    f"{entry['wall_ms']:.1f}", f"{entry['queue_ms']:.1f}",
+                    '' if entry['exit_code'] is None else entry['exit_code'],
+                    entry['error'] or ''
+                ))
+            
+            total = sum(row['count'] for row in self.labels)
+            total_ms = sum(row['total_ms'] for row in self.labels)
+            self.summary_label.config(
+                text=f"{total} calls, {total_ms / 1000:.1f}s on the wire, {len(self.labels)} distinct commands"
+            )
+            self.draw_histogram([h['count'] for h in metrics.get_histogram()], "Latency (all commands)")
+        
+        if self.auto_var.get():
+            self.refresh_job = self.dialog.after(2000, self.refresh)
+    
+    def on_command_select(self, event):
+        selection = self.commands_tree.selection()
+        for row in self.labels:
+            if selection and row['label'] == selection[0]:
+                self.draw_histogram(row['histogram'], f"Latency: {row['label']}")
+                if self.auto_var.get():
+                    # Keep the selected histogram on screen
+                    self.auto_var.set(False)
+    
+    def draw_histogram(self, counts, title):
+        self.histogram_title.config(text=title)
+        canvas = self.histogram_canvas
+        canvas.delete('all')
+        
+        width = max(canvas.winfo_width(), 600)
+        height = 130
+        slot = width / len(counts)
+        peak = max(counts) or 1
+        
+        for i, (bound, count) in enumerate(zip(BUCKETS_MS, counts)):
+            x0 = i * slot + 6
+            x1 = (i + 1) * slot - 6
+            bar = (height - 35) * count / peak
+            canvas.create_rectangle(x0, height - 20 - bar, x1, height - 20,
+                                    fill=ModernTheme.DARK['accent'], width=0)
+            canvas.create_text((x0 + x1) / 2, height - 20 - bar - 8, text=str(count),
+                               fill=ModernTheme.DARK['text'], font=('Segoe UI', 8))
+            label = f"≤{bound:g}ms" if bound != float('inf') else f">{BUCKETS_MS[-2]:g}ms"
+            canvas.create_text((x0 + x1) / 2, height - 8, text=label,
+                               fill=ModernTheme.DARK['text_secondary'], font=('Segoe UI', 8))
+    
+    def format_bytes(self, count):
+        for unit in ('B', 'KB', 'MB'):
+            if count < 1024:
+                return f"{count:.0f} {unit}"
+            count /= 1024
+        return f"{count:.1f} GB"
+    
+    def export(self):
+        if not self.metrics:
+            return
+        
+        path = filedialog.asksaveasfilename(
+            parent=self.dialog,
+            defaultextension=".json",
+            filetypes=[("JSON", "*.json")],
+            initialfile="remote-calls.json"
+        )
+        if not path:
+            return
+        
+        try:
+            self.metrics.export_json(path)
+            self.app.log(f"✅ Exported remote call metrics to {path}")
+        except Exception as e:
+            messagebox.showerror("Export Failed", str(e), parent=self.dialog)
+    
+    def reset(self):
+        if self.metrics:
+            self.metrics.reset()
+        self.refresh()
+    
+    def close(self):
+        if self.refresh_job:
+            self.dialog.after_cancel(self.refresh_job)
+        self.dialog.destroy()
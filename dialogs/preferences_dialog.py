@@ -1,7 +1,9 @@
 """Preferences and settings dialog"""
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
+import threading
 from ui_components import ModernTheme
+from config import Config
 
 class PreferencesDialog:
     def __init__(self, parent, app):
@@ -126,6 +128,108 @@ class PreferencesDialog:
         self.default_memory.set(self.app.prefs.get('default_memory', '4G'))
         self.default_memory.pack(side=tk.LEFT, padx=10)
         
+        timeout_frame = tk.Frame(content, bg=ModernTheme.DARK['bg'])
+        timeout_frame.pack(fill=tk.X, padx=20, pady=5)
+        
+        tk.Label(timeout_frame, text="Wait for startup (seconds):",
+                bg=ModernTheme.DARK['bg'], fg=ModernTheme.DARK['text'],
+                font=('Segoe UI', 10)).pack(side=tk.LEFT)
+        
+        self.start_timeout = tk.Spinbox(timeout_frame, from_=30, to=3600, increment=30,
+                                       bg=ModernTheme.DARK['surface_light'],
+                                       fg=ModernTheme.DARK['text'],
+                                       font=('Segoe UI', 10), width=8)
+        self.start_timeout.delete(0, tk.END)
+        self.start_timeout.insert(0, self.app.prefs.get('start_timeout', Config.START_TIMEOUT))
+        self.start_timeout.pack(side=tk.LEFT, padx=10)
+        
+        tk.Label(timeout_frame, text="shutdown:",
+                bg=ModernTheme.DARK['bg'], fg=ModernTheme.DARK['text'],
+                font=('Segoe UI', 10)).pack(side=tk.LEFT)
+        
+        self.stop_timeout = tk.Spinbox(timeout_frame, from_=10, to=600, increment=10,
+                                      bg=ModernTheme.DARK['surface_light'],
+                                      fg=ModernTheme.DARK['text'],
+                                      font=('Segoe UI', 10), width=8)
+        self.stop_timeout.delete(0, tk.END)
+        self.stop_timeout.insert(0, self.app.prefs.get('stop_timeout', Config.STOP_TIMEOUT))
+        self.stop_timeout.pack(side=tk.LEFT, padx=10)
+        
+        shutdown_frame = tk.Frame(content, bg=ModernTheme.DARK['bg'])
+        shutdown_frame.pack(fill=tk.X, padx=20, pady=5)
+        
+        tk.Label(shutdown_frame, text="Warn players (seconds):",
+                bg=ModernTheme.DARK['bg'], fg=ModernTheme.DARK['text'],
+                font=('Segoe UI', 10)).pack(side=tk.LEFT)
+        
+        self.shutdown_countdown = tk.Spinbox(shutdown_frame, from_=0, to=600, increment=5,
+                                            bg=ModernTheme.DARK['surface_light'],
+                                            fg=ModernTheme.DARK['text'],
+                                            font=('Segoe UI', 10), width=6)
+        self.shutdown_countdown.delete(0, tk.END)
+        self.shutdown_countdown.insert(0, self.app.prefs.get('shutdown_countdown', 10))
+        self.shutdown_countdown.pack(side=tk.LEFT, padx=10)
+        
+        tk.Label(shutdown_frame, text="save:",
+                bg=ModernTheme.DARK['bg'], fg=ModernTheme.DARK['text'],
+                font=('Segoe UI', 10)).pack(side=tk.LEFT)
+        
+        self.save_timeout = tk.Spinbox(shutdown_frame, from_=10, to=1800, increment=30,
+                                      bg=ModernTheme.DARK['surface_light'],
+                                      fg=ModernTheme.DARK['text'],
+                                      font=('Segoe UI', 10), width=6)
+        self.save_timeout.delete(0, tk.END)
+        self.save_timeout.insert(0, self.app.prefs.get('save_timeout', Config.SAVE_TIMEOUT))
+        self.save_timeout.pack(side=tk.LEFT, padx=10)
+        
+        tk.Label(shutdown_frame, text="SIGTERM grace:",
+                bg=ModernTheme.DARK['bg'], fg=ModernTheme.DARK['text'],
+                font=('Segoe UI', 10)).pack(side=tk.LEFT)
+        
+        self.term_timeout = tk.Spinbox(shutdown_frame, from_=5, to=600, increment=5,
+                                      bg=ModernTheme.DARK['surface_light'],
+                                      fg=ModernTheme.DARK['text'],
+                                      font=('Segoe UI', 10), width=6)
+        self.term_timeout.delete(0, tk.END)
+        self.term_timeout.insert(0, self.app.prefs.get('term_timeout', Config.TERM_TIMEOUT))
+        self.term_timeout.pack(side=tk.LEFT, padx=10)
+        
+        self.auto_restart = tk.BooleanVar(value=self.app.prefs.get('auto_restart', True))
+        tk.Checkbutton(content, text="Restart the server automatically after a crash",
+                      variable=self.auto_restart,
+                      bg=ModernTheme.DARK['bg'], fg=ModernTheme.DARK['text'],
+                      selectcolor=ModernTheme.DARK['surface_light'],
+                      font=('Segoe UI', 10)).pack(anchor='w', padx=20, pady=5)
+        
+        self.dynamic_distance = tk.BooleanVar(value=self.app.prefs.get('dynamic_distance', False))
+        tk.Checkbutton(content, text="Lower view/simulation distance while MSPT is high (Carpet or a configured command)",
+                      variable=self.dynamic_distance,
+                      bg=ModernTheme.DARK['bg'], fg=ModernTheme.DARK['text'],
+                      selectcolor=ModernTheme.DARK['surface_light'],
+                      font=('Segoe UI', 10)).pack(anchor='w', padx=20, pady=5)
+        
+        hibernate_frame = tk.Frame(content, bg=ModernTheme.DARK['bg'])
+        hibernate_frame.pack(fill=tk.X, padx=20, pady=5)
+        
+        self.hibernate = tk.BooleanVar(value=self.app.prefs.get('hibernate', False))
+        tk.Checkbutton(hibernate_frame, text="Hibernate when nobody is online for",
+                      variable=self.hibernate,
+                      bg=ModernTheme.DARK['bg'], fg=ModernTheme.DARK['text'],
+                      selectcolor=ModernTheme.DARK['surface_light'],
+                      font=('Segoe UI', 10)).pack(side=tk.LEFT)
+        
+        self.hibernate_minutes = tk.Spinbox(hibernate_frame, from_=1, to=1440, increment=5,
+                                           bg=ModernTheme.DARK['surface_light'],
+                                           fg=ModernTheme.DARK['text'],
+                                           font=('Segoe UI', 10), width=6)
+        self.hibernate_minutes.delete(0, tk.END)
+        self.hibernate_minutes.insert(0, self.app.prefs.get('hibernate_minutes', Config.HIBERNATE_IDLE_MINUTES))
+        self.hibernate_minutes.pack(side=tk.LEFT, padx=10)
+        
+        tk.Label(hibernate_frame, text="minutes (joining wakes it)",
+                bg=ModernTheme.DARK['bg'], fg=ModernTheme.DARK['text'],
+                font=('Segoe UI', 10)).pack(side=tk.LEFT)
+        
         # Paths
         self.create_section(content, "📁 Paths")
         
@@ -248,6 +352,27 @@ class PreferencesDialog:
         self.app.prefs.set('refresh_interval', int(self.refresh_interval.get()))
         self.app.prefs.set('console_lines', int(self.console_lines.get()))
         self.app.prefs.set('default_memory', self.default_memory.get())
+        self.app.prefs.set('start_timeout', int(self.start_timeout.get()))
+        self.app.prefs.set('stop_timeout', int(self.stop_timeout.get()))
+        self.app.prefs.set('shutdown_countdown', int(self.shutdown_countdown.get()))
+        self.app.prefs.set('save_timeout', int(self.save_timeout.get()))
+        self.app.prefs.set('term_timeout', int(self.term_timeout.get()))
+        self.app.prefs.set('auto_restart', self.auto_restart.get())
+        self.app.prefs.set('dynamic_distance', self.dynamic_distance.get())
+        self.app.prefs.set('hibernate', self.hibernate.get())
+        self.app.prefs.set('hibernate_minutes', int(self.hibernate_minutes.get()))
+        if self.app.server:
+            self.app.server.start_timeout = int(self.start_timeout.get())
+            self.app.server.stop_timeout = int(self.stop_timeout.get())
+            self.app.server.save_timeout = int(self.save_timeout.get())
+            self.app.server.term_timeout = int(self.term_timeout.get())
+            self.app.server.watchdog.auto_restart = self.auto_restart.get()
+            distance = self.app.server.distance
+            distance.enabled = self.dynamic_distance.get()
+            if not distance.enabled:
+                threading.Thread(target=distance.restore, daemon=True).start()
+            self.app.server.hibernation.enabled = self.hibernate.get()
+            self.app.server.hibernation.idle_minutes = int(self.hibernate_minutes.get())
         self.app.prefs.set('local_mods_path', self.mods_path.get())
         self.app.prefs.set('backup_path', self.backup_path.get())
         
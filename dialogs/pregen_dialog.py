@@ -0,0 +1,134 @@
+"""Chunk pre-generation dialog"""
+import tkinter as tk
+from tkinter import ttk, messagebox
+import threading
+from ui_components import ModernTheme, Card
+from chunk_pregen import describe
+
+WORLDS = ['minecraft:overworld', 'minecraft:the_nether', 'minecraft:the_end']
+
+class PregenDialog:
+    def __init__(self, parent, app):
+        self.app = app
+        self.pregen = app.server.pregen
+        self.dialog = tk.Toplevel(parent)
+        self.dialog.title("Pre-generate Chunks")
+        self.dialog.geometry("560x420")
+        self.dialog.configure(bg=ModernTheme.DARK['bg'])
+        self.dialog.transient(parent)
+        
+        self.create_ui()
+        self.refresh()
+    
+    def create_ui(self):
+        # Header
+        header = tk.Frame(self.dialog, bg=ModernTheme.DARK['surface'],
+                         highlightthickness=1, highlightbackground=ModernTheme.DARK['border'])
+        header.pack(fill=tk.X)
+        
+        tk.Label(header, text="🗺️ Pre-generate Chunks",
+                font=('Segoe UI', 18, 'bold'),
+                bg=ModernTheme.DARK['surface'],
+                fg=ModernTheme.DARK['accent']).pack(side=tk.LEFT, padx=20, pady=15)
+        
+        card = Card(self.dialog)
+        card.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        state = self.pregen.state or {}
+        fields = [
+            ("World:", 'world'),
+            ("Center X:", 'x'),
+            ("Center Z:", 'z'),
+            ("Radius (blocks):", 'radius'),
+            ("Method:", 'strategy'),
+        ]
+        defaults = {
+            'world': state.get('world', WORLDS[0]),
+            'x': state.get('center', [0, 0])[0],
+            'z': state.get('center', [0, 0])[1],
+            'radius': state.get('radius', 2000),
+            'strategy': 'auto',
+        }
+        self.entries = {}
+        for row, (label, key) in enumerate(fields):
+            tk.Label(card, text=label, bg=ModernTheme.DARK['surface'], fg=ModernTheme.DARK['text'],
+                    font=('Segoe UI', 10)).grid(row=row, column=0, sticky='w', padx=15, pady=5)
+            if key == 'world':
+                entry = ttk.Combobox(card, values=WORLDS, width=28)
+            elif key == 'strategy':
+                entry = ttk.Combobox(card, values=['auto', 'chunky', 'forceload'], state='readonly', width=28)
+            else:
+                entry = tk.Entry(card, bg=ModernTheme.DARK['surface_light'], fg=ModernTheme.DARK['text'],
+                                 font=('Segoe UI', 10), relief='flat', width=30)
+            if isinstance(entry, ttk.Combobox):
+                entry.set(defaults[key])
+            else:
+                entry.insert(0, str(defaults[key]))
+            entry.grid(row=row, column=1, sticky='w', padx=10, pady=5)
+            self.entries[key] = entry
+        
+        tk.Label(card, text="Uses Chunky when it is installed, otherwise batched forceload.\n"
+                           "Waits while players are online or TPS is low.",
+                bg=ModernTheme.DARK['surface'], fg=ModernTheme.DARK['text_secondary'],
+                font=('Segoe UI', 9), justify=tk.LEFT).grid(row=len(fields), column=0, columnspan=2,
+                                                            sticky='w', padx=15, pady=10)
+        
+        self.progress_label = tk.Label(card, text="", bg=ModernTheme.DARK['surface'],
+                                       fg=ModernTheme.DARK['success'], font=('Segoe UI', 10, 'bold'))
+        self.progress_label.grid(row=len(fields) + 1, column=0, columnspan=2, sticky='w', padx=15)
+        
+        # Buttons
+        btn_frame = tk.Frame(self.dialog, bg=ModernTheme.DARK['surface'],
+                            highlightthickness=1, highlightbackground=ModernTheme.DARK['border'])
+        btn_frame.pack(fill=tk.X, side=tk.BOTTOM)
+        
+        btn_container = tk.Frame(btn_frame, bg=ModernTheme.DARK['surface'])
+        btn_container.pack(pady=10)
+        
+        for text, command, color in [
+            ("▶️ Start", self.start, 'success'),
+            ("⏸️ Pause / Resume", self.toggle, 'accent'),
+            ("⏹️ Cancel Task", self.cancel, 'error'),
+            ("Close", self.dialog.destroy, 'surface_light'),
+        ]:
+            tk.Button(btn_container, text=text, command=command,
+                     bg=ModernTheme.DARK[color], fg='white',
+                     font=('Segoe UI', 10, 'bold'), relief='flat',
+                     padx=15, pady=8, cursor='hand2').pack(side=tk.LEFT, padx=5)
+    
+    def refresh(self):
+        if not self.dialog.winfo_exists():
+            return
+        self.progress_label.config(text=describe(self.pregen.progress()))
+        self.dialog.after(1000, self.refresh)
+    
+    def start(self):
+        try:
+            radius = int(self.entries['radius'].get())
+            center = (int(self.entries['x'].get()), int(self.entries['z'].get()))
+        except ValueError:
+            messagebox.showerror("Error", "Center and radius must be whole numbers")
+            return
+        world = self.entries['world'].get().strip() or WORLDS[0]
+        strategy = self.entries['strategy'].get()
+        
+        def run():
+            try:
+                self.pregen.start(radius, center, world, None if strategy == 'auto' else strategy)
+                self.app.log(f"🗺️ Pre-generating {radius} blocks around {center[0]}, {center[1]} "
+                             f"with {self.pregen.state['strategy']}")
+            except Exception as e:
+                self.app.log(f"❌ Could not start pre-generation: {e}")
+        
+        threading.Thread(target=run, daemon=True).start()
+    
+    def toggle(self):
+        state = self.pregen.state
+        if not state:
+            return
+        action = self.pregen.resume_task if state['status'] == 'held' else self.pregen.pause
+        threading.Thread(target=action, daemon=True).start()
+    
+    def cancel(self):
+        if self.pregen.state and messagebox.askyesno("Cancel", "Stop pre-generation and forget its progress?"):
+            threading.Thread(target=self.pregen.cancel, daemon=True).start()
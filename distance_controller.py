@@ -0,0 +1,191 @@
+"""View and simulation distance that follow the tick load"""
+import threading
+import time
+from collections import deque
+from paths import STATE_DIR
+
+ADJUST_LOG = f'{STATE_DIR}/distance.log'
+
+# Console commands that change the distances on a running server, {view} / {simulation} filled in.
+# Vanilla, Paper and Forge only read them from server.properties at startup.
+RUNTIME_COMMANDS = {
+    'carpet': ["carpet viewDistance {view}", "carpet simulationDistance {simulation}"],
+}
+
+class DistanceController:
+    """Lowers view/simulation distance while MSPT stays high and raises it back once there is headroom
+    
+    Fed by TickSampler samples. Distances drop after lower_after samples
+    averaging above high_mspt and only come back after raise_after samples
+    all below low_mspt, with a cooldown after every change so the effect
+    of one step shows up in MSPT before the next.
+    """
+    def __init__(self, server, view=(6, None), simulation=(4, None), high_mspt=45.0, low_mspt=30.0,
+                 lower_after=3, raise_after=12, cooldown=30, commands=None):
+        self.server = server
+        # (min, max), a max of None is whatever server.properties says
+        self.view_bounds = view
+        self.simulation_bounds = simulation
+        self.high_mspt = high_mspt
+        self.low_mspt = low_mspt
+        self.lower_after = lower_after
+        self.raise_after = raise_after
+        self.cooldown = cooldown
+        self.commands = commands
+        self.enabled = False
+        self.listeners = []
+        self.baseline = None
+        self.current = None
+        self.method = None
+        self.adjustments = deque(maxlen=200)
+        self._window = deque(maxlen=max(lower_after, raise_after))
+        self._changed = 0
+        self._pid = None
+        self._advised = False
+        self._lock = threading.Lock()
+    
+    def add_listener(self, callback):
+        """callback(event, info) for 'lowered', 'raised', 'reset' and 'unsupported'"""
+        self.listeners.append(callback)
+    
+    def _emit(self, event, info):
+        for callback in list(self.listeners):
+            try:
+                callback(event, info)
+            except Exception:
+                pass
+    
+    def _load(self):
+        """Distances from server.properties and how to change them on this server"""
+        output, _ = self.server.ssh.execute(
+            "grep -E '^(view-distance|simulation-distance)=' "
+            f"{self.server.mc_dir}/server.properties 2>/dev/null; "
+            f"ls {self.server.mc_dir}/mods 2>/dev/null | grep -i 'carpet.*\\.jar$'",
+            retry=True
+        )
+        props = dict(line.split('=', 1) for line in output.strip().split('\n') if '=' in line)
+        view = int(props['view-distance'].strip()) if props.get('view-distance', '').strip().isdigit() else 10
+        simulation = props.get('simulation-distance', '').strip()
+        # Before 1.18 there is no separate simulation distance, entities tick as far as chunks are sent
+        simulation = int(simulation) if simulation.isdigit() else view
+        self.baseline = (view, simulation)
+        self.current = self.baseline
+        if self.commands:
+            self.method = 'custom'
+        elif any(line.lower().endswith('.jar') for line in output.split('\n')):
+            self.method = 'carpet'
+        else:
+            self.method = None
+        self._pid = self.server.backend.status()['pid']
+    
+    def _bounds(self, bounds, baseline):
+        low, high = bounds
+        high = baseline if high is None else high
+        return min(low, high), high
+    
+    def on_sample(self, sample):
+        """TickSampler listener, decides whether this sample calls for a change"""
+        if not self.enabled:
+            return
+        mspt = sample.get('mspt')
+        if mspt is None:
+            # Only TPS known: a server below 20 TPS is overloaded, one at 20 says nothing about headroom
+            if sample['tps'] >= 19.5:
+                return
+            mspt = 1000 / max(sample['tps'], 1)
+        with self._lock:
+            self._window.append(dict(sample, mspt=mspt))
+            if time.monotonic() - self._changed < self.cooldown:
+                return
+            recent = list(self._window)[-self.lower_after:]
+            average = sum(s['mspt'] for s in recent) / len(recent)
+            if len(recent) == self.lower_after and average > self.high_mspt:
+                # Two steps at once when ticks already overrun 50ms and TPS is dropping
+                self._adjust(-2 if average >= 50 else -1, recent[-1], average)
+            elif len(self._window) >= self.raise_after and all(
+                    s['mspt'] < self.low_mspt for s in list(self._window)[-self.raise_after:]):
+                self._advised = False
+                self._adjust(1, sample, average)
+    
+    def _adjust(self, steps, sample, average):
+        if self.baseline is None:
+            self._load()
+        elif not self._same_server():
+            # Fresh JVM, judge it on its own samples
+            self._load()
+            self._window.clear()
+            return
+        view, simulation = self.current
+        view_min, view_max = self._bounds(self.view_bounds, self.baseline[0])
+        sim_min, sim_max = self._bounds(self.simulation_bounds, self.baseline[1])
+        for _ in range(abs(steps)):
+            if steps < 0:
+                # Simulation distance is what the tick loop pays for, so it goes first
+                if simulation > sim_min:
+                    simulation -= 1
+                elif view > view_min:
+                    view -= 1
+                    simulation = min(simulation, view)
+            else:
+                # Back in the opposite order: view first, then simulation
+                if view < view_max:
+                    view += 1
+                elif simulation < min(sim_max, view):
+                    simulation += 1
+        if (view, simulation) == self.current:
+            return
+        
+        info = {'view': view, 'simulation': simulation, 'previous': self.current,
+                'mspt': sample['mspt'], 'average_mspt': average, 'tps': sample['tps'],
+                'time': sample['time']}
+        if not self.method:
+            # Nothing to apply it with, say so once per spell of high load
+            if steps < 0 and not self._advised:
+                self._advised = True
+                self._emit('unsupported', info)
+            return
+        
+        if self.current == self.baseline:
+            # The JVM these distances belong to, a different pid later means they were reset
+            self._pid = self.server.backend.status()['pid']
+        templates = RUNTIME_COMMANDS.get(self.method) or self.commands
+        self.server.send_commands([t.format(view=view, simulation=simulation) for t in templates])
+        event = 'lowered' if steps < 0 else 'raised'
+        self.current = (view, simulation)
+        self._changed = time.monotonic()
+        # The next step is judged only on samples taken under the new distances
+        self._window.clear()
+        self.adjustments.append(dict(info, event=event))
+        self.server.ssh.execute(
+            f"mkdir -p {self.server.mc_dir}/{STATE_DIR} && echo '{time.strftime('%Y-%m-%d %H:%M:%S')} "
+            f"{event} view {info['previous'][0]}->{view} simulation {info['previous'][1]}->{simulation} "
+            f"mspt {sample['mspt']:.1f} avg {average:.1f} tps {sample['tps']:.1f}' "
+            f">> {self.server.mc_dir}/{ADJUST_LOG}"
+        )
+        self._emit(event, info)
+    
+    def _same_server(self):
+        """False after a restart, which puts the distances back to server.properties"""
+        if self.current == self.baseline:
+            return True
+        pid = self.server.backend.status()['pid']
+        if pid == self._pid:
+            return True
+        self._emit('reset', {'view': self.baseline[0], 'simulation': self.baseline[1],
+                             'previous': self.current})
+        return False
+    
+    def restore(self):
+        """Put server.properties' distances back, e.g. when the controller is switched off"""
+        with self._lock:
+            if not self.method or self.current in (None, self.baseline):
+                return
+            if not self._same_server():
+                self._load()
+                return
+            view, simulation = self.baseline
+            templates = RUNTIME_COMMANDS.get(self.method) or self.commands
+            self.server.send_commands([t.format(view=view, simulation=simulation) for t in templates])
+            self._emit('reset', {'view': view, 'simulation': simulation, 'previous': self.current})
+            self.current = self.baseline
+            self._window.clear()
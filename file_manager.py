@@ -1,17 +1,19 @@
 """File and backup management"""
 import os
 from datetime import datetime
+from transfer_engine import TransferEngine
 
 class FileManager:
     def __init__(self, ssh_manager, server_dir="/root/minecraft"):
         self.ssh = ssh_manager
         self.server_dir = server_dir
+        self.transfers = TransferEngine(ssh_manager)
     
     def list_directory(self, path=None):
         if path is None:
             path = self.server_dir
         
-        output, _ = self.ssh.execute(f"ls -lh {path} 2>/dev/null || echo ''")
+        output, _ = self.ssh.execute(f"ls -lh {path} 2>/dev/null || echo ''", retry=True)
         files = []
         
         for line in output.strip().split('\n')[1:]:
@@ -29,7 +31,8 @@ class FileManager:
     
     def get_logs(self, lines=100):
         output, _ = self.ssh.execute(
-            f"tail -{lines} {self.server_dir}/logs/latest.log 2>/dev/null || echo 'No logs found'"
+            f"tail -{lines} {self.server_dir}/logs/latest.log 2>/dev/null || echo 'No logs found'",
+            retry=True
         )
         return output
     
@@ -38,20 +41,34 @@ class FileManager:
         self.ssh.execute(f"echo '' > {self.server_dir}/logs/latest.log")
         return True
     
-    def backup_world(self, world_name='world'):
+    def backup_world(self, world_name='world', progress=None):
+        """Archive a world, progress(done, total) is called as tar lists each entry"""
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         backup_name = f"backup_{world_name}_{timestamp}.tar.gz"
         backup_path = f"/root/backups/{backup_name}"
         
-        self.ssh.execute("mkdir -p /root/backups")
-        self.ssh.execute(
-            f"cd {self.server_dir} && tar -czf {backup_path} {world_name}/ 2>/dev/null"
+        output, _ = self.ssh.execute(
+            f"mkdir -p /root/backups && cd {self.server_dir} && find {world_name}/ 2>/dev/null | wc -l"
+        )
+        total = int(output.strip() or 0)
+        done = [0]
+        
+        def on_line(stream, line):
+            if stream == 'stdout':
+                done[0] += 1
+                if progress:
+                    progress(done[0], total)
+        
+        # No timeout: large worlds take far longer than a normal command
+        self.ssh.execute_live(
+            f"cd {self.server_dir} && tar -czvf {backup_path} {world_name}/ 2>/dev/null",
+            on_line
         )
         
         return backup_name
     
     def list_backups(self):
-        output, _ = self.ssh.execute("ls -lh /root/backups/*.tar.gz 2>/dev/null || echo ''")
+        output, _ = self.ssh.execute("ls -lh /root/backups/*.tar.gz 2>/dev/null || echo ''", retry=True)
         backups = []
         
         for line in output.strip().split('\n'):
@@ -72,14 +89,8 @@ class FileManager:
         )
         return True
     
-    def download_file(self, remote_path, local_path):
-        sftp = self.ssh.get_sftp()
-        sftp.get(remote_path, local_path)
-        sftp.close()
-        return True
+    def download_file(self, remote_path, local_path, progress=None):
+        return self.transfers.download(remote_path, local_path, progress=progress)
     
-    def upload_file(self, local_path, remote_path):
-        sftp = self.ssh.get_sftp()
-        sftp.put(local_path, remote_path)
-        sftp.close()
-        return True
+    def upload_file(self, local_path, remote_path, progress=None):
+        return self.transfers.upload(local_path, remote_path, progress=progress)
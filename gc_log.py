@@ -0,0 +1,182 @@
+"""GC pause times, allocation and promotion rates from the JVM's GC log"""
+import os
+import re
+import threading
+from collections import deque
+from jvm_profiles import GC_LOG, MIB
+
+# Most new bytes read per poll, older output past this is skipped
+MAX_FETCH = 2 * MIB
+PAUSE_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, float('inf'))
+
+_ROTATED = '---gc-log-rotated---'
+_UPTIME = re.compile(r'\[(\d+(?:\.\d+)?)s\]')
+# Unified logging (JDK 9+): "GC(12) Pause Young (Normal) (G1 Evacuation Pause) 1024M->256M(4096M) 12.345ms",
+# ZGC and Shenandoah pauses have no heap figures and generational ZGC puts "Y: " / "O: " in front
+_PAUSE = re.compile(r'GC\((\d+)\) (?:[YO]: )?(Pause .*?)\s+'
+                    r'(?:(\d+)M->(\d+)M\((\d+)M\)\s+)?(\d+(?:\.\d+)?)ms\s*$')
+_OLD_REGIONS = re.compile(r'GC\((\d+)\) Old regions: (\d+)->(\d+)')
+_REGION_SIZE = re.compile(r'Heap [Rr]egion [Ss]ize: (\d+)M')
+# JDK 8 -Xloggc: "12.345: [GC pause (G1 Evacuation Pause) (young), 0.0123456 secs]"
+_LEGACY_PAUSE = re.compile(r'(\d+\.\d+): \[(Full GC|GC)[^\]]*?, (\d+\.\d+) secs\]')
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else None
+
+class GcLog:
+    """Follows logs/gc.log across polls, reading only bytes written since the last one
+    
+    Figures cover the running JVM. When its uptime goes backwards a new
+    JVM has started, and the old figures move to 'previous' so a launch
+    change can be compared with the run before it.
+    """
+    def __init__(self, ssh_manager, minecraft_dir="/root/minecraft", keep=5000):
+        self.ssh = ssh_manager
+        self.mc_dir = minecraft_dir
+        self.pauses = deque(maxlen=keep)
+        self.previous = None
+        self._inode = ''
+        self._offset = 0
+        self._partial = ''
+        self._region_mb = None
+        self._old_delta = {}
+        self._last_uptime = 0.0
+        self._lock = threading.Lock()
+    
+    def _fetch_script(self):
+        directory, name = os.path.split(GC_LOG)
+        return '\n'.join([
+            f"cd {self.mc_dir}/{directory} 2>/dev/null || exit 0",
+            # JDK 8 rotation writes to gc.log.N.current instead
+            f"log={name}; [ -e $log ] || log=$(ls {name}.*.current 2>/dev/null | head -n 1)",
+            "set -- $(stat -c '%i %s' \"${log:-none}\" 2>/dev/null || echo '- 0')",
+            f"from={self._offset}",
+            f"if [ \"$1\" != '{self._inode}' ]; then",
+            # Rotated since the last poll: finish the old file, then read the new one from the start
+            f"  for f in {name}*; do",
+            f"    [ \"$(stat -c %i \"$f\" 2>/dev/null)\" = '{self._inode}' ] && tail -c +$((from + 1)) \"$f\"",
+            "  done",
+            "  from=0",
+            "elif [ \"$2\" -lt \"$from\" ]; then from=0; fi",
+            f"skip=0; [ $(( $2 - from )) -gt {MAX_FETCH} ] && from=$(( $2 - {MAX_FETCH} )) && skip=1",
+            f"echo; echo '{_ROTATED}'",
+            "echo \"$1 $2 $skip\"",
+            "[ \"$2\" -gt \"$from\" ] && tail -c +$((from + 1)) \"$log\" | head -c $(( $2 - from ))",
+            "exit 0",
+        ])
+    
+    def poll(self):
+        """Read what the JVM logged since the last poll, returns summary()"""
+        output, _ = self.ssh.execute(self._fetch_script(), retry=True)
+        old, marker, rest = output.partition(f'{_ROTATED}\n')
+        if not marker:
+            return self.summary()
+        header, _, new = rest.partition('\n')
+        parts = header.split()
+        if len(parts) != 3:
+            return self.summary()
+        inode, size, skipped = parts
+        
+        with self._lock:
+            if inode != self._inode:
+                # The rotated file is complete, whatever is left of it ends with a full line
+                self._parse_lines((self._partial + old).split('\n'))
+                self._partial = ''
+            lines = (self._partial + new).split('\n')
+            if skipped == '1':
+                # Started mid-line after skipping ahead
+                lines = lines[1:]
+            self._partial = lines.pop() if lines else ''
+            self._parse_lines(lines)
+            self._inode, self._offset = inode, int(size)
+        return self.summary()
+    
+    def _parse_lines(self, lines):
+        for line in lines:
+            uptime = _UPTIME.search(line)
+            if uptime:
+                self._see_uptime(float(uptime.group(1)))
+            match = _REGION_SIZE.search(line)
+            if match:
+                self._region_mb = int(match.group(1))
+                continue
+            match = _OLD_REGIONS.search(line)
+            if match:
+                self._old_delta[match.group(1)] = int(match.group(3)) - int(match.group(2))
+                continue
+            match = _PAUSE.search(line)
+            if match and uptime:
+                kind = match.group(2).strip()
+                old_delta = self._old_delta.pop(match.group(1), None)
+                self.pauses.append({
+                    'uptime': float(uptime.group(1)),
+                    'kind': kind,
+                    'ms': float(match.group(6)),
+                    'before_mb': int(match.group(3)) if match.group(3) else None,
+                    'after_mb': int(match.group(4)) if match.group(4) else None,
+                    'heap_mb': int(match.group(5)) if match.group(5) else None,
+                    # Old generation growth across a young pause is what got promoted, mixed
+                    # pauses also collect old regions so they say nothing about it
+                    'promoted_mb': old_delta * self._region_mb
+                    if old_delta is not None and self._region_mb and 'Young' in kind and 'Mixed' not in kind
+                    else None,
+                })
+                continue
+            match = _LEGACY_PAUSE.search(line)
+            if match:
+                self._see_uptime(float(match.group(1)))
+                self.pauses.append({'uptime': float(match.group(1)), 'kind': match.group(2),
+                                    'ms': float(match.group(3)) * 1000, 'before_mb': None,
+                                    'after_mb': None, 'heap_mb': None, 'promoted_mb': None})
+    
+    def _see_uptime(self, uptime):
+        if uptime + 1 < self._last_uptime:
+            # A new JVM, keep the last run's figures to compare against
+            if self.pauses:
+                self.previous = self._summarize(list(self.pauses))
+            self.pauses.clear()
+            self._old_delta.clear()
+            self._region_mb = None
+        self._last_uptime = uptime
+    
+    def _summarize(self, pauses):
+        times = [p['ms'] for p in pauses]
+        summary = {
+            'count': len(pauses),
+            'p50_ms': _percentile(times, 50),
+            'p99_ms': _percentile(times, 99),
+            'max_ms': max(times) if times else None,
+            'total_ms': sum(times),
+            'alloc_mb_s': None,
+            'promo_mb_s': None,
+            'histogram': [0] * len(PAUSE_BUCKETS_MS),
+        }
+        for ms in times:
+            summary['histogram'][next(i for i, bound in enumerate(PAUSE_BUCKETS_MS) if ms <= bound)] += 1
+        
+        sized = [p for p in pauses if p['before_mb'] is not None]
+        if len(sized) >= 2 and sized[-1]['uptime'] > sized[0]['uptime']:
+            span = sized[-1]['uptime'] - sized[0]['uptime']
+            # Whatever the heap grew by between one collection and the next was allocated
+            allocated = sum(max(0, current['before_mb'] - last['after_mb'])
+                            for last, current in zip(sized, sized[1:]))
+            summary['alloc_mb_s'] = allocated / span
+            promoted = [p['promoted_mb'] for p in sized[1:] if p['promoted_mb'] is not None]
+            if promoted:
+                summary['promo_mb_s'] = max(0, sum(promoted)) / span
+        return summary
+    
+    def summary(self):
+        """Pause percentiles and histogram plus MB/s rates for the running JVM, and 'previous' for the last one"""
+        with self._lock:
+            summary = self._summarize(list(self.pauses))
+            summary['uptime'] = self._last_uptime
+            summary['previous'] = self.previous
+        return summary
+    
+    def histogram(self):
+        """[{'le_ms', 'count'}] of the running JVM's pauses"""
+        counts = self.summary()['histogram']
+        return [{'le_ms': None if bound == float('inf') else bound, 'count': count}
+                for bound, count in zip(PAUSE_BUCKETS_MS, counts)]
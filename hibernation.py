@@ -0,0 +1,373 @@
+"""Stop an idle server and wake it again when someone tries to join"""
+import shlex
+import threading
+import time
+from collections import deque
+from paths import STATE_DIR
+from server_ping import PingError
+
+LISTENER_FILE = f'{STATE_DIR}/hibernate.py'
+LISTENER_PID = f'{STATE_DIR}/hibernate.pid'
+LISTENER_LOG = f'{STATE_DIR}/hibernate.log'
+WAKE_SCRIPT = f'{STATE_DIR}/wake.sh'
+
+# Runs detached on the server host in place of the game while it sleeps, so it
+# needs nothing from the app. Answers Server List Ping with the sleeping MOTD,
+# turns the first login away with the kick message, then launches the server
+# with the backend's launch script in wake.sh and exits. It does the same when it
+# cannot bind the port, so the server never stays down with nobody listening.
+# Everything it does goes to stdout, one "kind details" line each.
+LISTENER = r'''
+import json, os, socket, subprocess, sys, time
+
+host, port, motd, kick, pidfile, wake = sys.argv[1], int(sys.argv[2]), sys.argv[3], sys.argv[4], sys.argv[5], sys.argv[6]
+with open(pidfile, 'w') as f:
+    f.write(str(os.getpid()))
+
+def launch():
+    print('launched', subprocess.call(['bash', wake]), flush=True)
+    os.remove(pidfile)
+
+def recv_exact(sock, count):
+    data = b''
+    while len(data) < count:
+        chunk = sock.recv(count - len(data))
+        if not chunk:
+            raise EOFError
+        data += chunk
+    return data
+
+def read_varint(sock):
+    value = 0
+    for shift in range(0, 35, 7):
+        byte = recv_exact(sock, 1)[0]
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value
+    raise ValueError('VarInt too long')
+
+def unpack_varint(data, offset):
+    value = 0
+    for shift in range(0, 35, 7):
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, offset
+    raise ValueError('VarInt too long')
+
+def unpack_string(data, offset):
+    length, offset = unpack_varint(data, offset)
+    return data[offset:offset + length].decode('utf-8', 'ignore'), offset + length
+
+def varint(value):
+    value &= 0xFFFFFFFF
+    out = b''
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out += bytes([byte | 0x80])
+        else:
+            return out + bytes([byte])
+
+def send(sock, packet_id, payload=b''):
+    body = varint(packet_id) + payload
+    sock.sendall(varint(len(body)) + body)
+
+def read_packet(sock):
+    data = recv_exact(sock, read_varint(sock))
+    packet_id, offset = unpack_varint(data, 0)
+    return packet_id, data, offset
+
+def text(value):
+    data = value.encode('utf-8')
+    return varint(len(data)) + data
+
+def handle(conn):
+    """Login name when a player tried to join, None for pings and junk"""
+    if conn.recv(1, socket.MSG_PEEK) == b'\xfe':
+        # Pre-1.7 ping, nothing to say to it
+        return None
+    _, data, offset = read_packet(conn)
+    protocol, offset = unpack_varint(data, offset)
+    if protocol >= 1 << 31:
+        protocol -= 1 << 32
+    _, offset = unpack_string(data, offset)
+    offset += 2
+    state, _ = unpack_varint(data, offset)
+    if state == 1:
+        read_packet(conn)
+        # The client's own protocol, so it shows the MOTD rather than "incompatible version"
+        status = {'version': {'name': 'Sleeping', 'protocol': protocol},
+                  'players': {'max': 0, 'online': 0}, 'description': {'text': motd}}
+        send(conn, 0x00, text(json.dumps(status)))
+        packet_id, data, offset = read_packet(conn)
+        if packet_id == 0x01:
+            send(conn, 0x01, data[offset:offset + 8])
+        print('ping', flush=True)
+        return None
+    packet_id, data, offset = read_packet(conn)
+    name = unpack_string(data, offset)[0] if packet_id == 0x00 else ''
+    send(conn, 0x00, text(json.dumps({'text': kick})))
+    return name or '-'
+
+server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+try:
+    server.bind((host, port))
+    server.listen(8)
+except OSError as e:
+    print('error', e, flush=True)
+    launch()
+    sys.exit(1)
+print('listening', flush=True)
+try:
+    while True:
+        conn, address = server.accept()
+        name = None
+        try:
+            conn.settimeout(5)
+            name = handle(conn)
+        except Exception:
+            pass
+        finally:
+            conn.close()
+        if name:
+            print('wake', name, address[0], time.time(), flush=True)
+            break
+finally:
+    server.close()
+launch()
+'''
+
+class Hibernator:
+    """Stops the server after idle_minutes without players and sleeps on its game port until a login
+    
+    Players are counted with Server List Ping every check_interval seconds.
+    The listener is detached on the host and launches the server itself with
+    the command ServerManager.prepare_launch gave, so a wake does not depend
+    on the app. The time from the login attempt to the server being ready is
+    kept in wakes.
+    """
+    def __init__(self, server, idle_minutes=15, check_interval=60,
+                 motd="Sleeping, join to wake it up", kick="The server is starting, join again in about {seconds}s"):
+        self.server = server
+        self.idle_minutes = idle_minutes
+        self.check_interval = check_interval
+        self.motd = motd
+        self.kick = kick
+        self.enabled = False
+        self.sleeping = False
+        self.listeners = []
+        self.wakes = deque(maxlen=50)
+        self.idle_since = None
+        self._released = False
+        self._stopped = threading.Event()
+        self._thread = None
+    
+    def add_listener(self, callback):
+        """callback(event, info) from the hibernation thread: sleeping, waking, awake, released, failed"""
+        self.listeners.append(callback)
+    
+    def _emit(self, event, info):
+        for callback in list(self.listeners):
+            try:
+                callback(event, info)
+            except Exception:
+                pass
+    
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Stop watching, a sleeping server's listener still wakes it on the next login"""
+        self._stopped.set()
+    
+    def average_wake(self):
+        return sum(w['seconds'] for w in self.wakes) / len(self.wakes) if self.wakes else None
+    
+    def _run(self):
+        try:
+            if self.listener_running():
+                # Put to sleep before this app (re)connected, keep following it
+                self.sleeping = True
+                try:
+                    self._watch()
+                finally:
+                    self.sleeping = False
+        except Exception as e:
+            self._emit('failed', {'reason': str(e)})
+        while not self._stopped.wait(self.check_interval):
+            if not self.enabled or self.sleeping:
+                self.idle_since = None
+                continue
+            try:
+                if self._idle_long_enough():
+                    self.hibernate()
+            except Exception as e:
+                self._emit('failed', {'reason': str(e)})
+    
+    def _idle_long_enough(self):
+        if not self.server.backend.status()['pid']:
+            # Stopped by someone else, only a server this put to sleep gets the listener
+            self.idle_since = None
+            return False
+        try:
+            online = self.server.ping()['online']
+        except PingError:
+            # Still starting or not answering, that is not the same as empty
+            return False
+        if online > 0:
+            self.idle_since = None
+            return False
+        if self.idle_since is None:
+            self.idle_since = time.monotonic()
+        task = self.server.pregen.state
+        if task and task['status'] in ('running', 'paused'):
+            # Pre-generation wants the server to itself, let it finish first
+            return False
+        return time.monotonic() - self.idle_since >= self.idle_minutes * 60
+    
+    def hibernate(self):
+        """Stop the server now and leave a listener on its port that starts it on the next login"""
+        output, _ = self.server.ssh.execute("command -v python3 && command -v setsid")
+        if len(output.split()) < 2:
+            # Checked before stopping, a server nobody can wake is worse than an idle one
+            self.enabled = False
+            self._emit('failed', {'reason': "python3 or setsid is missing on the host, hibernation is off"})
+            return
+        settings = self.server.connection_settings()
+        # Prepared while the server is still up, the listener launches exactly this
+        plan, cds_mode, command = self.server.prepare_launch()
+        self.server.stop(action="hibernating")
+        self.sleeping = True
+        try:
+            self._listen(settings, self.server.backend.launch_script(command), cds_mode)
+            self._watch(plan)
+        finally:
+            self.sleeping = False
+            self.idle_since = None
+    
+    def _listen(self, settings, wake_script, cds_mode):
+        mc_dir = self.server.mc_dir
+        # connection_settings reports an empty server-ip as loopback, the game listens on every interface then
+        host = '' if settings['host'] == '127.0.0.1' else settings['host']
+        average = self.average_wake()
+        kick = self.kick.format(seconds=round(average) if average else 60)
+        args = ' '.join(shlex.quote(str(arg)) for arg in [
+            f'{mc_dir}/{LISTENER_FILE}', host, settings['server_port'], self.motd, kick,
+            f'{mc_dir}/{LISTENER_PID}', f'{mc_dir}/{WAKE_SCRIPT}'])
+        self._released = False
+        self.server.ssh.execute(
+            f"mkdir -p {mc_dir}/{STATE_DIR} && cat > {mc_dir}/{LISTENER_FILE} << 'MSM_EOF'\n{LISTENER}\nMSM_EOF\n"
+            f"cat > {mc_dir}/{WAKE_SCRIPT} << 'MSM_EOF'\n{wake_script}\nMSM_EOF\n"
+            # The log starts with the CDS mode so a later session can still record the boot
+            f"echo 'cds {cds_mode}' > {mc_dir}/{LISTENER_LOG}\n"
+            # Its own session, so it outlives this connection and the app
+            f"setsid nohup python3 -u {args} >> {mc_dir}/{LISTENER_LOG} 2>&1 < /dev/null &\n"
+            f"for i in $(seq 50); do [ -s {mc_dir}/{LISTENER_PID} ] && break; sleep 0.1; done"
+        )
+    
+    def _follow_script(self):
+        mc_dir = self.server.mc_dir
+        # Replays the whole log and ends when the listener exits
+        return (f"pid=$(cat {mc_dir}/{LISTENER_PID} 2>/dev/null); "
+                f"if [ -n \"$pid\" ] && [ -d /proc/$pid ]; then "
+                f"exec tail -n +1 -s 0.2 --pid=$pid -f {mc_dir}/{LISTENER_LOG}; "
+                f"else cat {mc_dir}/{LISTENER_LOG} 2>/dev/null; fi")
+    
+    def listener_running(self):
+        mc_dir = self.server.mc_dir
+        output, _ = self.server.ssh.execute(
+            f"pid=$(cat {mc_dir}/{LISTENER_PID} 2>/dev/null); "
+            f"[ -n \"$pid\" ] && grep -q hibernate /proc/$pid/cmdline 2>/dev/null && echo yes"
+        )
+        return output.strip() == 'yes'
+    
+    def _watch(self, plan=None):
+        """Follow the listener until it exits, then see the server it launched through startup"""
+        position = self.server.logs.position()
+        announced = False
+        while True:
+            lines = []
+            stream = None
+            try:
+                # Unpooled, the listener can be up for days
+                stream = self.server.ssh.execute_stream(self._follow_script(), pooled=False)
+                for name, line in stream:
+                    if self._stopped.is_set():
+                        # Closing the app, the listener wakes the server without it
+                        return
+                    if name != 'stdout':
+                        continue
+                    lines.append(line)
+                    kind, _, rest = line.partition(' ')
+                    if kind == 'listening' and not announced:
+                        announced = True
+                        self._emit('sleeping', {'port': self.server.connection_settings()['server_port']})
+                    elif kind == 'error':
+                        self._emit('failed', {'reason': f"could not listen on the game port ({rest}), "
+                                                        "starting the server again"})
+                    elif kind == 'wake':
+                        self._emit('waking', {'player': rest.split(' ')[0]})
+                break
+            except Exception:
+                # Link dropped, the listener does not need it; pick the log up again after reconnecting
+                if self._stopped.wait(5):
+                    return
+            finally:
+                if stream:
+                    stream.close()
+        
+        if self._released:
+            self._emit('released', {})
+            return
+        fields = {line.partition(' ')[0]: line.partition(' ')[2] for line in lines}
+        self.sleeping = False
+        if 'launched' not in fields:
+            # Killed some other way (host reboot, by hand), start it from here instead
+            self._emit('waking', {'player': None})
+            self._woken(None, None, self.server.start())
+            return
+        if fields['launched'].strip() != '0':
+            self._emit('failed', {'reason': f"the wake launch exited with {fields['launched'].strip()}"})
+            return
+        wake = fields.get('wake', '').split(' ')
+        player = wake[0] if len(wake) == 3 else None
+        status = self.server.wait_ready(position, time.monotonic(), plan, fields.get('cds'))
+        woke_at = float(wake[2]) if len(wake) == 3 else None
+        self._woken(player, woke_at, status)
+    
+    def _woken(self, player, woke_at, status):
+        """Report a wake, timed on the host's clock from the login attempt when there was one"""
+        info = {'player': player, 'ready': status['ready'], 'seconds': None, 'boot_seconds': status['seconds']}
+        if status['ready']:
+            if woke_at is not None:
+                output, _ = self.server.ssh.execute("date +%s.%N")
+                try:
+                    info['seconds'] = float(output.strip()) - woke_at
+                except ValueError:
+                    pass
+            if info['seconds'] is not None:
+                self.wakes.append({'time': time.time(), 'player': player, 'seconds': info['seconds']})
+            info['average'] = self.average_wake()
+            self._emit('awake', info)
+        else:
+            info['reason'] = status['line'] or status['event']
+            self._emit('failed', info)
+    
+    def release(self):
+        """Free the game port for a start that did not come from a wake"""
+        if self.sleeping:
+            self._released = True
+        mc_dir = self.server.mc_dir
+        self.server.ssh.execute(
+            f"pid=$(cat {mc_dir}/{LISTENER_PID} 2>/dev/null); "
+            f"[ -n \"$pid\" ] && grep -q hibernate /proc/$pid/cmdline 2>/dev/null && kill $pid; "
+            f"rm -f {mc_dir}/{LISTENER_PID}"
+        )
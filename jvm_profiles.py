@@ -0,0 +1,196 @@
+"""JVM launch profiles and heap sizing from the host's RAM and cores"""
+import re
+import shlex
+
+GIB = 1024 ** 3
+MIB = 1024 ** 2
+
+# Relative to the server directory, rotated into gc.log.0 .. gc.log.4 by the JVM
+GC_LOG = 'logs/gc.log'
+
+# Aikar's G1 flags, the usual baseline for Paper/Fabric/Forge servers
+_AIKAR = [
+    '-XX:+UseG1GC', '-XX:+ParallelRefProcEnabled', '-XX:MaxGCPauseMillis=200',
+    '-XX:+UnlockExperimentalVMOptions', '-XX:+DisableExplicitGC', '-XX:+AlwaysPreTouch',
+    '-XX:G1HeapWastePercent=5', '-XX:G1MixedGCCountTarget=4',
+    '-XX:G1MixedGCLiveThresholdPercent=90', '-XX:G1RSetUpdatingPauseTimePercent=5',
+    '-XX:SurvivorRatio=32', '-XX:+PerfDisableSharedMem', '-XX:MaxTenuringThreshold=1',
+]
+# Young generation sizing, Aikar uses the second set from 12G heaps up
+_AIKAR_SMALL = [
+    '-XX:G1NewSizePercent=30', '-XX:G1MaxNewSizePercent=40', '-XX:G1HeapRegionSize=8M',
+    '-XX:G1ReservePercent=20', '-XX:InitiatingHeapOccupancyPercent=15',
+]
+_AIKAR_LARGE = [
+    '-XX:G1NewSizePercent=40', '-XX:G1MaxNewSizePercent=50', '-XX:G1HeapRegionSize=16M',
+    '-XX:G1ReservePercent=15', '-XX:InitiatingHeapOccupancyPercent=20',
+]
+
+PROFILES = {
+    'g1': {
+        'label': 'G1 tuned (Aikar)',
+        'description': 'Short, predictable pauses on any heap size, the safe choice',
+        'min_java': 8,
+        'min_cores': 1,
+    },
+    'zgc': {
+        'label': 'ZGC',
+        'description': 'Sub-millisecond pauses for big modpack heaps, needs spare cores and RAM',
+        'min_java': 17,
+        'min_cores': 4,
+    },
+    'shenandoah': {
+        'label': 'Shenandoah',
+        'description': 'Concurrent compaction with low pauses, needs an OpenJDK build that ships it',
+        'min_java': 11,
+        'min_cores': 4,
+    },
+    'legacy': {
+        'label': 'Plain (no tuning)',
+        'description': 'Just -Xmx/-Xms like older releases of this manager',
+        'min_java': 8,
+        'min_cores': 1,
+    },
+}
+
+DEFAULT_PROFILE = 'g1'
+
+def parse_memory(text):
+    """'6G' / '512M' / '6144' (MiB) -> bytes, None for 'auto' or anything unreadable"""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([gGmM]?)[bB]?\s*', str(text or ''))
+    if not match:
+        return None
+    value = float(match.group(1))
+    return int(value * (GIB if match.group(2).lower() == 'g' else MIB))
+
+def format_memory(size):
+    """bytes -> the -Xmx style '6G' or '6656M'"""
+    mib = size // MIB
+    return f"{mib // 1024}G" if mib % 1024 == 0 else f"{mib}M"
+
+def java_major(version_line):
+    """'openjdk version "21.0.2"' -> 21, '"1.8.0_392"' -> 8"""
+    match = re.search(r'version "(\d+)(?:\.(\d+))?', version_line or '')
+    if not match:
+        return None
+    major = int(match.group(1))
+    return int(match.group(2) or 0) if major == 1 else major
+
+def probe_host(ssh):
+    """Cores, RAM, huge page setup and the java version in one remote call"""
+    output, _ = ssh.execute(
+        "echo \"cores $(nproc)\"; "
+        "grep -E '^(MemTotal|HugePages_Total|HugePages_Free|Hugepagesize):' /proc/meminfo; "
+        "echo \"thp $(cat /sys/kernel/mm/transparent_hugepage/enabled 2>/dev/null)\"; "
+        "echo \"java $(java -version 2>&1 | head -n 1)\"",
+        retry=True
+    )
+    raw = {}
+    for line in output.split('\n'):
+        parts = line.split(None, 1)
+        if parts:
+            raw[parts[0].rstrip(':')] = parts[1].strip() if len(parts) > 1 else ''
+    
+    def kib(key):
+        value = raw.get(key, '').split()
+        return int(value[0]) * 1024 if value and value[0].isdigit() else 0
+    
+    huge_pages = raw.get('HugePages_Total', '0')
+    # The bracketed word is the active mode: [always] madvise never
+    thp = re.search(r'\[(\w+)\]', raw.get('thp', ''))
+    return {
+        'cores': int(raw.get('cores') or 1),
+        'mem_total': kib('MemTotal'),
+        'huge_pages': int(huge_pages) if huge_pages.isdigit() else 0,
+        'huge_page_size': kib('Hugepagesize'),
+        'thp': thp.group(1) if thp else None,
+        'java': raw.get('java', ''),
+        'java_major': java_major(raw.get('java', '')),
+    }
+
+def recommend_profile(host):
+    """G1 unless the host has the cores and Java for a concurrent collector on a large heap"""
+    major = host.get('java_major') or 0
+    if host['cores'] >= PROFILES['zgc']['min_cores'] and major >= 21 and host['mem_total'] >= 12 * GIB:
+        return 'zgc'
+    return 'g1'
+
+def auto_heap(host, profile=DEFAULT_PROFILE):
+    """Largest heap that leaves the OS, metaspace and native buffers room to breathe"""
+    total = host['mem_total'] or 4 * GIB
+    # The JVM itself needs memory outside the heap, more with concurrent collectors
+    reserve = max(int(1.5 * GIB), total // 5)
+    if profile in ('zgc', 'shenandoah'):
+        reserve = max(reserve, total // 4)
+    heap = total - reserve
+    if profile != 'zgc':
+        # Past ~31G the JVM loses compressed object pointers
+        heap = min(heap, 31 * GIB)
+    # Round down to 512M so the flag stays readable
+    heap -= heap % (512 * MIB)
+    return max(heap, GIB)
+
+def plan_launch(host, profile=DEFAULT_PROFILE, memory=None, gc_log=True):
+    """Work out the java arguments for a profile on this host
+    
+    Returns {'profile', 'heap', 'args', 'notes'}. memory is a -Xmx style
+    string; None or 'auto' sizes the heap from the host.
+    """
+    notes = []
+    if profile not in PROFILES:
+        notes.append(f"Unknown profile {profile}, using {DEFAULT_PROFILE}")
+        profile = DEFAULT_PROFILE
+    major = host.get('java_major')
+    wanted = PROFILES[profile]
+    if major and major < wanted['min_java']:
+        notes.append(f"{wanted['label']} needs Java {wanted['min_java']}+, found {major}, using G1")
+        profile = 'g1'
+    elif host['cores'] < wanted['min_cores']:
+        notes.append(f"{wanted['label']} wants {wanted['min_cores']}+ cores, this host has {host['cores']}")
+    
+    limit = auto_heap(host, profile)
+    heap = parse_memory(memory)
+    if heap is None:
+        heap = limit
+    elif host['mem_total'] and heap > limit:
+        notes.append(f"{format_memory(heap)} leaves too little for the OS, capped at {format_memory(limit)}")
+        heap = limit
+    
+    # Xms = Xmx so the heap is committed once instead of grown and shrunk under load
+    size = format_memory(heap)
+    args = ['java', f'-Xms{size}', f'-Xmx{size}']
+    if profile == 'g1':
+        args += _AIKAR + (_AIKAR_LARGE if heap >= 12 * GIB else _AIKAR_SMALL)
+        args += ['-Dusing.aikars.flags=https://mcflags.emc.gs', '-Daikars.new.flags=true']
+    elif profile == 'zgc':
+        args += ['-XX:+UseZGC', '-XX:+AlwaysPreTouch', '-XX:+DisableExplicitGC',
+                 '-XX:+PerfDisableSharedMem']
+        if major and 21 <= major < 23:
+            # Generational ZGC is opt-in on 21 and 22, the default afterwards
+            args.append('-XX:+ZGenerational')
+        # ZGC runs its work next to the game, keep a couple of cores free for ticks
+        args.append(f'-XX:ConcGCThreads={max(1, host["cores"] // 4)}')
+    elif profile == 'shenandoah':
+        args += ['-XX:+UseShenandoahGC', '-XX:+AlwaysPreTouch', '-XX:+DisableExplicitGC',
+                 '-XX:+PerfDisableSharedMem', '-XX:+ParallelRefProcEnabled']
+    
+    if profile != 'legacy':
+        if host['huge_pages'] and host['huge_pages'] * host['huge_page_size'] >= heap:
+            args.append('-XX:+UseLargePages')
+        elif host['thp'] in ('madvise', 'always'):
+            args.append('-XX:+UseTransparentHugePages')
+        else:
+            notes.append("No huge pages on this host, large pages are off")
+    
+    if gc_log and profile != 'legacy':
+        if major and major >= 9:
+            args.append(f'-Xlog:gc*:file={GC_LOG}:time,uptime:filecount=5,filesize=10M')
+        elif major:
+            args += [f'-Xloggc:{GC_LOG}', '-XX:+PrintGCDetails', '-XX:+PrintGCDateStamps',
+                     '-XX:+UseGCLogFileRotation', '-XX:NumberOfGCLogFiles=5', '-XX:GCLogFileSize=10M']
+    
+    args += ['-jar', 'server.jar', 'nogui']
+    return {'profile': profile, 'heap': heap, 'args': args, 'notes': notes}
+
+def command_line(args):
+    return ' '.join(shlex.quote(arg) for arg in args)
@@ -0,0 +1,313 @@
+"""Run manager operations on this machine instead of over SSH"""
+import os
+import selectors
+import shutil
+import signal
+import socket
+import subprocess
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from command_metrics import CommandMetrics
+from ssh_manager import ChannelPool
+
+def _run_shell(command):
+    """Start command under /bin/sh in its own process group so a timeout can kill the whole pipeline"""
+    return subprocess.Popen(['/bin/sh', '-c', command], stdin=subprocess.DEVNULL,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            start_new_session=True)
+
+def _finish(process):
+    """Kill the process group if it is still running and close its pipes"""
+    if process.poll() is None:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        process.wait()
+    process.stdout.close()
+    process.stderr.close()
+
+def _read_process(process, timeout=None):
+    """Yield ('stdout'|'stderr', bytes) from both pipes until the process closes them
+    
+    timeout is how long the command may go without printing anything, as over SSH.
+    """
+    selector = selectors.DefaultSelector()
+    selector.register(process.stdout, selectors.EVENT_READ, 'stdout')
+    selector.register(process.stderr, selectors.EVENT_READ, 'stderr')
+    last_data = time.monotonic()
+    try:
+        while selector.get_map():
+            wait = None
+            if timeout is not None:
+                wait = last_data + timeout - time.monotonic()
+                if wait <= 0:
+                    raise TimeoutError(f"Command printed nothing for {timeout}s")
+            for key, _ in selector.select(wait):
+                last_data = time.monotonic()
+                data = os.read(key.fileobj.fileno(), 32768)
+                if not data:
+                    selector.unregister(key.fileobj)
+                    continue
+                yield key.data, data
+    finally:
+        selector.close()
+
+class LocalFile:
+    """A local file with the parts of paramiko's SFTPFile the managers use"""
+    def __init__(self, path, mode='r'):
+        if 'b' not in mode:
+            mode += 'b'
+        self._file = open(path, mode)
+    
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        return self._file.write(data)
+    
+    def readv(self, chunks):
+        for offset, size in chunks:
+            self._file.seek(offset)
+            yield self._file.read(size)
+    
+    def set_pipelined(self, pipelined=True):
+        pass
+    
+    def prefetch(self, file_size=None):
+        pass
+    
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+    
+    def __iter__(self):
+        return iter(self._file)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self._file.close()
+
+class LocalSFTP:
+    """Direct file I/O behind the subset of paramiko's SFTPClient the managers use"""
+    BLOCK_SIZE = 1024 * 1024
+    
+    def open(self, filename, mode='r', bufsize=-1):
+        return LocalFile(filename, mode)
+    
+    file = open
+    
+    def stat(self, path):
+        return os.stat(path)
+    
+    def lstat(self, path):
+        return os.lstat(path)
+    
+    def listdir(self, path='.'):
+        return os.listdir(path)
+    
+    def remove(self, path):
+        os.remove(path)
+    
+    unlink = remove
+    
+    def rename(self, oldpath, newpath):
+        os.rename(oldpath, newpath)
+    
+    def posix_rename(self, oldpath, newpath):
+        os.replace(oldpath, newpath)
+    
+    def mkdir(self, path, mode=0o777):
+        os.mkdir(path, mode)
+    
+    def rmdir(self, path):
+        os.rmdir(path)
+    
+    def chmod(self, path, mode):
+        os.chmod(path, mode)
+    
+    def get(self, remotepath, localpath, callback=None):
+        self._copy(remotepath, localpath, callback)
+    
+    def put(self, localpath, remotepath, callback=None, confirm=True):
+        self._copy(localpath, remotepath, callback)
+        return os.stat(remotepath)
+    
+    def _copy(self, source, target, callback):
+        total = os.path.getsize(source)
+        done = 0
+        with open(source, 'rb') as src, open(target, 'wb') as dst:
+            if not callback:
+                shutil.copyfileobj(src, dst, self.BLOCK_SIZE)
+                return
+            for block in iter(lambda: src.read(self.BLOCK_SIZE), b''):
+                dst.write(block)
+                done += len(block)
+                callback(done, total)
+    
+    def close(self):
+        pass
+
+class _LocalSessions:
+    """Stands in for SFTPPool, sessions are free so nothing is pooled"""
+    def __init__(self, size):
+        self.size = size
+        self.stats = {'opened': 0, 'reused': 0, 'discarded': 0}
+    
+    def invalidate(self):
+        pass
+
+class LocalBackend:
+    """Drop-in for SSHManager when the manager runs on the Minecraft host itself"""
+    # Nothing here can drop a link, so transfer and reconnect retries never trigger
+    LINK_ERRORS = ()
+    
+    def __init__(self, max_channels=8, sftp_sessions=4):
+        self.hostname = 'localhost'
+        self.username = os.environ.get('USER', '')
+        self.port = None
+        self.client = None
+        self.pool = ChannelPool(max_channels)
+        self.sftp_pool = _LocalSessions(sftp_sessions)
+        self.listeners = []
+        self.reconnects = 0
+        self.rtt = {'last': None, 'avg': None, 'min': None, 'max': None, 'samples': 0}
+        self.rtt_history = deque(maxlen=120)
+        self.metrics = CommandMetrics()
+        self._sftp = LocalSFTP()
+    
+    def connect(self):
+        self.client = self
+        return True
+    
+    def disconnect(self):
+        self.client = None
+    
+    def is_connected(self):
+        return self.client is not None
+    
+    def reconnect(self):
+        self.connect()
+    
+    def add_listener(self, callback):
+        """callback(event, info) is called from background threads"""
+        self.listeners.append(callback)
+    
+    def _emit(self, event, info):
+        for callback in list(self.listeners):
+            try:
+                callback(event, info)
+            except Exception:
+                pass
+    
+    def get_health(self):
+        return {
+            'connected': self.is_connected(),
+            'reconnects': self.reconnects,
+            'rtt': dict(self.rtt),
+            'pool': self.pool.get_stats(),
+        }
+    
+    def _check(self):
+        if not self.client:
+            raise Exception("Not connected")
+    
+    def execute(self, command, timeout=30, retry=False):
+        """Run a command through /bin/sh, returns (output, error)
+        
+        timeout bounds the wait for a pool slot and then each stretch
+        without output, like SSHManager.execute.
+        """
+        self._check()
+        with self.metrics.measure(command) as sample:
+            output, error, sample['exit_code'] = self._exec(command, timeout, sample)
+            return output, error
+    
+    def execute_many(self, commands, timeout=30, retry=False):
+        """Run several commands in order, returns [(output, error, exit_code), ...]"""
+        if not commands:
+            return []
+        self._check()
+        with self.metrics.measure(' ; '.join(commands), len(commands)) as sample:
+            results = [self._exec(command, timeout, sample) for command in commands]
+            sample['exit_code'] = [code for _, _, code in results]
+            return results
+    
+    def _exec(self, command, timeout, sample):
+        with self.pool.slot(timeout) as waited:
+            sample['queue_wait'] += waited
+            sample['bytes_out'] += len(command)
+            process = _run_shell(command)
+            out, err = [], []
+            try:
+                for stream, data in _read_process(process, timeout):
+                    (out if stream == 'stdout' else err).append(data)
+                    sample['bytes_in'] += len(data)
+                exit_code = process.wait()
+            finally:
+                _finish(process)
+        output = b''.join(out).decode('utf-8', errors='ignore')
+        error = b''.join(err).decode('utf-8', errors='ignore')
+        return output, error, exit_code
+    
+    def execute_stream(self, command, timeout=None, pooled=True):
+        """Yield (stream, line) as the command prints, the generator returns the exit code
+        
+        pooled=False skips the channel pool, for watchers that stay open for
+        the whole session and would otherwise hold a slot forever.
+        """
+        self._check()
+        with self.metrics.measure(command) as sample:
+            sample['kind'] = 'stream'
+            with (self.pool.slot(timeout) if pooled else nullcontext(0.0)) as waited:
+                sample['queue_wait'] = waited
+                sample['bytes_out'] = len(command)
+                process = _run_shell(command)
+                try:
+                    pending = {'stdout': b'', 'stderr': b''}
+                    for stream, data in _read_process(process, timeout):
+                        sample['bytes_in'] += len(data)
+                        pending[stream] += data
+                        *lines, pending[stream] = pending[stream].split(b'\n')
+                        for line in lines:
+                            yield stream, line.rstrip(b'\r').decode('utf-8', errors='ignore')
+                    
+                    for stream, rest in pending.items():
+                        if rest:
+                            yield stream, rest.rstrip(b'\r').decode('utf-8', errors='ignore')
+                    sample['exit_code'] = process.wait()
+                    return sample['exit_code']
+                finally:
+                    # Also runs when the caller stops iterating early
+                    _finish(process)
+    
+    def execute_live(self, command, on_line, timeout=None):
+        """Call on_line(stream, line) for each line of output, returns the exit code"""
+        stream = self.execute_stream(command, timeout)
+        while True:
+            try:
+                name, line = next(stream)
+            except StopIteration as done:
+                return done.value
+            on_line(name, line)
+    
+    def close_shell(self):
+        pass
+    
+    def open_tunnel(self, host, port, timeout=10):
+        """Same shape as SSHManager.open_tunnel, a plain TCP connection"""
+        self._check()
+        sock = socket.create_connection((host, port), timeout=timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+    
+    def get_sftp(self):
+        self._check()
+        return self._sftp
+    
+    @contextmanager
+    def sftp_session(self, timeout=60):
+        """Same shape as SSHManager.sftp_session, backed by plain file I/O"""
+        self._check()
+        yield self._sftp
@@ -0,0 +1,126 @@
+"""Follow logs/latest.log to tell when the server is really up or down"""
+import re
+import time
+from process_backends import pid_script
+
+# Checked in order, the first pattern that matches names the event
+EVENTS = [
+    ('crash', re.compile(
+        r"---- Minecraft Crash Report ----|This crash report has been saved to|"
+        r"Encountered an unexpected exception|Exception in server tick loop|"
+        r"Failed to start the minecraft server|FAILED TO BIND TO PORT|"
+        r"You need to agree to the EULA"
+    )),
+    ('done', re.compile(r"\]: Done \((\d+(?:\.\d+)?)s\)!")),
+    ('stopping', re.compile(r"\]: Stopping (the )?server")),
+    ('saving', re.compile(r"\]: Saving (worlds|chunks for level|players)")),
+    ('saved', re.compile(r"All (chunks|dimensions) are saved")),
+    # Answer to save-all
+    ('save_complete', re.compile(r"\]: Saved the game")),
+]
+
+# Printed by the follow script when java is gone before the log rotated
+_NO_PROCESS = '__MSM_NO_PROCESS__'
+
+def classify(line):
+    """Return (event, match) for a log line, or (None, None)"""
+    for event, pattern in EVENTS:
+        match = pattern.search(line)
+        if match:
+            return event, match
+    return None, None
+
+class LogWatcher:
+    def __init__(self, ssh_manager, minecraft_dir="/root/minecraft", process_pattern="java"):
+        self.ssh = ssh_manager
+        self.mc_dir = minecraft_dir
+        self.process_pattern = process_pattern
+    
+    def position(self):
+        """Where the log ends right now, taken before the action being watched"""
+        output, _ = self.ssh.execute(
+            f"stat -c '%i %s' {self.mc_dir}/logs/latest.log 2>/dev/null || echo '- 0'"
+        )
+        inode, size = (output.split() + ['-', '0'])[:2]
+        return {'inode': inode, 'size': int(size) if size.isdigit() else 0}
+    
+    def _follow_script(self, position, timeout, rotated):
+        """Shell that prints log lines written after position and ends when java exits or time runs out"""
+        log = 'logs/latest.log'
+        script = [
+            f"cd {self.mc_dir} || exit 1",
+            f"end=$(( $(date +%s) + {int(timeout)} ))",
+        ]
+        if rotated:
+            # A starting server moves the old latest.log aside, wait for the new file
+            script += [
+                "gone=0",
+                f"while [ \"$(stat -c %i {log} 2>/dev/null || echo -)\" = '{position['inode']}' ]; do",
+                "  [ $(date +%s) -ge $end ] && exit 124",
+                f"  {pid_script(self.mc_dir, self.process_pattern)}",
+                "  if [ -n \"$pid\" ]; then gone=0; else gone=$((gone + 1)); fi",
+                f"  [ $gone -ge 25 ] && echo '{_NO_PROCESS}' && exit 0",
+                "  sleep 0.2",
+                "done",
+            ]
+        script += [
+            f"if [ \"$(stat -c %i {log} 2>/dev/null)\" = '{position['inode']}' ]; then from={position['size'] + 1}; else from=1; fi",
+            pid_script(self.mc_dir, self.process_pattern),
+            f"[ -z \"$pid\" ] && ! [ -e {log} ] && echo '{_NO_PROCESS}' && exit 0",
+            "left=$(( end - $(date +%s) )); [ $left -lt 1 ] && exit 124",
+            # --pid ends the follow shortly after the server process exits
+            f"exec timeout $left tail -s 0.2 -c +$from -F ${{pid:+--pid=$pid}} {log} 2>/dev/null",
+        ]
+        return '\n'.join(script)
+    
+    def wait(self, position, until=('done', 'crash'), timeout=300, rotated=False, on_event=None,
+             since=None):
+        """Follow the log from position until an event in until, java exiting or timeout
+        
+        Returns {'event', 'line', 'seconds', 'reported_seconds', 'events'} where
+        event is the one that ended the wait, or 'exited' / 'timeout'. Times
+        count from since (a time.monotonic() value) when given.
+        """
+        started = since or time.monotonic()
+        result = {'event': 'timeout', 'line': None, 'seconds': None,
+                  'reported_seconds': None, 'events': {}}
+        
+        stream = self.ssh.execute_stream(self._follow_script(position, timeout, rotated),
+                                         timeout=timeout + 15)
+        try:
+            while True:
+                try:
+                    name, line = next(stream)
+                except StopIteration as done:
+                    result['event'] = 'timeout' if done.value == 124 else 'exited'
+                    break
+                
+                if name != 'stdout':
+                    continue
+                if line.strip() == _NO_PROCESS:
+                    result['event'] = 'exited'
+                    break
+                
+                event, match = classify(line)
+                if not event:
+                    continue
+                
+                elapsed = time.monotonic() - started
+                if event == 'done':
+                    result['reported_seconds'] = float(match.group(1))
+                # Several lines can share an event, only the first one is reported
+                if event not in result['events']:
+                    result['events'][event] = elapsed
+                    if on_event:
+                        on_event(event, line, elapsed)
+                if event in until:
+                    result['event'] = event
+                    result['line'] = line
+                    break
+        except TimeoutError:
+            result['event'] = 'timeout'
+        finally:
+            stream.close()
+        
+        result['seconds'] = time.monotonic() - started
+        return result
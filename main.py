@@ -1,15 +1,16 @@
 """Modern Minecraft Server Manager - Main Application"""
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox, filedialog
-import threading
 from ui_components import ModernTheme, ModernButton, ModernEntry, Card
 from ssh_manager import SSHManager
+from local_backend import LocalBackend
 from server_manager import ServerManager
 from mod_manager import ModManager
 from player_manager import PlayerManager
 from file_manager import FileManager
 from config import Config
 from preferences import Preferences
+from async_api import AsyncRunner
 
 class MinecraftServerManager:
     def __init__(self, root):
@@ -35,6 +36,9 @@ class MinecraftServerManager:
         self.players = None
         self.files = None
         
+        # Remote calls are scheduled here instead of spawning a thread each
+        self.aio = AsyncRunner()
+        
         self.setup_ui()
         self.root.after(500, self.prompt_connection)
     
@@ -72,6 +76,14 @@ class MinecraftServerManager:
                             padx=15, pady=8, cursor='hand2', borderwidth=0)
         help_btn.pack(side=tk.RIGHT, padx=5)
         
+        # Remote call profiler
+        profiler_btn = tk.Button(content, text="⏱️ Profiler",
+                                command=self.show_profiler,
+                                bg=ModernTheme.DARK['surface_light'], fg='white',
+                                font=('Segoe UI', 10, 'bold'), relief='flat',
+                                padx=15, pady=8, cursor='hand2', borderwidth=0)
+        profiler_btn.pack(side=tk.RIGHT, padx=5)
+        
         self.status_indicator = tk.Label(content, text="● Disconnected",
                                          font=('Segoe UI', 12, 'bold'),
                                          bg=ModernTheme.DARK['surface'],
@@ -155,7 +167,11 @@ class MinecraftServerManager:
             self.prefs.set('show_tutorial', False)
         
         # Auto-connect if enabled
-        if self.prefs.get('auto_connect', False):
+        if self.prefs.get('auto_connect', False) and self.prefs.get('local_backend', False):
+            self.log("🔄 Auto-connecting to this machine...")
+            if self.connect_local():
+                return
+        elif self.prefs.get('auto_connect', False):
             last_server = self.prefs.get_last_server()
             if last_server:
                 self.log("🔄 Auto-connecting to last server...")
@@ -175,14 +191,29 @@ class MinecraftServerManager:
         from dialogs.tutorial_dialog import TutorialDialog
         TutorialDialog(self.root, self)
     
+    def show_profiler(self):
+        from dialogs.metrics_dialog import MetricsDialog
+        MetricsDialog(self.root, self)
+    
     def connect(self, hostname, username, password, port=22):
         try:
-            self.ssh = SSHManager(hostname, username, password, port)
+            self.ssh = SSHManager(hostname, username, password, port,
+                                  max_channels=self.prefs.get('max_ssh_channels', 4),
+                                  persistent_shell=self.prefs.get('persistent_shell', False),
+                                  keepalive=self.prefs.get('ssh_keepalive', 15),
+                                  sftp_sessions=self.prefs.get('sftp_sessions', 4))
+            # Events come from the keepalive and reconnect threads, Tk only from its own
+            self.ssh.add_listener(lambda event, info: self.root.after(0, self.on_ssh_event, event, info))
             self.ssh.connect()
             
-            self.server = ServerManager(self.ssh)
-            self.mods = ModManager(self.ssh)
-            self.players = PlayerManager(self.ssh)
+            self.server = ServerManager(self.ssh,
+                                        start_timeout=self.prefs.get('start_timeout', Config.START_TIMEOUT),
+                                        stop_timeout=self.prefs.get('stop_timeout', Config.STOP_TIMEOUT),
+                                        save_timeout=self.prefs.get('save_timeout', Config.SAVE_TIMEOUT),
+                                        term_timeout=self.prefs.get('term_timeout', Config.TERM_TIMEOUT))
+            self.server.launch.update(self.prefs.get_launch_profile(self.ssh.hostname))
+            self.mods = ModManager(self.ssh, server=self.server)
+            self.players = PlayerManager(self.ssh, server=self.server)
             self.files = FileManager(self.ssh)
             
             self.status_indicator.config(text="● Connected", 
@@ -202,10 +233,41 @@ class MinecraftServerManager:
             messagebox.showerror("Connection Error", str(e))
             return False
     
+    def connect_local(self):
+        """Manage a server on this machine with subprocesses and file I/O instead of SSH"""
+        try:
+            self.ssh = LocalBackend(max_channels=self.prefs.get('max_ssh_channels', 4),
+                                    sftp_sessions=self.prefs.get('sftp_sessions', 4))
+            self.ssh.connect()
+            
+            self.server = ServerManager(self.ssh,
+                                        start_timeout=self.prefs.get('start_timeout', Config.START_TIMEOUT),
+                                        stop_timeout=self.prefs.get('stop_timeout', Config.STOP_TIMEOUT),
+                                        save_timeout=self.prefs.get('save_timeout', Config.SAVE_TIMEOUT),
+                                        term_timeout=self.prefs.get('term_timeout', Config.TERM_TIMEOUT))
+            self.server.launch.update(self.prefs.get_launch_profile(self.ssh.hostname))
+            self.mods = ModManager(self.ssh, server=self.server)
+            self.players = PlayerManager(self.ssh, server=self.server)
+            self.files = FileManager(self.ssh)
+            
+            self.status_indicator.config(text="● Local",
+                                        fg=ModernTheme.DARK['success'])
+            self.logout_btn.config(state=tk.NORMAL)
+            
+            self.dashboard.on_connected()
+            self.update_server_status()
+            
+            return True
+        except Exception as e:
+            messagebox.showerror("Connection Error", str(e))
+            return False
+    
     def logout(self):
         """Disconnect and show login dialog"""
         if messagebox.askyesno("Logout", "Are you sure you want to disconnect from the server?"):
             # Disconnect SSH
+            if self.server:
+                self.server.close()
             if self.ssh:
                 self.ssh.disconnect()
             
@@ -237,8 +299,11 @@ class MinecraftServerManager:
         self.prefs.set('window_size', geometry)
         
         # Close SSH connection
+        if self.server:
+            self.server.close()
         if self.ssh:
             self.ssh.disconnect()
+        self.aio.stop()
         
         self.root.destroy()
     
@@ -246,23 +311,42 @@ class MinecraftServerManager:
         if not self.server:
             return
         
-        def update():
-            try:
-                status = self.server.get_status()
-                if status['running']:
-                    self.server_status.config(
-                        text=f"Server: Running ({status.get('type', 'Unknown')})",
-                        fg=ModernTheme.DARK['success']
-                    )
-                else:
-                    self.server_status.config(
-                        text="Server: Stopped",
-                        fg=ModernTheme.DARK['error']
-                    )
-            except:
-                pass
-        
-        threading.Thread(target=update, daemon=True).start()
+        def update(status, error):
+            if error:
+                return
+            if status['running']:
+                self.server_status.config(
+                    text=f"Server: Running ({status.get('type', 'Unknown')})",
+                    fg=ModernTheme.DARK['success']
+                )
+            else:
+                self.server_status.config(
+                    text="Server: Stopped",
+                    fg=ModernTheme.DARK['error']
+                )
+        
+        self.aio.submit(self.aio.wrap(self.server).get_status(),
+                        callback=lambda status, error: self.root.after(0, update, status, error))
+    
+    def on_ssh_event(self, event, info):
+        """Reflect keepalive and reconnect activity in the header and console, runs on the Tk thread"""
+        if event == 'rtt':
+            self.status_indicator.config(text=f"● Connected ({info['last'] * 1000:.0f} ms)",
+                                        fg=ModernTheme.DARK['success'])
+        elif event == 'disconnected':
+            self.status_indicator.config(text="● Reconnecting...",
+                                        fg=ModernTheme.DARK['warning'])
+            self.log("⚠️ Connection lost, reconnecting...")
+        elif event == 'reconnecting' and info['attempt'] > 1:
+            self.log(f"🔄 Reconnect attempt {info['attempt']}...")
+        elif event == 'reconnected':
+            self.status_indicator.config(text="● Connected",
+                                        fg=ModernTheme.DARK['success'])
+            self.log(f"✅ Reconnected after {info['downtime']:.1f}s")
+        elif event == 'reconnect_failed':
+            self.status_indicator.config(text="● Disconnected",
+                                        fg=ModernTheme.DARK['error'])
+            self.log(f"❌ Could not reconnect after {info['attempts']} attempts")
     
     def log(self, message):
         if hasattr(self, 'dashboard'):
@@ -361,6 +445,13 @@ class ConnectionDialog:
                       selectcolor=ModernTheme.DARK['surface_light'],
                       font=('Segoe UI', 9)).pack(anchor='w')
         
+        self.local_var = tk.BooleanVar(value=self.app.prefs.get('local_backend', False))
+        tk.Checkbutton(options_frame, text="Server runs on this machine (no SSH)",
+                      variable=self.local_var,
+                      bg=ModernTheme.DARK['surface'], fg=ModernTheme.DARK['text'],
+                      selectcolor=ModernTheme.DARK['surface_light'],
+                      font=('Segoe UI', 9)).pack(anchor='w')
+        
         # Bind Enter key
         for entry in self.entries.values():
             entry.bind('<Return>', lambda e: self.connect())
@@ -432,6 +523,13 @@ class ConnectionDialog:
             ConnectionDialog(self.app.root, self.app)
     
     def connect(self):
+        self.app.prefs.set('local_backend', self.local_var.get())
+        if self.local_var.get():
+            self.app.prefs.set('auto_connect', self.auto_connect_var.get())
+            if self.app.connect_local():
+                self.dialog.destroy()
+            return
+        
         hostname = self.entries['hostname'].get()
         port = int(self.entries['port'].get() or 22)
         username = self.entries['username'].get()
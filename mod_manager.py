@@ -2,15 +2,23 @@
 import os
 import zipfile
 from pathlib import Path
+from transfer_engine import TransferEngine
 
 class ModManager:
-    def __init__(self, ssh_manager, server_dir="/root/minecraft"):
+    def __init__(self, ssh_manager, server_dir="/root/minecraft", server=None):
         self.ssh = ssh_manager
         self.server_dir = server_dir
         self.mods_dir = f"{server_dir}/mods"
+        self.transfers = TransferEngine(ssh_manager)
+        # ServerManager, told when the mod set changes so its CDS archive is rebuilt
+        self.server = server
+    
+    def mods_changed(self):
+        if self.server:
+            self.server.cds.invalidate()
     
     def list_mods(self):
-        output, _ = self.ssh.execute(f"ls -lh {self.mods_dir}/*.jar 2>/dev/null || echo ''")
+        output, _ = self.ssh.execute(f"ls -lh {self.mods_dir}/*.jar 2>/dev/null || echo ''", retry=True)
         mods = []
         
         for line in output.strip().split('\n'):
@@ -25,14 +33,26 @@ class ModManager:
         return mods
     
     def upload_mod(self, local_path):
-        sftp = self.ssh.get_sftp()
-        remote_path = f"{self.mods_dir}/{os.path.basename(local_path)}"
-        sftp.put(local_path, remote_path)
-        sftp.close()
+        with self.ssh.sftp_session() as sftp:
+            remote_path = f"{self.mods_dir}/{os.path.basename(local_path)}"
+            sftp.put(local_path, remote_path)
+        self.mods_changed()
         return True
     
+    def upload_mods(self, local_paths, progress=None):
+        """Upload many jars over one SFTP session, progress(done, total, name)"""
+        with self.ssh.sftp_session() as sftp:
+            for i, local_path in enumerate(local_paths):
+                name = os.path.basename(local_path)
+                sftp.put(local_path, f"{self.mods_dir}/{name}")
+                if progress:
+                    progress(i + 1, len(local_paths), name)
+        self.mods_changed()
+        return len(local_paths)
+    
     def delete_mod(self, mod_name):
         self.ssh.execute(f"rm -f {self.mods_dir}/{mod_name}")
+        self.mods_changed()
         return True
     
     def download_mod_url(self, url, filename=None):
@@ -40,10 +60,12 @@ class ModManager:
             filename = url.split('/')[-1]
         
         self.ssh.execute(f"cd {self.mods_dir} && wget -q '{url}' -O '{filename}'")
+        self.mods_changed()
         return True
     
     def clear_all_mods(self):
         self.ssh.execute(f"rm -rf {self.mods_dir}/*.jar")
+        self.mods_changed()
         return True
     
     def find_duplicates(self):
@@ -60,15 +82,14 @@ class ModManager:
         
         return duplicates
     
-    def install_modpack(self, zip_path):
+    def install_modpack(self, zip_path, progress=None):
         self.ssh.execute(f"mkdir -p {self.mods_dir}")
         
-        sftp = self.ssh.get_sftp()
         remote_zip = f"/tmp/modpack.zip"
-        sftp.put(zip_path, remote_zip)
-        sftp.close()
+        self.transfers.upload(zip_path, remote_zip, progress=progress)
         
         self.ssh.execute(f"unzip -o {remote_zip} -d {self.server_dir}")
         self.ssh.execute(f"rm {remote_zip}")
+        self.mods_changed()
         
         return True
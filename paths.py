@@ -0,0 +1,6 @@
+"""Files the manager keeps on the host, relative to the server directory"""
+
+# Kept inside the server directory so the paths in the java arguments stay relative
+STATE_DIR = '.msm'
+# Written by the launcher just before it execs java, so it holds the JVM's own pid
+PID_FILE = f'{STATE_DIR}/server.pid'
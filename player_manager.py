@@ -1,15 +1,47 @@
 """Player management functionality"""
 import json
+import shlex
+from rcon import RconError
+from server_ping import PingError
 
 class PlayerManager:
-    def __init__(self, ssh_manager, server_dir="/root/minecraft"):
+    def __init__(self, ssh_manager, server_dir="/root/minecraft", server=None):
         self.ssh = ssh_manager
         self.server_dir = server_dir
+        # ServerManager, used for RCON so commands return their output
+        self.server = server
+    
+    def send_command(self, command):
+        if self.server:
+            return self.server.send_command(command)
+        self.ssh.execute(f"screen -S minecraft -X stuff {shlex.quote(command)}'^M'")
+        return None
     
     def get_online_players(self):
+        rcon = self.server.get_rcon() if self.server else None
+        if rcon:
+            try:
+                output = rcon.execute('list')
+            except RconError:
+                output = None
+            # "There are 2 of a max of 20 players online: Alice, Bob"
+            if output and ':' in output:
+                names = [name.strip() for name in output.split(':', 1)[1].split(',')]
+                return [{'username': name, 'uuid': 'N/A', 'status': 'Online'} for name in names if name]
+        
+        if self.server:
+            # The ping sample is complete on small servers (vanilla sends up to 12 names)
+            try:
+                status = self.server.ping()
+                if len(status['sample']) >= status['online']:
+                    return [{'username': name, 'uuid': 'N/A', 'status': 'Online'} for name in status['sample']]
+            except PingError:
+                pass
+        
         output, _ = self.ssh.execute(
             f"cd {self.server_dir} && tail -100 logs/latest.log 2>/dev/null | "
-            "grep -E 'joined the game|left the game' | tail -20"
+            "grep -E 'joined the game|left the game' | tail -20",
+            retry=True
         )
         
         players = []
@@ -29,38 +61,38 @@ class PlayerManager:
         return players
     
     def op_player(self, username):
-        self.ssh.execute(f"screen -S minecraft -X stuff 'op {username}^M'")
+        self.send_command(f"op {username}")
         return True
     
     def deop_player(self, username):
-        self.ssh.execute(f"screen -S minecraft -X stuff 'deop {username}^M'")
+        self.send_command(f"deop {username}")
         return True
     
     def kick_player(self, username, reason=''):
         cmd = f"kick {username} {reason}".strip()
-        self.ssh.execute(f"screen -S minecraft -X stuff '{cmd}^M'")
+        self.send_command(cmd)
         return True
     
     def ban_player(self, username, reason=''):
         cmd = f"ban {username} {reason}".strip()
-        self.ssh.execute(f"screen -S minecraft -X stuff '{cmd}^M'")
+        self.send_command(cmd)
         return True
     
     def unban_player(self, username):
-        self.ssh.execute(f"screen -S minecraft -X stuff 'pardon {username}^M'")
+        self.send_command(f"pardon {username}")
         return True
     
     def get_whitelist(self):
-        output, _ = self.ssh.execute(f"cat {self.server_dir}/whitelist.json 2>/dev/null || echo '[]'")
+        output, _ = self.ssh.execute(f"cat {self.server_dir}/whitelist.json 2>/dev/null || echo '[]'", retry=True)
         try:
             return json.loads(output)
         except:
             return []
     
     def add_to_whitelist(self, username):
-        self.ssh.execute(f"screen -S minecraft -X stuff 'whitelist add {username}^M'")
+        self.send_command(f"whitelist add {username}")
         return True
     
     def remove_from_whitelist(self, username):
-        self.ssh.execute(f"screen -S minecraft -X stuff 'whitelist remove {username}^M'")
+        self.send_command(f"whitelist remove {username}")
         return True
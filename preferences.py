@@ -31,7 +31,22 @@ class Preferences:
             'local_mods_path': '',
             'backup_path': '',
             'window_size': '1600x900',
-            'font_size': 10
+            'font_size': 10,
+            'max_ssh_channels': 4,
+            'persistent_shell': False,
+            'ssh_keepalive': 15,
+            'sftp_sessions': 4,
+            'local_backend': False,
+            'start_timeout': 600,
+            'stop_timeout': 120,
+            'shutdown_countdown': 10,
+            'save_timeout': 300,
+            'term_timeout': 60,
+            'auto_restart': True,
+            'dynamic_distance': False,
+            'hibernate': False,
+            'hibernate_minutes': 15,
+            'launch_profiles': {}
         }
         
         if self.config_file.exists():
@@ -136,6 +151,16 @@ class Preferences:
         """Get list of all saved servers"""
         return list(self.credentials.keys())
     
+    def get_launch_profile(self, hostname):
+        """Saved launch settings for a server, {} if none"""
+        return dict(self.prefs.get('launch_profiles', {}).get(hostname, {}))
+    
+    def set_launch_profile(self, hostname, launch):
+        """Remember a server's launch settings: profile, memory (None for auto), cds, gc_log and backend"""
+        profiles = self.prefs.setdefault('launch_profiles', {})
+        profiles[hostname] = dict(launch)
+        self.save_preferences()
+    
     def get(self, key, default=None):
         """Get preference value"""
         return self.prefs.get(key, default)
@@ -0,0 +1,173 @@
+"""Where the server JVM lives on the host: a screen or tmux session, or a systemd unit"""
+import shlex
+from paths import STATE_DIR, PID_FILE
+
+SESSION = 'minecraft'
+# Console input for backends without a terminal, appended to and followed by the JVM's stdin
+CONSOLE_FILE = f'{STATE_DIR}/console.in'
+
+class SessionError(Exception):
+    pass
+
+def pid_script(minecraft_dir, process_pattern):
+    """Shell that sets $pid to the server JVM's pid, or to nothing when it is not running"""
+    pid_file = f"{minecraft_dir}/{PID_FILE}"
+    return (f"if [ -r {pid_file} ]; then pid=$(cat {pid_file}); "
+            # A pid reused after the server exited (or a reboot) belongs to something else
+            f"grep -qa 'server\\.jar' /proc/$pid/cmdline 2>/dev/null || pid=; "
+            # Launched before pid files were written
+            f"else pid=$(pgrep -o -f {shlex.quote(process_pattern)}); fi")
+
+class ProcessBackend:
+    """Starts, stops and types into the server, subclasses say how the session is hosted
+    
+    Every backend launches java through the same wrapper that records its
+    pid, so status is one cat and a /proc check instead of a scan of the
+    process table.
+    """
+    name = None
+    binary = None
+    
+    def __init__(self, ssh_manager, minecraft_dir="/root/minecraft", process_pattern="java",
+                 session=SESSION):
+        self.ssh = ssh_manager
+        self.mc_dir = minecraft_dir
+        self.process_pattern = process_pattern
+        self.session = session
+    
+    def pid_script(self):
+        return pid_script(self.mc_dir, self.process_pattern)
+    
+    def _wrap(self, command, stdin=None):
+        """bash -c line that records its pid and becomes java, stdin redirected when given"""
+        redirect = f" < {stdin}" if stdin else ""
+        return f"bash -c {shlex.quote(f'echo $$ > {self.mc_dir}/{PID_FILE} && exec {command}{redirect}')}"
+    
+    def _launch_script(self, command):
+        raise NotImplementedError
+    
+    def _send_script(self, commands):
+        raise NotImplementedError
+    
+    def _quit_script(self):
+        raise NotImplementedError
+    
+    def attach_command(self):
+        """What to run in a terminal on the host to watch (and type into) the console"""
+        raise NotImplementedError
+    
+    def status(self):
+        """{'running', 'pid'} from the pid file in one call"""
+        output, _ = self.ssh.execute(f"{self.pid_script()}; echo \"pid $pid\"", retry=True)
+        pid = output.strip().split('\n')[-1][4:].strip() if output.strip() else ''
+        return {'running': bool(pid), 'pid': pid or None}
+    
+    def launch_script(self, command):
+        """Shell that launches command (a java command line) in the session
+        
+        Refuses with exit code 3 when a server is already running, a second
+        JVM would only fail to bind the port and take over the pid file.
+        """
+        return (f"cd {self.mc_dir} && mkdir -p logs {STATE_DIR} || exit 1; {self.pid_script()}; "
+                f"if [ -n \"$pid\" ]; then echo \"already running as $pid\" >&2; exit 3; fi; "
+                + self._launch_script(command))
+    
+    def start(self, command):
+        """Run launch_script, returns (exit code, error text)"""
+        (_, error, code), = self.ssh.execute_many([self.launch_script(command)])
+        return code, error.strip()
+    
+    def send(self, commands):
+        """Type console commands in order, True when the session took them"""
+        (_, _, code), = self.ssh.execute_many([self._send_script(commands)])
+        return code == 0
+    
+    def quit(self):
+        """Tear the session down, for after the JVM has gone"""
+        self.ssh.execute(f"{self._quit_script()} 2>/dev/null || true")
+
+class ScreenBackend(ProcessBackend):
+    name = 'screen'
+    binary = 'screen'
+    
+    def _launch_script(self, command):
+        return f"screen -dmS {self.session} {self._wrap(command)}"
+    
+    def _send_script(self, commands):
+        return ' && '.join(f"screen -S {self.session} -p 0 -X stuff {shlex.quote(command)}'^M'"
+                           for command in commands)
+    
+    def _quit_script(self):
+        # Leftover sessions from older launches share the name, quit them all
+        return (f"for s in $(screen -ls | awk '/[0-9]+\\.{self.session}[[:space:]]/ {{print $1}}'); do "
+                f"screen -S $s -X quit; done")
+    
+    def attach_command(self):
+        return f"screen -r {self.session}"
+
+class TmuxBackend(ProcessBackend):
+    name = 'tmux'
+    binary = 'tmux'
+    
+    def _launch_script(self, command):
+        # new-session fails on a duplicate name instead of stacking sessions like screen
+        return f"tmux new-session -d -s {self.session} -c {self.mc_dir} {self._wrap(command)}"
+    
+    def _send_script(self, commands):
+        # One tmux call for the whole batch, -l types the text literally
+        keys = ' \\; '.join(f"send-keys -t {self.session} -l {shlex.quote(command)} \\; "
+                            f"send-keys -t {self.session} Enter" for command in commands)
+        return f"tmux {keys}"
+    
+    def _quit_script(self):
+        return f"tmux kill-session -t {self.session}"
+    
+    def attach_command(self):
+        return f"tmux attach -t {self.session}"
+
+class SystemdBackend(ProcessBackend):
+    """A transient unit from systemd-run, console commands go through a file the JVM's stdin follows
+    
+    As root it is a system unit, otherwise a user unit (which needs
+    loginctl enable-linger to outlive the SSH session).
+    """
+    name = 'systemd'
+    binary = 'systemd-run'
+    
+    def _user_flag(self):
+        return "$([ \"$(id -u)\" = 0 ] || echo --user)"
+    
+    def _launch_script(self, command):
+        console = f"{self.mc_dir}/{CONSOLE_FILE}"
+        # systemd expands $NAME in ExecStart and turns $$ into $, so every $ meant
+        # for bash (the pid in $$ above all) is doubled
+        wrapped = self._wrap(command, f'<(tail -n 0 -F {console})').replace('$', '$$')
+        return (f": > {console} && "
+                # A failed unit of the same name would block the new one
+                f"{{ systemctl {self._user_flag()} reset-failed {self.session} 2>/dev/null; true; }} && "
+                f"systemd-run {self._user_flag()} --quiet --collect --unit={self.session} "
+                f"-p WorkingDirectory={self.mc_dir} {wrapped}")
+    
+    def _send_script(self, commands):
+        lines = ' '.join(shlex.quote(command) for command in commands)
+        return (f"systemctl {self._user_flag()} is-active --quiet {self.session} && "
+                f"printf '%s\\n' {lines} >> {self.mc_dir}/{CONSOLE_FILE}")
+    
+    def _quit_script(self):
+        return f"systemctl {self._user_flag()} stop {self.session}"
+    
+    def attach_command(self):
+        # Output only, input is a line appended to CONSOLE_FILE. Shown rather than run,
+        # so the user unit flag is decided here instead of by id -u on the host
+        user = "" if self.ssh.username == 'root' else "--user "
+        return f"journalctl {user}-f -u {self.session}"
+
+BACKENDS = {backend.name: backend for backend in (ScreenBackend, TmuxBackend, SystemdBackend)}
+
+def available_backends(ssh_manager):
+    """Names of the backends whose tool is installed on the host, one call for all of them"""
+    binaries = ' '.join(backend.binary for backend in BACKENDS.values())
+    output, _ = ssh_manager.execute(f"for b in {binaries}; do command -v $b >/dev/null && echo $b; done",
+                                    retry=True)
+    found = output.split()
+    return [name for name, backend in BACKENDS.items() if backend.binary in found]
@@ -0,0 +1,157 @@
+"""Read the Java server's /proc entries in one remote call"""
+import threading
+from process_backends import pid_script
+
+# Samples closer together than this reuse the previous CPU figures
+MIN_INTERVAL = 0.5
+
+def _kib(value):
+    """'123456 kB' -> bytes"""
+    parts = value.split()
+    return int(parts[0]) * 1024 if parts and parts[0].isdigit() else None
+
+def _size(flag_value):
+    """JVM size like 4G / 512m / 1048576 -> bytes"""
+    units = {'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3, 't': 1024 ** 4}
+    value = flag_value.strip().lower()
+    if value and value[-1] in units and value[:-1].isdigit():
+        return int(value[:-1]) * units[value[-1]]
+    return int(value) if value.isdigit() else None
+
+def detect_type(cmdline):
+    """Best guess at the server flavour from the java command line"""
+    lowered = cmdline.lower()
+    for needle, name in (('purpur', 'Purpur'), ('paper', 'Paper'), ('neoforge', 'NeoForge'),
+                         ('forge', 'Forge'), ('fabric', 'Fabric'), ('quilt', 'Quilt')):
+        if needle in lowered:
+            return name
+    return 'Vanilla'
+
+def parse_jvm_flags(cmdline):
+    """JVM options that come before -jar (or the main class) on the java command line"""
+    flags = []
+    for arg in cmdline.split()[1:]:
+        if arg in ('-jar', '-cp', '-classpath') or not arg.startswith('-'):
+            break
+        flags.append(arg)
+    return flags
+
+class ProcessInspector:
+    """Samples the server JVM and the host, keeping the last sample so CPU% comes from deltas"""
+    def __init__(self, ssh_manager, minecraft_dir="/root/minecraft", process_pattern="java"):
+        self.ssh = ssh_manager
+        self.mc_dir = minecraft_dir
+        self.process_pattern = process_pattern
+        self._last = None
+        self._lock = threading.Lock()
+    
+    def _script(self):
+        return '\n'.join([
+            pid_script(self.mc_dir, self.process_pattern),
+            f"[ -e {self.mc_dir}/server.jar ] && echo 'jar 1' || echo 'jar 0'",
+            "echo \"clk $(getconf CLK_TCK)\"",
+            "echo \"ncpu $(nproc)\"",
+            "echo \"uptime $(cut -d' ' -f1 /proc/uptime)\"",
+            "echo \"cpu $(head -n 1 /proc/stat)\"",
+            "grep -E '^(MemTotal|MemAvailable):' /proc/meminfo",
+            "[ -n \"$pid\" ] || exit 0",
+            "echo \"pid $pid\"",
+            "echo \"stat $(cat /proc/$pid/stat)\"",
+            "grep -E '^(VmRSS|VmHWM|VmSwap|Threads):' /proc/$pid/status",
+            "echo \"fds $(ls /proc/$pid/fd 2>/dev/null | wc -l)\"",
+            "echo \"cmdline $(tr '\\0' ' ' < /proc/$pid/cmdline)\"",
+        ])
+    
+    def _parse(self, output):
+        raw = {}
+        for line in output.split('\n'):
+            parts = line.split(None, 1)
+            if parts:
+                raw[parts[0].rstrip(':')] = parts[1].strip() if len(parts) > 1 else ''
+        return raw
+    
+    def sample(self):
+        """One round trip: {'installed', 'running', 'host': {...}, 'process': {...} or None}"""
+        output, _ = self.ssh.execute(self._script(), retry=True)
+        raw = self._parse(output)
+        
+        clk = int(raw.get('clk') or 100)
+        host_uptime = float(raw.get('uptime') or 0)
+        cpu_fields = [int(v) for v in raw.get('cpu', '').split()[1:] if v.isdigit()]
+        # idle + iowait count as not busy
+        host_idle = sum(cpu_fields[3:5])
+        host_total = sum(cpu_fields)
+        
+        mem_total = _kib(raw.get('MemTotal', ''))
+        mem_available = _kib(raw.get('MemAvailable', ''))
+        host = {
+            'cpus': int(raw.get('ncpu') or 1),
+            'uptime': host_uptime,
+            'mem_total': mem_total,
+            'mem_used': mem_total - mem_available if mem_total and mem_available else None,
+            'cpu_percent': None,
+        }
+        
+        process = None
+        pid = raw.get('pid')
+        if pid and 'stat' in raw:
+            # comm may contain spaces, the fixed fields start after the last ')'
+            fields = raw['stat'].rsplit(')', 1)[1].split()
+            cpu_ticks = int(fields[11]) + int(fields[12])
+            started = int(fields[19]) / clk
+            cmdline = raw.get('cmdline', '')
+            flags = parse_jvm_flags(cmdline)
+            heap_max = next((_size(f[4:]) for f in flags if f.startswith('-Xmx')), None)
+            heap_min = next((_size(f[4:]) for f in flags if f.startswith('-Xms')), None)
+            process = {
+                'pid': int(pid),
+                'state': fields[0],
+                'uptime': max(host_uptime - started, 0),
+                'cpu_seconds': cpu_ticks / clk,
+                'cpu_percent': None,
+                'rss': _kib(raw.get('VmRSS', '')),
+                'rss_peak': _kib(raw.get('VmHWM', '')),
+                'swap': _kib(raw.get('VmSwap', '')),
+                'threads': int(raw.get('Threads') or fields[17]),
+                'fds': int(raw.get('fds') or 0),
+                'heap_max': heap_max,
+                'heap_min': heap_min,
+                'jvm_flags': flags,
+                'cmdline': cmdline,
+                'type': detect_type(cmdline),
+            }
+        
+        with self._lock:
+            last = self._last
+            if last and host_uptime - last['uptime'] < MIN_INTERVAL:
+                # Too soon for a stable delta, repeat the last figures and keep its baseline
+                host['cpu_percent'] = last['host_percent']
+                if process and last['pid'] == process['pid']:
+                    process['cpu_percent'] = last['cpu_percent']
+            else:
+                if last and host_total > last['host_total']:
+                    busy = (host_total - host_idle) - (last['host_total'] - last['host_idle'])
+                    host['cpu_percent'] = 100.0 * busy / (host_total - last['host_total'])
+                if process and last and last['pid'] == process['pid']:
+                    # 100% is one core busy, like top
+                    wall = host_uptime - last['uptime']
+                    process['cpu_percent'] = 100.0 * (process['cpu_seconds'] - last['cpu_seconds']) / wall
+                elif process and process['uptime'] > 0:
+                    # First look at this process, fall back to the average since it started
+                    process['cpu_percent'] = 100.0 * process['cpu_seconds'] / process['uptime']
+                self._last = {
+                    'uptime': host_uptime,
+                    'host_total': host_total,
+                    'host_idle': host_idle,
+                    'host_percent': host['cpu_percent'],
+                    'pid': process['pid'] if process else None,
+                    'cpu_seconds': process['cpu_seconds'] if process else 0,
+                    'cpu_percent': process['cpu_percent'] if process else None,
+                }
+        
+        return {
+            'installed': raw.get('jar') == '1',
+            'running': process is not None,
+            'host': host,
+            'process': process,
+        }
@@ -0,0 +1,186 @@
+"""Minecraft RCON client with pooled connections and pipelined commands"""
+import itertools
+import select
+import socket
+import struct
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+LOGIN = 3
+COMMAND = 2
+RESPONSE = 0
+# Vanilla answers unknown packet types in order, which marks the end of a split response
+TERMINATOR = 200
+
+# Vanilla rejects command payloads longer than this
+MAX_COMMAND = 1446
+
+class RconError(Exception):
+    pass
+
+class RconAuthError(RconError):
+    pass
+
+def encode_packet(request_id, kind, body):
+    payload = struct.pack('<ii', request_id, kind) + body.encode('utf-8') + b'\x00\x00'
+    return struct.pack('<i', len(payload)) + payload
+
+class RconConnection:
+    """One authenticated RCON connection over anything socket-like (a socket or an SSH channel)"""
+    def __init__(self, sock, password, timeout=10):
+        self.sock = sock
+        self.sock.settimeout(timeout)
+        self._buffer = b''
+        self._ids = itertools.count(1)
+        self.closed = False
+        self._login(password)
+    
+    def _login(self, password):
+        request_id = next(self._ids)
+        self.sock.sendall(encode_packet(request_id, LOGIN, password))
+        reply_id, _, _ = self._read_packet()
+        if reply_id == -1:
+            self.close()
+            raise RconAuthError("RCON password rejected")
+    
+    def _recv_exact(self, count):
+        while len(self._buffer) < count:
+            data = self.sock.recv(max(4096, count - len(self._buffer)))
+            if not data:
+                self.closed = True
+                raise RconError("RCON connection closed by server")
+            self._buffer += data
+        data, self._buffer = self._buffer[:count], self._buffer[count:]
+        return data
+    
+    def _read_packet(self):
+        (length,) = struct.unpack('<i', self._recv_exact(4))
+        if length < 10 or length > 1024 * 1024:
+            self.closed = True
+            raise RconError(f"Bad RCON packet length {length}")
+        payload = self._recv_exact(length)
+        request_id, kind = struct.unpack('<ii', payload[:8])
+        return request_id, kind, payload[8:-2].decode('utf-8', errors='replace')
+    
+    def run_many(self, commands):
+        """Send every command in one write and return their outputs in order"""
+        for command in commands:
+            if len(command.encode('utf-8')) > MAX_COMMAND:
+                raise RconError(f"Command longer than {MAX_COMMAND} bytes")
+        
+        requests = []
+        data = b''
+        for command in commands:
+            request_id, end_id = next(self._ids), next(self._ids)
+            requests.append((request_id, end_id))
+            data += encode_packet(request_id, COMMAND, command)
+            data += encode_packet(end_id, TERMINATOR, '')
+        
+        try:
+            self.sock.sendall(data)
+            results = []
+            for request_id, end_id in requests:
+                parts = []
+                while True:
+                    reply_id, _, body = self._read_packet()
+                    if reply_id == end_id:
+                        break
+                    if reply_id == request_id:
+                        parts.append(body)
+                results.append(''.join(parts))
+            return results
+        except (OSError, struct.error) as e:
+            self.closed = True
+            raise RconError(f"RCON connection failed: {e}")
+    
+    def run(self, command):
+        return self.run_many([command])[0]
+    
+    def alive(self):
+        """Cheap check that the far end has not hung up while the connection sat idle"""
+        if self.closed:
+            return False
+        if hasattr(self.sock, 'eof_received'):
+            # paramiko Channel through an SSH tunnel
+            return not (self.sock.closed or self.sock.eof_received)
+        try:
+            readable, _, _ = select.select([self.sock], [], [], 0)
+            # Readable while idle means the server closed it (or sent junk)
+            return not readable or self.sock.recv(1, socket.MSG_PEEK) != b''
+        except OSError:
+            return False
+    
+    def close(self):
+        self.closed = True
+        try:
+            self.sock.close()
+        except Exception:
+            pass
+
+class RconPool:
+    """Keeps a few RCON connections open and hands them out one caller at a time"""
+    def __init__(self, connect, password, size=2, timeout=10):
+        # connect() returns a fresh socket-like object to the RCON port
+        self.connect = connect
+        self.password = password
+        self.size = size
+        self.timeout = timeout
+        self._idle = deque()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self.stats = {'opened': 0, 'reused': 0, 'discarded': 0, 'commands': 0}
+    
+    @contextmanager
+    def connection(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise RconError(f"No RCON connection free after {self.timeout}s")
+        conn = None
+        try:
+            with self._lock:
+                while self._idle and not conn:
+                    conn = self._idle.pop()
+                    if not conn.alive():
+                        conn.close()
+                        self.stats['discarded'] += 1
+                        conn = None
+                if conn:
+                    self.stats['reused'] += 1
+            if not conn:
+                try:
+                    conn = RconConnection(self.connect(), self.password, self.timeout)
+                except RconError:
+                    raise
+                except Exception as e:
+                    raise RconError(f"Could not reach RCON: {e}")
+                self.stats['opened'] += 1
+            
+            yield conn
+        except BaseException:
+            if conn:
+                conn.close()
+                self.stats['discarded'] += 1
+            conn = None
+            raise
+        finally:
+            if conn and not conn.closed:
+                with self._lock:
+                    self._idle.append(conn)
+            self._slots.release()
+    
+    def execute(self, command):
+        """Run one command and return what the server printed"""
+        return self.execute_many([command])[0]
+    
+    def execute_many(self, commands):
+        """Pipeline several commands over one connection, returns their outputs in order"""
+        if not commands:
+            return []
+        with self.connection() as conn:
+            self.stats['commands'] += len(commands)
+            return conn.run_many(commands)
+    
+    def close(self):
+        with self._lock:
+            while self._idle:
+                self._idle.pop().close()
@@ -1,66 +1,385 @@
 """Minecraft server operations"""
 import time
 import re
+import threading
+from config import Config
+from log_watcher import LogWatcher
+from rcon import RconPool, RconError
+from server_ping import StatusProbe
+from process_inspector import ProcessInspector
+from command_queue import CommandQueue
+from tick_sampler import TickSampler
+from watchdog import Watchdog
+from process_backends import BACKENDS, SessionError
+from gc_log import GcLog
+from chunk_pregen import Pregenerator
+from distance_controller import DistanceController
+from hibernation import Hibernator
+from cds_archive import ClassDataSharing
+from jvm_profiles import DEFAULT_PROFILE, probe_host, plan_launch, command_line
+
+# Matches the server JVM itself, not the screen/bash wrappers or shells that mention it
+JAVA_PROCESS = r"^([^ ]*/)?java .*server\.jar"
 
 class ServerManager:
-    def __init__(self, ssh_manager, minecraft_dir="/root/minecraft"):
+    def __init__(self, ssh_manager, minecraft_dir="/root/minecraft",
+                 start_timeout=Config.START_TIMEOUT, stop_timeout=Config.STOP_TIMEOUT,
+                 save_timeout=Config.SAVE_TIMEOUT, term_timeout=Config.TERM_TIMEOUT):
         self.ssh = ssh_manager
         self.mc_dir = minecraft_dir
+        self.start_timeout = start_timeout
+        self.stop_timeout = stop_timeout
+        self.save_timeout = save_timeout
+        self.term_timeout = term_timeout
+        self.logs = LogWatcher(ssh_manager, minecraft_dir, JAVA_PROCESS)
+        self.inspector = ProcessInspector(ssh_manager, minecraft_dir, JAVA_PROCESS)
+        self.rcon = None
+        self._rcon_key = None
+        self._rcon_lock = threading.Lock()
+        self._settings = None
+        self._settings_checked = 0
+        self._settings_lock = threading.Lock()
+        # Per-server launch profile, memory None sizes the heap from the host
+        self.launch = {'profile': DEFAULT_PROFILE, 'memory': None, 'cds': True, 'gc_log': True,
+                       'backend': Config.PROCESS_BACKEND}
+        self._backends = {}
+        self.cds = ClassDataSharing(ssh_manager, minecraft_dir)
+        self.gc = GcLog(ssh_manager, minecraft_dir)
+        self._host = None
+        self.commands = CommandQueue(self._send_batch, rate=Config.COMMAND_RATE,
+                                     burst=Config.COMMAND_BURST)
+        self.ticks = TickSampler(self, interval=Config.TICK_SAMPLE_INTERVAL,
+                                 console_interval=Config.TICK_SAMPLE_CONSOLE_INTERVAL)
+        # Pids stop() is taking down, so the watchdog does not treat their exit as a crash
+        self.expected_exits = set()
+        self.watchdog = Watchdog(self)
+        self.pregen = Pregenerator(self, interval=Config.PREGEN_INTERVAL, min_tps=Config.PREGEN_MIN_TPS)
+        self.distance = DistanceController(self, view=(Config.MIN_VIEW_DISTANCE, None),
+                                           simulation=(Config.MIN_SIMULATION_DISTANCE, None),
+                                           high_mspt=Config.DISTANCE_MSPT_HIGH,
+                                           low_mspt=Config.DISTANCE_MSPT_LOW,
+                                           commands=Config.DISTANCE_COMMANDS)
+        self.ticks.add_listener(self.distance.on_sample)
+        self.hibernation = Hibernator(self, idle_minutes=Config.HIBERNATE_IDLE_MINUTES,
+                                      motd=Config.HIBERNATE_MOTD, kick=Config.HIBERNATE_KICK)
+    
+    @property
+    def backend(self):
+        """ProcessBackend hosting the JVM, picked by launch['backend']"""
+        return self._backend(self.launch.get('backend') or Config.PROCESS_BACKEND)
+    
+    def _backend(self, name):
+        if name not in self._backends:
+            self._backends[name] = BACKENDS[name](self.ssh, self.mc_dir, JAVA_PROCESS)
+        return self._backends[name]
+    
+    def host_spec(self, refresh=False):
+        """Cores, RAM, huge pages and java version of the host, probed once per connection"""
+        if refresh or not self._host:
+            self._host = probe_host(self.ssh)
+        return self._host
     
-    def start(self, memory="4G"):
-        self.ssh.execute(f"cd {self.mc_dir} && screen -dmS minecraft bash -c 'java -Xmx{memory} -Xms2G -jar server.jar nogui'")
-        time.sleep(3)
-        return self.get_status()
-    
-    def stop(self):
-        output, _ = self.ssh.execute("screen -ls | grep minecraft | awk '{print $1}'")
-        if output.strip():
-            sessions = output.strip().split('\n')
-            for session in sessions:
-                if session.strip():
-                    self.ssh.execute(f"screen -S {session} -X stuff 'stop^M'")
-            time.sleep(5)
-            for session in sessions:
-                if session.strip():
-                    self.ssh.execute(f"screen -S {session} -X quit 2>/dev/null || true")
+    def launch_plan(self, memory=None, profile=None, gc_log=None):
+        """java arguments for the configured profile, see jvm_profiles.plan_launch"""
+        if gc_log is None:
+            gc_log = self.launch.get('gc_log', True)
+        return plan_launch(self.host_spec(), profile or self.launch['profile'],
+                           memory or self.launch['memory'], gc_log)
+    
+    def start(self, memory=None, wait=True, on_event=None):
+        """Launch the server, with wait follow the log until Done, a crash or java exiting
         
-        self.ssh.execute("pkill -f 'java.*server.jar' 2>/dev/null || true")
-        return True
+        memory overrides the profile's heap for this start. The status also
+        carries launch (the plan used), cds ('use', 'dump' or 'off'), ready,
+        event, seconds (measured from launch) and reported_seconds (from the
+        Done line).
+        """
+        # Started by hand while asleep, the hibernation listener still holds the game port
+        self.hibernation.release()
+        plan, cds_mode, command = self.prepare_launch(memory)
+        position = self.logs.position()
+        launched = time.monotonic()
+        code, error = self.backend.start(command)
+        if code != 0:
+            # Nothing was launched (already running, tool missing), there is no log to follow
+            status = self.get_status()
+            status.update({'launch': plan, 'cds': cds_mode, 'ready': False, 'event': 'failed',
+                           'line': error or f"{self.backend.name} exited with {code}",
+                           'seconds': time.monotonic() - launched, 'reported_seconds': None})
+            return status
+        if not wait:
+            status = self.get_status()
+            status.update({'launch': plan, 'cds': cds_mode})
+            return status
+        return self.wait_ready(position, launched, plan, cds_mode, on_event)
     
-    def restart(self):
-        self.stop()
-        time.sleep(5)
-        return self.start()
+    def prepare_launch(self, memory=None):
+        """(plan, cds mode, java command line) for the next start, CDS arguments included"""
+        plan = self.launch_plan(memory)
+        cds_mode = 'off'
+        if self.launch.get('cds'):
+            cds_mode, cds_args = self.cds.prepare(self.host_spec()['java_major'], plan['profile'])
+            jar = plan['args'].index('-jar')
+            plan['args'][jar:jar] = cds_args
+        return plan, cds_mode, command_line(plan['args'])
     
-    def get_status(self):
-        output, _ = self.ssh.execute("ps aux | grep 'java.*server.jar' | grep -v grep")
+    def wait_ready(self, position, since, plan=None, cds_mode=None, on_event=None):
+        """Follow a launched server's log from position, returns the status start() does"""
+        result = self.logs.wait(position, until=('done', 'crash'), timeout=self.start_timeout,
+                                rotated=True, on_event=on_event, since=since)
+        if result['event'] == 'done' and cds_mode:
+            self.cds.record_boot(cds_mode, result['seconds'], result['reported_seconds'])
+        status = self.get_status()
+        status.update({
+            'launch': plan,
+            'cds': cds_mode,
+            'ready': result['event'] == 'done',
+            'event': result['event'],
+            'line': result['line'],
+            'seconds': result['seconds'],
+            'reported_seconds': result['reported_seconds'],
+        })
+        return status
+    
+    def _warn_players(self, countdown, action, on_phase):
+        """Countdown in chat, announcing at the usual marks down to the last few seconds"""
+        marks = [m for m in (300, 120, 60, 30, 10, 5, 4, 3, 2, 1) if m < countdown]
+        for remaining in [countdown] + marks:
+            self.queue_command(f"say Server {action} in {remaining} second{'s' if remaining != 1 else ''}")
+            next_mark = next((m for m in marks if m < remaining), 0)
+            if on_phase:
+                on_phase('warn', remaining)
+            time.sleep(remaining - next_mark)
+    
+    def _save(self, timeout):
+        """save-all flush and wait until the world is on disk, returns False if it never confirmed"""
+        position = self.logs.position()
+        try:
+            output = self.queue_command('save-all flush').result(timeout)
+        except SessionError:
+            # Nothing took the command, no save is coming
+            return False
+        except Exception:
+            output = None
+        # RCON answers once the flush is done, through the console the log has to say so
+        if output and 'Saved the game' in output:
+            return True
+        result = self.logs.wait(position, until=('save_complete', 'crash'), timeout=timeout)
+        return result['event'] == 'save_complete'
+    
+    def _signal(self, pid, signal, timeout):
+        """Send signal to pid and wait up to timeout for it to go, True once it is gone"""
+        ticks = max(1, int(timeout * 5))
+        _, _, code = self.ssh.execute_many([
+            f"kill -{signal} {pid} 2>/dev/null; "
+            f"for i in $(seq {ticks}); do kill -0 {pid} 2>/dev/null || exit 0; sleep 0.2; done; exit 1"
+        ], timeout=timeout + 15)[0]
+        return code == 0
+    
+    def stop(self, on_event=None, countdown=0, on_phase=None, action="stopping"):
+        """Staged shutdown: warn, save, stop, then SIGTERM and SIGKILL only past their deadlines
+        
+        on_phase(phase, value) reports countdown marks ('warn', seconds left)
+        and each finished phase ('save', 'stop', 'term', 'kill' with its
+        duration). Returns {stopped, forced, signal, saved, seconds, phases,
+        events}.
+        """
+        pid = self.backend.status()['pid']
+        if pid:
+            self.expected_exits.add(pid)
+        started = time.monotonic()
+        phases = {}
+        result = {'stopped': True, 'forced': False, 'signal': None, 'saved': None,
+                  'phases': phases, 'events': {}}
         
-        if output.strip():
-            server_type = "Forge" if "forge" in output.lower() else "Vanilla"
-            if "fabric" in output.lower():
-                server_type = "Fabric"
-            return {"running": True, "type": server_type}
+        def phase(name, since):
+            phases[name] = time.monotonic() - since
+            if on_phase:
+                on_phase(name, phases[name])
         
-        forge_check, _ = self.ssh.execute(f"ls {self.mc_dir}/server.jar 2>&1")
-        installed = "server.jar" in forge_check
+        if pid:
+            if countdown > 0:
+                begun = time.monotonic()
+                self._warn_players(countdown, action, on_phase)
+                phases['warn'] = time.monotonic() - begun
+            
+            # Flushing first means stop itself has little left to write
+            begun = time.monotonic()
+            result['saved'] = self._save(self.save_timeout)
+            phase('save', begun)
+            
+            begun = time.monotonic()
+            position = self.logs.position()
+            exited = False
+            # Started by hand it is in no session, then signals are all that is left
+            if self._console(['stop']):
+                watched = self.logs.wait(position, until=(), timeout=self.stop_timeout,
+                                         on_event=on_event, since=begun)
+                result['events'] = watched['events']
+                exited = watched['event'] == 'exited'
+            phase('stop', begun)
+        else:
+            exited = True
         
-        return {"running": False, "installed": installed}
+        if not exited:
+            # The JVM's shutdown hook still saves on SIGTERM, SIGKILL is the last resort
+            result['forced'] = True
+            begun = time.monotonic()
+            result['signal'] = 'TERM'
+            exited = self._signal(pid, 'TERM', self.term_timeout)
+            phase('term', begun)
+            if not exited:
+                begun = time.monotonic()
+                result['signal'] = 'KILL'
+                self._signal(pid, 'KILL', 10)
+                phase('kill', begun)
+        
+        self.backend.quit()
+        
+        result['seconds'] = time.monotonic() - started
+        return result
     
-    def send_command(self, command):
-        self.ssh.execute(f"screen -S minecraft -X stuff '{command}^M'")
-        return True
+    def restart(self, memory=None, on_event=None, countdown=0, on_phase=None):
+        """Stop then start, downtime runs from the stop command until the server is ready again
+        
+        The launch plan is worked out while the server is still up so the
+        gap between java exiting and the new one launching is as short as
+        possible.
+        """
+        self.launch_plan(memory)
+        self.connection_settings()
+        stopped = self.stop(on_event, countdown, on_phase, action="restarting")
+        # Countdown and save happen with the server still playable, they are not downtime
+        down_since = time.monotonic() - stopped['phases'].get('stop', 0) - \
+            stopped['phases'].get('term', 0) - stopped['phases'].get('kill', 0)
+        status = self.start(memory, on_event=on_event)
+        status['stop_seconds'] = stopped['seconds']
+        status['forced'] = stopped['forced']
+        status['saved'] = stopped['saved']
+        status['phases'] = stopped['phases']
+        status['downtime'] = time.monotonic() - down_since
+        return status
+    
+    def get_status(self):
+        """running, type and installed, plus the JVM's /proc sample under 'process' and the host's under 'host'"""
+        sample = self.inspector.sample()
+        status = {
+            'running': sample['running'],
+            'installed': sample['installed'],
+            'process': sample['process'],
+            'host': sample['host'],
+        }
+        if sample['process']:
+            status['type'] = sample['process']['type']
+        return status
+    
+    def connection_settings(self, max_age=60):
+        """Game/RCON ports and the RCON password from server.properties, re-read at most every max_age seconds"""
+        with self._settings_lock:
+            if self._settings and time.monotonic() - self._settings_checked < max_age:
+                return self._settings
+            
+            output, _ = self.ssh.execute(
+                "grep -E '^(server-ip|server-port|enable-rcon|rcon\\.port|rcon\\.password)=' "
+                f"{self.mc_dir}/server.properties 2>/dev/null",
+                retry=True
+            )
+            props = dict(line.split('=', 1) for line in output.strip().split('\n') if '=' in line)
+            props = {key: value.strip() for key, value in props.items()}
+            
+            def port(key, default):
+                value = props.get(key, '')
+                return int(value) if value.isdigit() else default
+            
+            self._settings = {
+                # An empty server-ip means every interface, loopback included
+                'host': props.get('server-ip') or '127.0.0.1',
+                'server_port': port('server-port', 25565),
+                'rcon_enabled': props.get('enable-rcon') == 'true',
+                'rcon_port': port('rcon.port', 25575),
+                'rcon_password': props.get('rcon.password', ''),
+            }
+            self._settings_checked = time.monotonic()
+            return self._settings
+    
+    def get_rcon(self):
+        """Pooled RCON client tunnelled over SSH, None when RCON is not enabled"""
+        settings = self.connection_settings()
+        key = (settings['rcon_enabled'], settings['host'], settings['rcon_port'], settings['rcon_password'])
+        with self._rcon_lock:
+            if key != self._rcon_key:
+                if self.rcon:
+                    self.rcon.close()
+                self.rcon = None
+                if settings['rcon_enabled'] and settings['rcon_password']:
+                    host, port = settings['host'], settings['rcon_port']
+                    self.rcon = RconPool(lambda: self.ssh.open_tunnel(host, port),
+                                         settings['rcon_password'])
+                self._rcon_key = key
+            return self.rcon
+    
+    def ping(self, timeout=5):
+        """Server List Ping through the SSH connection: online, max, sample, motd, version, latency_ms"""
+        settings = self.connection_settings()
+        host, port = settings['host'], settings['server_port']
+        probe = StatusProbe(lambda: self.ssh.open_tunnel(host, port), host=host, port=port,
+                            timeout=timeout)
+        return probe.status()
+    
+    def queue_command(self, command, coalesce=False):
+        """Queue a console command behind any others, returns a Future for its output"""
+        return self.commands.submit(command, coalesce)
+    
+    def send_command(self, command, coalesce=False):
+        """Run a console command, returns its output over RCON or None when it went through the console"""
+        return self.queue_command(command, coalesce).result()
+    
+    def send_commands(self, commands):
+        """Run several console commands in order, returns their outputs"""
+        return [future.result() for future in self.commands.submit_many(commands)]
+    
+    def _send_batch(self, commands):
+        """One write for a batch from the command queue, pipelined over RCON when possible"""
+        rcon = self.get_rcon()
+        if rcon:
+            try:
+                return rcon.execute_many(commands)
+            except RconError:
+                # Not up yet or misconfigured, the console still works
+                pass
+        
+        if not self._console(commands):
+            raise SessionError(f"No {self.backend.name} session to send to")
+        return [None] * len(commands)
+    
+    def _console(self, commands):
+        """Type commands into the server's session, False when there is none"""
+        # After a backend switch the server may still sit in the old kind of session
+        return self.backend.send(commands) or any(
+            self._backend(name).send(commands) for name in BACKENDS if name != self.backend.name)
+    
+    def close(self):
+        """Stop sampling and watching, cancel queued commands and drop pooled RCON connections"""
+        self.ticks.stop()
+        self.watchdog.stop()
+        self.pregen.stop()
+        self.hibernation.stop()
+        self.commands.close()
+        if self.rcon:
+            self.rcon.close()
     
     def get_logs(self, lines=50):
-        output, _ = self.ssh.execute(f"cd {self.mc_dir} && tail -{lines} logs/latest.log 2>/dev/null || echo 'No logs'")
+        output, _ = self.ssh.execute(f"cd {self.mc_dir} && tail -{lines} logs/latest.log 2>/dev/null || echo 'No logs'", retry=True)
         return output
     
-    def cleanup_screens(self):
-        output, _ = self.ssh.execute("screen -ls | grep minecraft | awk '{print $1}'")
-        if output.strip():
-            sessions = output.strip().split('\n')
-            for session in sessions:
-                if session.strip():
-                    self.ssh.execute(f"screen -S {session} -X quit 2>/dev/null || true")
-            self.ssh.execute("pkill -f 'java.*server.jar' 2>/dev/null || true")
-            return len(sessions)
-        return 0
+    def cleanup_sessions(self):
+        """Kill the server and tear its session down without saving, returns True if one was running"""
+        pid = self.backend.status()['pid']
+        if pid:
+            self.expected_exits.add(pid)
+            self.ssh.execute(f"kill -KILL {pid} 2>/dev/null || true")
+        self.backend.quit()
+        return bool(pid)
+    
+    # Name from when screen was the only backend
+    cleanup_screens = cleanup_sessions
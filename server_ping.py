@@ -0,0 +1,180 @@
+"""Server List Ping and GameSpy4 Query probes"""
+import json
+import os
+import socket
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+class PingError(Exception):
+    pass
+
+def _varint(value):
+    value &= 0xFFFFFFFF
+    out = b''
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out += bytes([byte | 0x80])
+        else:
+            return out + bytes([byte])
+
+def _string(text):
+    data = text.encode('utf-8')
+    return _varint(len(data)) + data
+
+def _packet(packet_id, payload=b''):
+    body = _varint(packet_id) + payload
+    return _varint(len(body)) + body
+
+def _recv_exact(sock, count):
+    data = b''
+    while len(data) < count:
+        chunk = sock.recv(count - len(data))
+        if not chunk:
+            raise PingError("Connection closed mid-response")
+        data += chunk
+    return data
+
+def _read_varint(sock):
+    value = 0
+    for shift in range(0, 35, 7):
+        byte = _recv_exact(sock, 1)[0]
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value
+    raise PingError("VarInt too long")
+
+def _unpack_varint(data, offset):
+    value = 0
+    for shift in range(0, 35, 7):
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, offset
+    raise PingError("VarInt too long")
+
+def flatten_text(component):
+    """Plain text of a chat component, MOTDs come as strings or nested JSON"""
+    if isinstance(component, str):
+        return component
+    if isinstance(component, list):
+        return ''.join(flatten_text(part) for part in component)
+    if isinstance(component, dict):
+        return component.get('text', '') + ''.join(flatten_text(part) for part in component.get('extra', []))
+    return ''
+
+class StatusProbe:
+    """Server List Ping (1.7+) over any socket-like connection, including an SSH tunnel"""
+    def __init__(self, connect, host='localhost', port=25565, timeout=5):
+        # connect() returns a fresh socket-like object to the game port
+        self.connect = connect
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+    
+    def status(self):
+        """Returns online, max, sample, motd, version, protocol and latency_ms"""
+        started = time.monotonic()
+        try:
+            sock = self.connect()
+        except Exception as e:
+            raise PingError(f"Could not reach {self.host}:{self.port}: {e}")
+        
+        try:
+            sock.settimeout(self.timeout)
+            connect_ms = (time.monotonic() - started) * 1000
+            # Handshake into the status state, then ask for the status JSON
+            handshake = _varint(-1) + _string(self.host) + struct.pack('>H', self.port) + _varint(1)
+            sock.sendall(_packet(0x00, handshake) + _packet(0x00))
+            
+            length = _read_varint(sock)
+            payload = _recv_exact(sock, length)
+            packet_id, offset = _unpack_varint(payload, 0)
+            if packet_id != 0x00:
+                raise PingError(f"Unexpected packet 0x{packet_id:02x}")
+            size, offset = _unpack_varint(payload, offset)
+            info = json.loads(payload[offset:offset + size].decode('utf-8'))
+            
+            # Ping/pong on the open connection measures one clean round trip
+            token = struct.unpack('>q', os.urandom(8))[0]
+            sent = time.monotonic()
+            sock.sendall(_packet(0x01, struct.pack('>q', token)))
+            length = _read_varint(sock)
+            pong = _recv_exact(sock, length)
+            latency_ms = (time.monotonic() - sent) * 1000
+            if pong[1:] != struct.pack('>q', token):
+                raise PingError("Pong did not echo the ping token")
+        except (OSError, ValueError, struct.error) as e:
+            raise PingError(f"Status ping failed: {e}")
+        finally:
+            try:
+                sock.close()
+            except Exception:
+                pass
+        
+        players = info.get('players', {})
+        version = info.get('version', {})
+        return {
+            'online': players.get('online', 0),
+            'max': players.get('max', 0),
+            'sample': [p.get('name', '') for p in players.get('sample', []) or []],
+            'motd': flatten_text(info.get('description', '')),
+            'version': version.get('name', ''),
+            'protocol': version.get('protocol'),
+            'latency_ms': latency_ms,
+            'connect_ms': connect_ms,
+            'modded': 'forgeData' in info or 'modinfo' in info,
+        }
+
+def query(host, port=25565, timeout=3):
+    """GameSpy4 full stat over UDP, needs enable-query and a directly reachable query port"""
+    session = int.from_bytes(os.urandom(4), 'big') & 0x0F0F0F0F
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.settimeout(timeout)
+    try:
+        started = time.monotonic()
+        sock.sendto(b'\xfe\xfd\x09' + struct.pack('>i', session), (host, port))
+        data, _ = sock.recvfrom(2048)
+        token = int(data[5:].split(b'\x00')[0])
+        
+        sock.sendto(b'\xfe\xfd\x00' + struct.pack('>ii', session, token) + b'\x00' * 4, (host, port))
+        data, _ = sock.recvfrom(65535)
+        latency_ms = (time.monotonic() - started) * 1000 / 2
+    except (OSError, ValueError) as e:
+        raise PingError(f"Query failed: {e}")
+    finally:
+        sock.close()
+    
+    # type, session, 11 bytes of padding, then key\0value\0 pairs, then the player list
+    body = data[16:]
+    info_part, _, players_part = body.partition(b'\x00\x00\x01player_\x00\x00')
+    fields = info_part.split(b'\x00')
+    info = {
+        fields[i].decode('utf-8', errors='replace'): fields[i + 1].decode('utf-8', errors='replace')
+        for i in range(0, len(fields) - 1, 2)
+    }
+    players = [name.decode('utf-8', errors='replace') for name in players_part.split(b'\x00') if name]
+    return {
+        'online': int(info.get('numplayers', 0) or 0),
+        'max': int(info.get('maxplayers', 0) or 0),
+        'sample': players,
+        'motd': info.get('hostname', ''),
+        'version': info.get('version', ''),
+        'map': info.get('map', ''),
+        'plugins': info.get('plugins', ''),
+        'latency_ms': latency_ms,
+    }
+
+def probe_many(probes, workers=8):
+    """Run status() on several probes at once, returns a result or the PingError for each"""
+    def run(probe):
+        try:
+            return probe.status()
+        except PingError as e:
+            return e
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(probes)))) as pool:
+        return list(pool.map(run, probes))
@@ -1,42 +1,645 @@
 """SSH connection and command execution"""
 import paramiko
+import re
+import select
+import socket
+import threading
 import time
+import uuid
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from command_metrics import CommandMetrics
+
+def _new_marker():
+    return f"__MSM_{uuid.uuid4().hex}__"
+
+def _frame(command, marker):
+    """Wrap a command so its stdout, stderr and exit code can be cut back out of a shared stream"""
+    return (
+        f"echo '{marker}'; echo '{marker}' >&2\n"
+        f"(\n{command}\n) < /dev/null\n"
+        f"rc=$?; printf '\\n%s end\\n' '{marker}' >&2; printf '\\n%s %d\\n' '{marker}' $rc\n"
+    )
+
+def _unframe(out, err, marker):
+    """Extract (output, error, exit_code) for one framed command"""
+    out_match = re.search(
+        re.escape(marker) + r"\n(.*?)\n" + re.escape(marker) + r" (\d+)\n", out, re.S
+    )
+    err_match = re.search(
+        re.escape(marker) + r"\n(.*?)\n" + re.escape(marker) + r" end\n", err, re.S
+    )
+    if not out_match:
+        raise Exception("Malformed shell output")
+    error = err_match.group(1) if err_match else ''
+    return out_match.group(1), error, int(out_match.group(2))
+
+def _read_channel(channel, timeout=None):
+    """Yield ('stdout' | 'stderr', bytes) from both pipes until the remote side is done
+    
+    timeout is how long the command may go without printing anything, like
+    the read timeout of a plain exec_command.
+    """
+    last_data = time.monotonic()
+    while True:
+        got_data = False
+        while channel.recv_ready():
+            got_data = True
+            yield 'stdout', channel.recv(32768)
+        while channel.recv_stderr_ready():
+            got_data = True
+            yield 'stderr', channel.recv_stderr(32768)
+        
+        if (channel.eof_received or channel.closed) and not (
+                channel.recv_ready() or channel.recv_stderr_ready()):
+            return
+        if got_data:
+            last_data = time.monotonic()
+        elif timeout is not None and time.monotonic() - last_data > timeout:
+            channel.close()
+            raise TimeoutError(f"Command printed nothing for {timeout}s")
+        if not got_data:
+            # select only wakes for stdout, so keep the wait short enough for stderr
+            select.select([channel], [], [], 0.02)
+
+class ShellSession:
+    """A long-lived remote shell that runs one framed command at a time"""
+    def __init__(self, client):
+        self.channel = client.get_transport().open_session()
+        self.channel.exec_command('/bin/sh')
+        self.lock = threading.Lock()
+    
+    @property
+    def alive(self):
+        return not self.channel.closed and not self.channel.exit_status_ready()
+    
+    def run_script(self, script, marker, timeout=30):
+        """Send a script and read until the marker closes both streams"""
+        try:
+            self.channel.sendall(script.encode('utf-8'))
+        except Exception as e:
+            raise EOFError(f"Shell session closed: {e}")
+        
+        out_end = re.compile(rb"\n" + re.escape(marker.encode()) + rb" \d+\n")
+        # Not the bare marker: after an earlier frame's trailer that is also how the last frame opens
+        err_end = b"\n" + marker.encode() + b" end\n"
+        out, err = b'', b''
+        last_data = time.monotonic()
+        
+        while not (out_end.search(out) and err_end in err):
+            # Idle time, not total: a long but chatty script keeps going
+            if timeout is not None and time.monotonic() - last_data > timeout:
+                self.close()
+                raise TimeoutError(f"Command printed nothing for {timeout}s")
+            if self.channel.closed:
+                raise ConnectionError("Shell session died mid-command")
+            
+            # stderr never wakes select, so poll quickly once stdout is complete
+            select.select([self.channel], [], [], 0.005 if out_end.search(out) else 0.05)
+            received = len(out) + len(err)
+            while self.channel.recv_ready():
+                out += self.channel.recv(32768)
+            while self.channel.recv_stderr_ready():
+                err += self.channel.recv_stderr(32768)
+            if len(out) + len(err) > received:
+                last_data = time.monotonic()
+        
+        return out.decode('utf-8', errors='ignore'), err.decode('utf-8', errors='ignore')
+    
+    def run(self, command, timeout=30):
+        marker = _new_marker()
+        out, err = self.run_script(_frame(command, marker), marker, timeout)
+        return _unframe(out, err, marker)
+    
+    def close(self):
+        try:
+            self.channel.close()
+        except Exception:
+            pass
+
+class ChannelPool:
+    """Caps concurrent exec channels on one transport and hands out slots in FIFO order"""
+    def __init__(self, max_channels=4):
+        self.max_channels = max_channels
+        self._cond = threading.Condition()
+        self._waiting = deque()
+        self._active = 0
+        self.stats = {
+            'acquired': 0,
+            'timeouts': 0,
+            'total_wait': 0.0,
+            'max_wait': 0.0,
+            'last_wait': 0.0,
+        }
+    
+    def acquire(self, timeout=None):
+        """Wait for a free channel slot, returns the time spent queued"""
+        ticket = object()
+        start = time.monotonic()
+        
+        with self._cond:
+            self._waiting.append(ticket)
+            try:
+                while self._waiting[0] is not ticket or self._active >= self.max_channels:
+                    remaining = None
+                    if timeout is not None:
+                        remaining = timeout - (time.monotonic() - start)
+                        if remaining <= 0:
+                            self.stats['timeouts'] += 1
+                            raise TimeoutError(f"No SSH channel free after {timeout}s")
+                    self._cond.wait(remaining)
+            except BaseException:
+                self._waiting.remove(ticket)
+                self._cond.notify_all()
+                raise
+            
+            self._waiting.popleft()
+            self._active += 1
+            self._cond.notify_all()
+            
+            waited = time.monotonic() - start
+            self.stats['acquired'] += 1
+            self.stats['total_wait'] += waited
+            self.stats['last_wait'] = waited
+            self.stats['max_wait'] = max(self.stats['max_wait'], waited)
+        
+        return waited
+    
+    def release(self):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+    
+    @contextmanager
+    def slot(self, timeout=None):
+        waited = self.acquire(timeout)
+        try:
+            yield waited
+        finally:
+            self.release()
+    
+    def get_stats(self):
+        with self._cond:
+            stats = dict(self.stats)
+            stats['active'] = self._active
+            stats['queued'] = len(self._waiting)
+            stats['max_channels'] = self.max_channels
+        stats['avg_wait'] = stats['total_wait'] / stats['acquired'] if stats['acquired'] else 0.0
+        return stats
+
+class SFTPPool:
+    """Keeps a few SFTP sessions open and lends them out one caller at a time"""
+    def __init__(self, ssh, size=4):
+        self.ssh = ssh
+        self.size = size
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._idle = []
+        self.generation = 0
+        self.stats = {'opened': 0, 'reused': 0, 'discarded': 0}
+    
+    @contextmanager
+    def session(self, timeout=60):
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f"No SFTP session free after {timeout}s")
+        
+        entry = None
+        try:
+            entry = self._checkout()
+            yield entry[1]
+        except BaseException:
+            # A failed transfer may leave the session mid-request, don't hand it out again
+            if entry:
+                self._discard(entry[1])
+            entry = None
+            raise
+        finally:
+            if entry:
+                self._checkin(entry)
+            self._slots.release()
+    
+    def _checkout(self):
+        with self._lock:
+            while self._idle:
+                generation, sftp = self._idle.pop()
+                if generation == self.generation and self._healthy(sftp):
+                    self.stats['reused'] += 1
+                    return generation, sftp
+                self._discard(sftp)
+            generation = self.generation
+        
+        if not self.ssh.client:
+            raise Exception("Not connected")
+        sftp = self.ssh.client.open_sftp()
+        self.stats['opened'] += 1
+        return generation, sftp
+    
+    def _checkin(self, entry):
+        with self._lock:
+            if entry[0] == self.generation and self._healthy(entry[1]):
+                self._idle.append(entry)
+                return
+        self._discard(entry[1])
+    
+    def _healthy(self, sftp):
+        channel = sftp.get_channel()
+        return channel is not None and not channel.closed and channel.get_transport().is_active()
+    
+    def _discard(self, sftp):
+        self.stats['discarded'] += 1
+        try:
+            sftp.close()
+        except Exception:
+            pass
+    
+    def invalidate(self):
+        """Drop every idle session, sessions still lent out are closed when returned"""
+        with self._lock:
+            self.generation += 1
+            idle, self._idle = self._idle, []
+        for _, sftp in idle:
+            self._discard(sftp)
+
+class HealthMonitor(threading.Thread):
+    """Probes the transport for RTT and brings the connection back when it drops"""
+    def __init__(self, ssh, interval=10, probe_timeout=10):
+        super().__init__(daemon=True)
+        self.ssh = ssh
+        self.interval = interval
+        self.probe_timeout = probe_timeout
+        self.stopped = threading.Event()
+    
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            transport = self.ssh.client.get_transport() if self.ssh.client else None
+            if transport is None or not transport.is_active():
+                try:
+                    self.ssh.reconnect()
+                except Exception:
+                    pass
+                continue
+            
+            rtt = self.probe(transport)
+            if rtt is None:
+                continue
+            self.ssh.record_rtt(rtt)
+    
+    def probe(self, transport):
+        """Time a global request round trip, closing the transport if it never answers"""
+        # A half-open TCP link would block global_request forever, so cut it loose
+        watchdog = threading.Timer(self.probe_timeout, transport.close)
+        watchdog.daemon = True
+        watchdog.start()
+        start = time.monotonic()
+        try:
+            # Servers reply with a failure message, which is still a full round trip
+            transport.global_request('keepalive@openssh.com', wait=True)
+        except Exception:
+            return None
+        finally:
+            watchdog.cancel()
+        
+        if not transport.is_active():
+            return None
+        return time.monotonic() - start
+    
+    def stop(self):
+        self.stopped.set()
 
 class SSHManager:
-    def __init__(self, hostname, username, password, port=22):
+    # Errors that mean the transport itself went away rather than the command failing
+    LINK_ERRORS = (paramiko.SSHException, EOFError, ConnectionError, socket.error)
+    
+    def __init__(self, hostname, username, password, port=22, max_channels=4,
+                 persistent_shell=False, keepalive=15, max_reconnect_attempts=6,
+                 sftp_sessions=4):
         self.hostname = hostname
         self.username = username
         self.password = password
         self.port = port
         self.client = None
+        self.pool = ChannelPool(max_channels)
+        self.sftp_pool = SFTPPool(self, sftp_sessions)
+        self.use_shell = persistent_shell
+        self.shell = None
+        self.keepalive = keepalive
+        self.max_reconnect_attempts = max_reconnect_attempts
+        self.monitor = None
+        self.listeners = []
+        self.reconnects = 0
+        self.rtt = {'last': None, 'avg': None, 'min': None, 'max': None, 'samples': 0}
+        self.rtt_history = deque(maxlen=120)
+        self.metrics = CommandMetrics()
+        self._reconnect_lock = threading.Lock()
+        self._closing = False
     
     def connect(self):
-        self.client = paramiko.SSHClient()
-        self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        self.client.connect(
+        self._closing = False
+        self._open_client()
+        
+        if not self.monitor or not self.monitor.is_alive():
+            self.monitor = HealthMonitor(self, interval=self.keepalive)
+            self.monitor.start()
+        return True
+    
+    def _open_client(self):
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        client.connect(
             self.hostname,
             port=self.port,
             username=self.username,
             password=self.password,
             timeout=10
         )
-        return True
+        transport = client.get_transport()
+        if self.keepalive:
+            transport.set_keepalive(self.keepalive)
+        # Framed shell commands are many tiny writes, don't let Nagle hold them back
+        try:
+            transport.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except (AttributeError, OSError):
+            pass
+        self.client = client
     
     def disconnect(self):
+        self._closing = True
+        if self.monitor:
+            self.monitor.stop()
+            self.monitor = None
+        self.close_shell()
+        self.sftp_pool.invalidate()
         if self.client:
             self.client.close()
             self.client = None
     
-    def execute(self, command, timeout=30):
+    def is_connected(self):
+        transport = self.client.get_transport() if self.client else None
+        return transport is not None and transport.is_active()
+    
+    def reconnect(self):
+        """Re-establish a dropped connection with exponential backoff"""
+        with self._reconnect_lock:
+            if self._closing:
+                raise Exception("Not connected")
+            if self.is_connected():
+                # Another thread already brought the link back
+                return True
+            
+            dropped_at = time.monotonic()
+            self._emit('disconnected', {})
+            self.close_shell()
+            self.sftp_pool.invalidate()
+            if self.client:
+                self.client.close()
+            
+            delay = 1
+            last_error = None
+            for attempt in range(1, self.max_reconnect_attempts + 1):
+                self._emit('reconnecting', {'attempt': attempt, 'delay': delay})
+                try:
+                    self._open_client()
+                except Exception as e:
+                    last_error = e
+                    time.sleep(delay)
+                    delay = min(delay * 2, 30)
+                    if self._closing:
+                        break
+                    continue
+                
+                self.reconnects += 1
+                self._emit('reconnected', {
+                    'attempt': attempt,
+                    'downtime': time.monotonic() - dropped_at,
+                })
+                return True
+            
+            self._emit('reconnect_failed', {'attempts': self.max_reconnect_attempts})
+            raise Exception(f"Reconnect failed: {last_error}" if not self._closing else "Not connected")
+    
+    def add_listener(self, callback):
+        """Register callback(event, info) for rtt/disconnected/reconnecting/reconnected events"""
+        self.listeners.append(callback)
+    
+    def _emit(self, event, info):
+        for callback in list(self.listeners):
+            try:
+                callback(event, info)
+            except Exception:
+                pass
+    
+    def record_rtt(self, rtt):
+        self.rtt_history.append(rtt)
+        stats = self.rtt
+        stats['last'] = rtt
+        stats['avg'] = rtt if stats['avg'] is None else stats['avg'] * 0.8 + rtt * 0.2
+        stats['min'] = rtt if stats['min'] is None else min(stats['min'], rtt)
+        stats['max'] = rtt if stats['max'] is None else max(stats['max'], rtt)
+        stats['samples'] += 1
+        self._emit('rtt', dict(stats))
+    
+    def get_health(self):
+        return {
+            'connected': self.is_connected(),
+            'reconnects': self.reconnects,
+            'rtt': dict(self.rtt),
+            'pool': self.pool.get_stats(),
+        }
+    
+    def _with_reconnect(self, func, retry):
+        """Run func, replaying it once after a reconnect if the link dropped and it is safe to repeat"""
         if not self.client:
             raise Exception("Not connected")
+        if not self.is_connected():
+            self.reconnect()
+        
+        try:
+            return func()
+        except self.LINK_ERRORS:
+            if self.is_connected() or self._closing:
+                raise
+            if not retry:
+                threading.Thread(target=self._reconnect_quietly, daemon=True).start()
+                raise
         
-        stdin, stdout, stderr = self.client.exec_command(command, timeout=timeout)
-        output = stdout.read().decode('utf-8', errors='ignore')
-        error = stderr.read().decode('utf-8', errors='ignore')
+        self.reconnect()
+        return func()
+    
+    def _reconnect_quietly(self):
+        try:
+            self.reconnect()
+        except Exception:
+            pass
+    
+    def execute(self, command, timeout=30, retry=False):
+        """Run a command, retry=True marks it safe to replay after a reconnect
+        
+        timeout bounds the wait for a free channel and then each stretch
+        without output, not the whole run, so a long command that keeps
+        printing (or a quiet one that finishes in time) is never cut off.
+        """
+        with self.metrics.measure(command) as sample:
+            return self._with_reconnect(lambda: self._execute_once(command, timeout, sample), retry)
+    
+    def _execute_once(self, command, timeout, sample):
+        marker = _new_marker()
+        raw = self._run_in_shell(_frame(command, marker), marker, timeout, sample)
+        if raw is not None:
+            output, error, sample['exit_code'] = _unframe(raw[0], raw[1], marker)
+            return output, error
+        
+        output, error, sample['exit_code'] = self._exec(command, timeout, sample)
         return output, error
     
+    def execute_many(self, commands, timeout=30, retry=False):
+        """Run several commands in one round trip, returns [(output, error, exit_code), ...]
+        
+        timeout works as in execute, for the batch as a whole.
+        """
+        if not commands:
+            return []
+        with self.metrics.measure(' ; '.join(commands), len(commands)) as sample:
+            results = self._with_reconnect(
+                lambda: self._execute_many_once(commands, timeout, sample), retry)
+            sample['exit_code'] = [code for _, _, code in results]
+            return results
+    
+    def _execute_many_once(self, commands, timeout, sample):
+        markers = [_new_marker() for _ in commands]
+        script = ''.join(_frame(command, marker) for command, marker in zip(commands, markers))
+        
+        raw = self._run_in_shell(script, markers[-1], timeout, sample)
+        if raw is None:
+            raw = self._exec(script, timeout, sample)
+        
+        return [_unframe(raw[0], raw[1], marker) for marker in markers]
+    
+    def _exec(self, command, timeout, sample):
+        """Run on a fresh exec channel, returns (output, error, exit_code)"""
+        with self.pool.slot(timeout) as waited:
+            sample['kind'] = 'exec'
+            sample['queue_wait'] += waited
+            channel = self.client.get_transport().open_session(timeout=timeout)
+            try:
+                channel.exec_command(command)
+                sample['bytes_out'] += len(command)
+                # Drain both pipes together so a chatty stderr can't stall stdout
+                out, err = [], []
+                for stream, data in _read_channel(channel, timeout):
+                    (out if stream == 'stdout' else err).append(data)
+                    sample['bytes_in'] += len(data)
+                exit_code = channel.recv_exit_status()
+            finally:
+                channel.close()
+        output = b''.join(out).decode('utf-8', errors='ignore')
+        error = b''.join(err).decode('utf-8', errors='ignore')
+        return output, error, exit_code
+    
+    def execute_stream(self, command, timeout=None, pooled=True):
+        """Yield (stream, line) as the command prints, the generator returns the exit code
+        
+        pooled=False skips the channel pool, for watchers that stay open for
+        the whole session and would otherwise hold a slot forever. timeout
+        works as in execute.
+        """
+        if not self.client:
+            raise Exception("Not connected")
+        if not self.is_connected():
+            self.reconnect()
+        
+        with self.metrics.measure(command) as sample:
+            sample['kind'] = 'stream'
+            with (self.pool.slot(timeout) if pooled else nullcontext(0.0)) as waited:
+                sample['queue_wait'] = waited
+                channel = self.client.get_transport().open_session(timeout=timeout)
+                try:
+                    channel.exec_command(command)
+                    sample['bytes_out'] = len(command)
+                    pending = {'stdout': b'', 'stderr': b''}
+                    for stream, data in _read_channel(channel, timeout):
+                        sample['bytes_in'] += len(data)
+                        pending[stream] += data
+                        *lines, pending[stream] = pending[stream].split(b'\n')
+                        for line in lines:
+                            yield stream, line.rstrip(b'\r').decode('utf-8', errors='ignore')
+                    
+                    for stream, rest in pending.items():
+                        if rest:
+                            yield stream, rest.rstrip(b'\r').decode('utf-8', errors='ignore')
+                    sample['exit_code'] = channel.recv_exit_status()
+                    return sample['exit_code']
+                finally:
+                    # Also runs when the caller stops iterating early
+                    channel.close()
+    
+    def execute_live(self, command, on_line, timeout=None):
+        """Call on_line(stream, line) for each line of output, returns the exit code"""
+        stream = self.execute_stream(command, timeout)
+        while True:
+            try:
+                name, line = next(stream)
+            except StopIteration as done:
+                return done.value
+            on_line(name, line)
+    
+    def _get_shell(self):
+        if not self.use_shell or not self.client:
+            return None
+        if self.shell and self.shell.alive:
+            return self.shell
+        
+        self.close_shell()
+        try:
+            self.shell = ShellSession(self.client)
+        except Exception:
+            self.shell = None
+        return self.shell
+    
+    def _run_in_shell(self, script, marker, timeout, sample):
+        """Run a framed script through the persistent shell if it is free, None means use exec instead"""
+        shell = self._get_shell()
+        if not shell or not shell.lock.acquire(blocking=False):
+            return None
+        
+        try:
+            sample['kind'] = 'shell'
+            raw = shell.run_script(script, marker, timeout)
+            sample['bytes_out'] += len(script)
+            sample['bytes_in'] += len(raw[0]) + len(raw[1])
+            return raw
+        except EOFError:
+            # The script never reached the shell, so plain exec can take it
+            self.close_shell()
+            return None
+        except Exception:
+            self.close_shell()
+            raise
+        finally:
+            shell.lock.release()
+    
+    def close_shell(self):
+        if self.shell:
+            self.shell.close()
+            self.shell = None
+    
+    def open_tunnel(self, host, port, timeout=10):
+        """Socket-like channel to host:port as seen from the server (a direct-tcpip forward)"""
+        if not self.client:
+            raise Exception("Not connected")
+        if not self.is_connected():
+            self.reconnect()
+        return self.client.get_transport().open_channel(
+            'direct-tcpip', (host, port), ('127.0.0.1', 0), timeout=timeout)
+    
     def get_sftp(self):
         if not self.client:
             raise Exception("Not connected")
         return self.client.open_sftp()
+    
+    def sftp_session(self, timeout=60):
+        """Borrow a pooled SFTP session: with ssh.sftp_session() as sftp: ..."""
+        if not self.client:
+            raise Exception("Not connected")
+        if not self.is_connected():
+            self.reconnect()
+        return self.sftp_pool.session(timeout)
@@ -3,6 +3,8 @@ import tkinter as tk
 from tkinter import scrolledtext, messagebox, simpledialog
 import threading
 from ui_components import ModernTheme, ModernButton, Card
+from server_ping import PingError
+from chunk_pregen import describe
 
 class DashboardTab:
     def __init__(self, parent, app):
@@ -11,6 +13,8 @@ class DashboardTab:
         self.auto_refresh = False
         self.refresh_job = None
         self.performance_job = None
+        self.refresh_future = None
+        self.performance_future = None
         self.auto_performance = False
         self.setup_ui()
     
@@ -20,6 +24,9 @@ class DashboardTab:
         stats_frame.pack(fill=tk.X, padx=10, pady=10)
         
         stats = [
+            ("TPS", "tps_label"),
+            ("MSPT", "mspt_label"),
+            ("GC p99", "gc_label"),
             ("CPU", "cpu_label"),
             ("RAM", "ram_label"),
             ("Players", "players_label"),
@@ -38,6 +45,19 @@ class DashboardTab:
                            fg=ModernTheme.DARK['accent'], font=('Segoe UI', 16, 'bold'))
             label.pack(pady=(0, 10))
             setattr(self, attr, label)
+            
+            if title in ("TPS", "MSPT"):
+                # Sparkline of the last few minutes of tick samples
+                chart = tk.Canvas(stat_card, height=36, bg=ModernTheme.DARK['surface'],
+                                  highlightthickness=0)
+                chart.pack(fill=tk.X, padx=8, pady=(0, 8))
+                setattr(self, attr.replace('_label', '_chart'), chart)
+            elif title == "GC p99":
+                # Median/max pause and allocation/promotion rates from the GC log
+                self.gc_detail_label = tk.Label(stat_card, text="", bg=ModernTheme.DARK['surface'],
+                                                fg=ModernTheme.DARK['text_secondary'],
+                                                font=('Segoe UI', 8), justify=tk.CENTER)
+                self.gc_detail_label.pack(pady=(0, 8))
         
         controls = Card(self.frame)
         controls.pack(fill=tk.X, padx=10, pady=10)
@@ -52,6 +72,8 @@ class DashboardTab:
             ("🔍 Check Status", self.check_status, 'primary'),
             ("📦 Install Server", self.install_server, 'warning'),
             ("📊 Performance", self.show_performance, 'primary'),
+            ("☕ JVM Profile", self.show_launch_profile, 'secondary'),
+            ("🗺️ Pre-generate", self.show_pregen, 'secondary'),
         ]
         
         for text, cmd, style in buttons:
@@ -59,6 +81,11 @@ class DashboardTab:
                 side=tk.LEFT, padx=5
             )
         
+        # Chunk pre-generation progress, empty while there is no task
+        self.pregen_label = tk.Label(controls, text="", bg=ModernTheme.DARK['surface'],
+                                     fg=ModernTheme.DARK['text_secondary'], font=('Segoe UI', 9))
+        self.pregen_label.pack(pady=(0, 10))
+        
         console_label = tk.Label(self.frame, text="📟 Server Console",
                                 font=('Segoe UI', 12, 'bold'),
                                 bg=ModernTheme.DARK['bg'],
@@ -170,6 +197,27 @@ class DashboardTab:
     def on_connected(self):
         self.log("✅ Connected")
         self.check_status()
+        self.app.server.ticks.add_listener(lambda sample: self.frame.after(0, self.show_ticks, sample))
+        self.app.server.ticks.add_event_listener(
+            lambda event, info: self.frame.after(0, self.log_ticks_event, event, info))
+        self.app.server.ticks.start()
+        watchdog = self.app.server.watchdog
+        watchdog.archive_dir = self.app.prefs.config_dir / 'crashes' / self.app.ssh.hostname
+        watchdog.auto_restart = self.app.prefs.get('auto_restart', True)
+        watchdog.add_listener(lambda event, info: self.frame.after(0, self.log_watchdog, event, info))
+        watchdog.start()
+        distance = self.app.server.distance
+        distance.enabled = self.app.prefs.get('dynamic_distance', False)
+        distance.add_listener(lambda event, info: self.frame.after(0, self.log_distance, event, info))
+        hibernation = self.app.server.hibernation
+        hibernation.enabled = self.app.prefs.get('hibernate', False)
+        hibernation.idle_minutes = self.app.prefs.get('hibernate_minutes', 15)
+        hibernation.add_listener(lambda event, info: self.frame.after(0, self.log_hibernation, event, info))
+        hibernation.start()
+        pregen = self.app.server.pregen
+        pregen.add_listener(lambda progress: self.frame.after(0, self.show_pregen_progress, progress))
+        # A task left running before a restart of this app carries on
+        threading.Thread(target=pregen.resume, daemon=True).start()
     
     def on_disconnected(self):
         """Handle disconnection"""
@@ -198,8 +246,13 @@ class DashboardTab:
         
         def start():
             try:
-                self.app.server.start()
-                self.log("✅ Server started")
+                status = self.app.server.start(on_event=self.log_lifecycle_event)
+                if status['ready']:
+                    self.log(f"✅ Server ready in {status['seconds']:.1f}s "
+                             f"(server reported {status['reported_seconds']:.1f}s)")
+                    self.log_cds(status['cds'])
+                else:
+                    self.log_start_failure(status)
                 self.app.update_server_status()
             except Exception as e:
                 self.log(f"❌ Error: {e}")
@@ -214,8 +267,16 @@ class DashboardTab:
         
         def stop():
             try:
-                self.app.server.stop()
-                self.log("✅ Server stopped")
+                result = self.app.server.stop(on_event=self.log_lifecycle_event,
+                                              countdown=self.app.prefs.get('shutdown_countdown', 10),
+                                              on_phase=self.log_shutdown_phase)
+                if result['saved'] is False:
+                    self.log("⚠️ The world save was not confirmed before stopping")
+                if result['forced']:
+                    self.log(f"⚠️ Server did not exit in time, sent SIG{result['signal']} "
+                             f"({result['seconds']:.1f}s in total)")
+                else:
+                    self.log(f"✅ Server stopped in {result['seconds']:.1f}s")
                 self.app.update_server_status()
             except Exception as e:
                 self.log(f"❌ Error: {e}")
@@ -230,14 +291,125 @@ class DashboardTab:
         
         def restart():
             try:
-                self.app.server.restart()
-                self.log("✅ Server restarted")
+                status = self.app.server.restart(on_event=self.log_lifecycle_event,
+                                                 countdown=self.app.prefs.get('shutdown_countdown', 10),
+                                                 on_phase=self.log_shutdown_phase)
+                if status['ready']:
+                    self.log(f"✅ Server restarted, {status['downtime']:.1f}s downtime "
+                             f"({status['stop_seconds']:.1f}s stopping, {status['seconds']:.1f}s starting)")
+                    self.log_cds(status['cds'])
+                else:
+                    self.log_start_failure(status)
                 self.app.update_server_status()
             except Exception as e:
                 self.log(f"❌ Error: {e}")
         
         threading.Thread(target=restart, daemon=True).start()
     
+    def log_lifecycle_event(self, event, line, elapsed):
+        """Progress from the log while the server starts or stops"""
+        messages = {
+            'stopping': "⏳ Server is shutting down...",
+            'saving': "💾 Saving worlds...",
+            'saved': "💾 Worlds saved",
+        }
+        if event in messages:
+            self.log(f"{messages[event]} ({elapsed:.1f}s)")
+    
+    def log_shutdown_phase(self, phase, value):
+        """Countdown marks and how long each shutdown phase took"""
+        messages = {
+            'save': "💾 Save phase done",
+            'stop': "⏹️ Server process exited",
+            'term': "⚠️ SIGTERM phase",
+            'kill': "⚠️ SIGKILL sent",
+        }
+        if phase == 'warn':
+            self.log(f"📢 Players warned, {value}s to go")
+        elif phase in messages:
+            self.log(f"{messages[phase]} ({value:.1f}s)")
+    
+    def log_cds(self, mode):
+        if mode == 'use':
+            self.log("📦 Booted from the class data archive")
+        elif mode == 'dump':
+            self.log("📦 A class data archive will be written when the server next stops cleanly")
+    
+    def log_watchdog(self, event, info):
+        """Crashes noticed by the watchdog and what it did about them"""
+        if event == 'crash':
+            self.log(f"💥 Server crashed ({info['count']} in the last {self.app.server.watchdog.window // 60} min)")
+            for report in info['reports']:
+                self.log(f"📄 {report}")
+            if info['saved_to']:
+                self.log(f"💾 Crash details saved to {info['saved_to']}")
+        elif event == 'restarting':
+            self.log(f"🔄 Restarting in {info['delay']}s (attempt {info['attempt']})")
+        elif event == 'recovered':
+            self.log(f"✅ Back up {info['seconds']:.0f}s after the crash (average {info['mttr']:.0f}s)")
+        elif event == 'gave_up':
+            self.log(f"⛔ {info['crashes']} crashes in {info['window'] // 60} min, not restarting again")
+        elif event == 'exited' and not info['expected']:
+            self.log("⏹️ Server stopped from the console")
+        else:
+            return
+        self.app.update_server_status()
+    
+    def log_ticks_event(self, event, info):
+        if event == 'unsupported':
+            via = "over RCON" if info['rcon'] else "through the console (enable RCON to try every method)"
+            self.log(f"⚠️ This server does not report TPS/MSPT {via}, asking again in {info['retry'] // 60} min")
+        elif event == 'supported':
+            self.log(f"📈 TPS/MSPT sampling via {info['source']}")
+    
+    def log_distance(self, event, info):
+        """Distance changes with the load sample that triggered them"""
+        view, simulation = info['previous']
+        change = f"view {view}→{info['view']}, simulation {simulation}→{info['simulation']}"
+        if event == 'reset':
+            self.log(f"↩️ Distances back to server.properties: {change}")
+            return
+        load = f"MSPT {info['mspt']:.1f} (avg {info['average_mspt']:.1f}), TPS {info['tps']:.1f}"
+        if event == 'lowered':
+            self.log(f"📉 Lowered distances, {change} at {load}")
+        elif event == 'raised':
+            self.log(f"📈 Raised distances, {change} at {load}")
+        elif event == 'unsupported':
+            self.log(f"⚠️ {load}: would lower {change}, but this server cannot change distances while running "
+                     "(install Carpet or set Config.DISTANCE_COMMANDS)")
+    
+    def log_hibernation(self, event, info):
+        """Idle server going to sleep and how long waking it took"""
+        if event == 'sleeping':
+            self.log(f"💤 Server hibernating, joining on port {info['port']} wakes it "
+                     "(also while this app is closed)")
+        elif event == 'waking':
+            self.log(f"⏰ {info['player']} is joining, waking the server" if info['player']
+                     else "⏰ Hibernation listener ended, starting the server")
+        elif event == 'awake':
+            if info['seconds'] is None:
+                self.log(f"✅ Server awake, started in {info['boot_seconds']:.1f}s")
+            else:
+                self.log(f"✅ Server awake {info['seconds']:.1f}s after the login attempt "
+                         f"(average {info['average']:.1f}s)")
+        elif event == 'released':
+            self.log("▶️ Hibernation ended by a manual start")
+        elif event == 'failed':
+            self.log(f"❌ Hibernation: {info['reason']}")
+        else:
+            return
+        self.app.update_server_status()
+    
+    def log_start_failure(self, status):
+        if status['event'] == 'failed':
+            self.log(f"❌ Could not launch the server: {status['line']}")
+        elif status['event'] == 'crash':
+            self.log(f"❌ Server crashed while starting: {status['line']}")
+        elif status['event'] == 'exited':
+            self.log(f"❌ Server exited after {status['seconds']:.1f}s without finishing startup")
+        else:
+            self.log(f"⚠️ Server not ready after {status['seconds']:.0f}s, check the logs")
+    
     def check_status(self):
         if not self.app.server:
             return
@@ -255,6 +427,20 @@ class DashboardTab:
         
         threading.Thread(target=check, daemon=True).start()
     
+    def show_launch_profile(self):
+        if not self.app.server:
+            messagebox.showerror("Error", "Not connected to server!")
+            return
+        from dialogs.launch_profile_dialog import LaunchProfileDialog
+        LaunchProfileDialog(self.frame, self.app)
+    
+    def show_pregen(self):
+        if not self.app.server:
+            messagebox.showerror("Error", "Not connected to server!")
+            return
+        from dialogs.pregen_dialog import PregenDialog
+        PregenDialog(self.frame, self.app)
+    
     def install_server(self):
         from dialogs.install_dialog import InstallDialog
         InstallDialog(self.frame, self.app)
@@ -268,8 +454,18 @@ class DashboardTab:
             return
         
         self.log(f">>> {cmd}")
-        self.app.server.send_command(cmd)
         self.cmd_entry.delete(0, tk.END)
+        
+        def show(output, error):
+            if error:
+                self.log(f"❌ Error: {error}")
+            elif output:
+                # RCON hands back what the command printed
+                for line in output.strip().split('\n'):
+                    self.log(f"<<< {line}")
+        
+        self.app.aio.submit(self.app.aio.wrap(self.app.server).send_command(cmd),
+                            callback=lambda output, error: self.frame.after(0, show, output, error))
     
     def toggle_auto_refresh(self):
         self.auto_refresh = self.auto_refresh_var.get()
@@ -280,19 +476,22 @@ class DashboardTab:
     
     def start_auto_refresh(self):
         if self.auto_refresh and self.app.files:
-            def refresh():
-                try:
-                    logs = self.app.files.get_logs(50)
-                    # Only show new logs
-                    current = self.console.get(1.0, tk.END)
-                    if logs not in current:
-                        self.console.delete(1.0, tk.END)
-                        self.console.insert(1.0, logs)
-                        self.console.see(tk.END)
-                except:
-                    pass
+            def refresh(logs, error):
+                if error:
+                    return
+                # Only show new logs
+                current = self.console.get(1.0, tk.END)
+                if logs not in current:
+                    self.console.delete(1.0, tk.END)
+                    self.console.insert(1.0, logs)
+                    self.console.see(tk.END)
             
-            threading.Thread(target=refresh, daemon=True).start()
+            # Skip this tick if the previous fetch is still in flight
+            if not self.refresh_future or self.refresh_future.done():
+                self.refresh_future = self.app.aio.submit(
+                    self.app.aio.wrap(self.app.files).get_logs(50),
+                    callback=lambda logs, error: self.frame.after(0, refresh, logs, error)
+                )
             self.refresh_job = self.frame.after(5000, self.start_auto_refresh)
     
     def stop_auto_refresh(self):
@@ -318,38 +517,8 @@ class DashboardTab:
         self.auto_performance = True
         
         if self.auto_performance:
-            def update():
-                try:
-                    # CPU
-                    cpu_out, _ = self.app.ssh.execute("top -bn1 | grep 'Cpu(s)' | awk '{print $2}'")
-                    cpu = cpu_out.strip().replace('%us,', '').replace('us,', '')
-                    if cpu:
-                        self.cpu_label.config(text=f"{cpu}%")
-                    
-                    # RAM
-                    ram_out, _ = self.app.ssh.execute("free -h | grep Mem | awk '{print $3\"/\"$2}'")
-                    ram = ram_out.strip()
-                    if ram:
-                        self.ram_label.config(text=ram)
-                    
-                    # Players
-                    player_out, _ = self.app.ssh.execute(
-                        "cd /root/minecraft && tail -100 logs/latest.log 2>/dev/null | "
-                        "grep -c 'joined the game' || echo '0'"
-                    )
-                    players = player_out.strip()
-                    if players:
-                        self.players_label.config(text=players)
-                    
-                    # Uptime
-                    uptime_out, _ = self.app.ssh.execute("uptime -p")
-                    uptime = uptime_out.strip().replace('up ', '')
-                    if uptime:
-                        self.uptime_label.config(text=uptime[:20])
-                except:
-                    pass
-            
-            threading.Thread(target=update, daemon=True).start()
+            if not self.performance_future or self.performance_future.done():
+                self.performance_future = self.app.aio.submit(self.app.aio.wrap(self).update_stats())
             self.performance_job = self.frame.after(10000, self.start_auto_performance)
     
     def stop_auto_performance(self):
@@ -366,43 +535,119 @@ class DashboardTab:
         
         def get_stats():
             try:
-                # CPU
-                cpu_out, _ = self.app.ssh.execute("top -bn1 | grep 'Cpu(s)' | awk '{print $2}'")
-                cpu = cpu_out.strip().replace('%us,', '').replace('us,', '')
-                if cpu:
-                    self.cpu_label.config(text=f"{cpu}%")
-                
-                # RAM
-                ram_out, _ = self.app.ssh.execute("free -h | grep Mem | awk '{print $3\"/\"$2}'")
-                ram = ram_out.strip()
-                if ram:
-                    self.ram_label.config(text=ram)
-                
-                # Players
-                player_out, _ = self.app.ssh.execute(
-                    "cd /root/minecraft && tail -100 logs/latest.log 2>/dev/null | "
-                    "grep -c 'joined the game' || echo '0'"
-                )
-                players = player_out.strip()
-                if players:
-                    self.players_label.config(text=players)
-                
-                # Uptime
-                uptime_out, _ = self.app.ssh.execute("uptime -p")
-                uptime = uptime_out.strip().replace('up ', '')
-                if uptime:
-                    self.uptime_label.config(text=uptime[:20])
-                
+                self.update_stats()
                 self.app.log("✅ Performance stats updated")
             except Exception as e:
                 self.app.log(f"❌ Error getting stats: {e}")
         
         threading.Thread(target=get_stats, daemon=True).start()
     
+    def update_stats(self):
+        """CPU, RAM and uptime of the server JVM from one /proc read, players with a status ping"""
+        if not self.app.server:
+            return
+        status = self.app.server.get_status()
+        process, host = status['process'], status['host']
+        gib = 1024 ** 3
+        
+        if process:
+            # CPU% is over all cores so a busy 4-core box reads 100%, not 400%
+            if process['cpu_percent'] is not None:
+                self.cpu_label.config(text=f"{process['cpu_percent'] / host['cpus']:.1f}%")
+            if process['rss'] and host['mem_total']:
+                self.ram_label.config(text=f"{process['rss'] / gib:.1f}/{host['mem_total'] / gib:.1f}G")
+            uptime = process['uptime']
+        else:
+            if host['cpu_percent'] is not None:
+                self.cpu_label.config(text=f"{host['cpu_percent']:.1f}%")
+            if host['mem_used'] and host['mem_total']:
+                self.ram_label.config(text=f"{host['mem_used'] / gib:.1f}/{host['mem_total'] / gib:.1f}G")
+            uptime = None
+        
+        # Player count comes from a status ping, not from grepping the log
+        if process:
+            try:
+                ping = self.app.server.ping()
+                self.players_label.config(text=f"{ping['online']}/{ping['max']}")
+            except PingError:
+                self.players_label.config(text="Offline")
+        else:
+            self.players_label.config(text="Offline")
+        
+        if process:
+            self.show_gc(self.app.server.gc.poll())
+        
+        if uptime is not None:
+            hours, minutes = int(uptime // 3600), int(uptime % 3600 // 60)
+            self.uptime_label.config(text=f"{hours // 24}d {hours % 24}h {minutes}m" if hours >= 24
+                                     else f"{hours}h {minutes}m")
+        else:
+            self.uptime_label.config(text="Stopped")
+    
+    def show_pregen_progress(self, progress):
+        self.pregen_label.config(text=describe(progress))
+    
+    def show_gc(self, gc):
+        """Pause percentiles for the running JVM, against the previous run when there was one"""
+        if not gc['count']:
+            self.gc_label.config(text="--")
+            self.gc_detail_label.config(text="no GC log yet")
+            return
+        self.gc_label.config(text=f"{gc['p99_ms']:.0f}ms")
+        lines = [f"p50 {gc['p50_ms']:.1f} / max {gc['max_ms']:.0f}ms"]
+        rates = []
+        if gc['alloc_mb_s'] is not None:
+            rates.append(f"alloc {gc['alloc_mb_s']:.0f}")
+        if gc['promo_mb_s'] is not None:
+            rates.append(f"promo {gc['promo_mb_s']:.1f}")
+        if rates:
+            lines.append(' / '.join(rates) + " MB/s")
+        if gc['previous'] and gc['previous']['p99_ms'] is not None:
+            lines.append(f"last run p99 {gc['previous']['p99_ms']:.0f}ms")
+        self.gc_detail_label.config(text='\n'.join(lines))
+    
+    def show_ticks(self, sample):
+        """Latest TPS/MSPT on the stats cards with their recent history"""
+        color = ModernTheme.DARK['success']
+        if sample['tps'] < 15:
+            color = ModernTheme.DARK['error']
+        elif sample['tps'] < 19:
+            color = ModernTheme.DARK['warning']
+        self.tps_label.config(text=f"{sample['tps']:.1f}", fg=color)
+        if sample['mspt'] is not None:
+            self.mspt_label.config(text=f"{sample['mspt']:.1f}")
+        
+        history = self.app.server.ticks.history()[-60:]
+        self.draw_sparkline(self.tps_chart, [p['tps'] for p in history], 20)
+        # 50 ms is the whole budget of a 20 TPS tick
+        mspt = [p['mspt'] for p in history if p['mspt'] is not None]
+        self.draw_sparkline(self.mspt_chart, mspt, max([50] + mspt), mark=50)
+    
+    def draw_sparkline(self, canvas, values, top, mark=None):
+        canvas.delete('all')
+        if len(values) < 2:
+            return
+        width = max(canvas.winfo_width(), 100)
+        height = int(canvas['height'])
+        step = width / (len(values) - 1)
+        
+        def y(value):
+            return height - 2 - (height - 4) * min(value, top) / top
+        
+        if mark is not None:
+            canvas.create_line(0, y(mark), width, y(mark), fill=ModernTheme.DARK['border'], dash=(2, 2))
+        points = []
+        for i, value in enumerate(values):
+            points += [i * step, y(value)]
+        canvas.create_line(*points, fill=ModernTheme.DARK['accent'], width=2)
+    
     def quick_command(self, cmd, label):
         if not self.app.server:
             return
         
+        # Presets only set state, so repeat clicks while one is queued collapse into it
+        preset = cmd is not None
+        
         # Special handlers
         if cmd is None:
             if "Broadcast" in label:
@@ -424,7 +669,7 @@ class DashboardTab:
         
         if cmd:
             self.log(f"⚡ {label}: {cmd}")
-            self.app.server.send_command(cmd)
+            self.app.server.queue_command(cmd, coalesce=preset)
     
     def show_teleport_dialog(self):
         dialog = tk.Toplevel(self.frame)
@@ -472,7 +717,7 @@ class DashboardTab:
             if player and x and y and z:
                 cmd = f"tp {player} {x} {y} {z}"
                 self.log(f"🚀 Teleporting: {cmd}")
-                self.app.server.send_command(cmd)
+                self.app.server.queue_command(cmd)
                 dialog.destroy()
         
         tk.Button(dialog, text="Teleport", command=teleport,
@@ -526,7 +771,7 @@ class DashboardTab:
             if player and item:
                 cmd = f"give {player} {item} {amount}"
                 self.log(f"🎁 Giving item: {cmd}")
-                self.app.server.send_command(cmd)
+                self.app.server.queue_command(cmd)
                 dialog.destroy()
         
         tk.Button(dialog, text="Give Item", command=give,
@@ -574,7 +819,7 @@ class DashboardTab:
             if player and levels:
                 cmd = f"xp add {player} {levels} levels"
                 self.log(f"💎 Giving XP: {cmd}")
-                self.app.server.send_command(cmd)
+                self.app.server.queue_command(cmd)
                 dialog.destroy()
         
         tk.Button(dialog, text="Give XP", command=give_xp,
@@ -612,7 +857,7 @@ class DashboardTab:
             if size:
                 cmd = f"worldborder set {size}"
                 self.log(f"🌍 Setting border: {cmd}")
-                self.app.server.send_command(cmd)
+                self.app.server.queue_command(cmd)
                 dialog.destroy()
         
         tk.Button(dialog, text="Set Border", command=set_border,
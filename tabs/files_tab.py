@@ -1,13 +1,16 @@
 """Files and backup management tab"""
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
+import os
 import threading
 from ui_components import ModernTheme, ModernButton, Card
+from transfer_engine import format_progress
 
 class FilesTab:
     def __init__(self, parent, app):
         self.app = app
         self.frame = tk.Frame(parent, bg=ModernTheme.DARK['bg'])
+        self.current_view = 'files'
         self.setup_ui()
     
     def setup_ui(self):
@@ -23,6 +26,7 @@ class FilesTab:
             ("🗑️ Clear Logs", self.clear_logs, 'warning'),
             ("💾 Backup World", self.backup_world, 'success'),
             ("📋 List Backups", self.list_backups, 'primary'),
+            ("⬇️ Download Selected", self.download_selected, 'success'),
         ]
         
         for text, cmd, style in buttons:
@@ -63,6 +67,7 @@ class FilesTab:
         def browse():
             try:
                 files = self.app.files.list_directory()
+                self.current_view = 'files'
                 self.tree.delete(*self.tree.get_children())
                 
                 for file in files:
@@ -109,9 +114,19 @@ class FilesTab:
         
         self.app.log("💾 Creating backup...")
         
+        last_step = [-1]
+        
+        def progress(done, total):
+            if not total:
+                return
+            step = min(done * 10 // total, 10)
+            if step != last_step[0]:
+                last_step[0] = step
+                self.app.log(f"💾 Backup {step * 10}% ({done}/{total} entries)")
+        
         def backup():
             try:
-                backup_name = self.app.files.backup_world()
+                backup_name = self.app.files.backup_world(progress=progress)
                 self.app.log(f"✅ Backup created: {backup_name}")
             except Exception as e:
                 self.app.log(f"❌ Error: {e}")
@@ -125,6 +140,7 @@ class FilesTab:
         def list_bkp():
             try:
                 backups = self.app.files.list_backups()
+                self.current_view = 'backups'
                 self.tree.delete(*self.tree.get_children())
                 
                 for backup in backups:
@@ -137,3 +153,51 @@ class FilesTab:
                 self.app.log(f"❌ Error: {e}")
         
         threading.Thread(target=list_bkp, daemon=True).start()
+    
+    def download_selected(self):
+        if not self.app.files:
+            return
+        
+        selected = self.tree.selection()
+        if not selected:
+            messagebox.showwarning("No Selection", "Select a file or backup to download")
+            return
+        
+        name, file_type = self.tree.item(selected[0])['values'][:2]
+        if file_type == 'dir':
+            messagebox.showwarning("Not a File", "Folders can't be downloaded, back them up first")
+            return
+        
+        if self.current_view == 'backups':
+            remote_path = f"/root/backups/{name}"
+        else:
+            remote_path = f"{self.app.files.server_dir}/{name}"
+        
+        initial_dir = self.app.prefs.get('backup_path', '') or None
+        local_path = filedialog.asksaveasfilename(title="Save As", initialfile=name,
+                                                  initialdir=initial_dir)
+        if not local_path:
+            return
+        
+        self.app.log(f"⬇️ Downloading {name}...")
+        last_step = [-1]
+        
+        def progress(info):
+            # Log every 10% so big backups show movement without flooding the console
+            step = int(info['percent'] // 10)
+            if step != last_step[0]:
+                last_step[0] = step
+                self.app.log(f"⬇️ {name}: {format_progress(info)}")
+        
+        def download():
+            try:
+                result = self.app.files.download_file(remote_path, local_path, progress=progress)
+                rate = result['rate'] / (1024 * 1024)
+                self.app.log(f"✅ Downloaded {os.path.basename(local_path)} "
+                             f"({result['seconds']:.1f}s, {rate:.1f} MB/s)")
+                if result['resumed_bytes']:
+                    self.app.log(f"↪️ Resumed from {result['resumed_bytes'] / (1024 * 1024):.1f} MB")
+            except Exception as e:
+                self.app.log(f"❌ Error: {e}")
+        
+        threading.Thread(target=download, daemon=True).start()
@@ -154,20 +154,27 @@ class ModsTab:
         if not self.app.mods:
             return
         
-        file_path = filedialog.askopenfilename(
-            title="Select Mod File",
+        file_paths = filedialog.askopenfilenames(
+            title="Select Mod Files",
             filetypes=[("JAR files", "*.jar"), ("All files", "*.*")]
         )
         
-        if not file_path:
+        if not file_paths:
             return
         
-        self.app.log(f"📤 Uploading {file_path}...")
+        if len(file_paths) == 1:
+            self.app.log(f"📤 Uploading {file_paths[0]}...")
+        else:
+            self.app.log(f"📤 Uploading {len(file_paths)} mods...")
+        
+        def progress(done, total, name):
+            if total > 1:
+                self.app.log(f"📤 [{done}/{total}] {name}")
         
         def upload():
             try:
-                self.app.mods.upload_mod(file_path)
-                self.app.log("✅ Mod uploaded")
+                count = self.app.mods.upload_mods(file_paths, progress=progress)
+                self.app.log(f"✅ {count} mod(s) uploaded")
                 self.refresh_mods()
             except Exception as e:
                 self.app.log(f"❌ Error: {e}")
@@ -217,7 +217,7 @@ class PlayersTab:
     
     def send_cmd(self, cmd):
         if self.app.server:
-            self.app.server.send_command(cmd)
+            self.app.server.queue_command(cmd)
             self.app.log(f">>> {cmd}")
     
     def message_player(self):
@@ -229,7 +229,7 @@ class PlayersTab:
         if username:
             message = simpledialog.askstring("Message", f"Message to {username}:")
             if message:
-                self.app.server.send_command(f"msg {username} {message}")
+                self.app.server.queue_command(f"msg {username} {message}")
                 self.app.log(f"💬 Sent message to {username}")
     
     def change_gamemode(self):
@@ -265,7 +265,7 @@ class PlayersTab:
                          padx=30, pady=10, cursor='hand2', width=15).pack(pady=5)
     
     def set_gamemode(self, username, mode, dialog):
-        self.app.server.send_command(f"gamemode {mode} {username}")
+        self.app.server.queue_command(f"gamemode {mode} {username}")
         self.app.log(f"🎮 Changed {username} to {mode}")
         dialog.destroy()
     
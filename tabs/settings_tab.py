@@ -84,7 +84,7 @@ class SettingsTab:
         
         def load():
             try:
-                output, _ = self.app.ssh.execute("cat /root/minecraft/server.properties")
+                output, _ = self.app.ssh.execute("cat /root/minecraft/server.properties", retry=True)
                 self.props_text.delete(1.0, tk.END)
                 self.props_text.insert(1.0, output)
                 self.app.log("✅ Properties loaded")
@@ -101,10 +101,9 @@ class SettingsTab:
         
         def save():
             try:
-                sftp = self.app.ssh.get_sftp()
-                with sftp.open('/root/minecraft/server.properties', 'w') as f:
-                    f.write(content)
-                sftp.close()
+                with self.app.ssh.sftp_session() as sftp:
+                    with sftp.open('/root/minecraft/server.properties', 'w') as f:
+                        f.write(content)
                 self.app.log("✅ Properties saved")
                 messagebox.showinfo("Success", "Restart server to apply changes")
             except Exception as e:
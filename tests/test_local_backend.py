@@ -0,0 +1,16 @@
+import pytest
+from local_backend import LocalBackend
+
+def connected():
+    ssh = LocalBackend()
+    ssh.connect()
+    return ssh
+
+def test_timeout_is_idle_time():
+    """A command that keeps printing may run past its timeout"""
+    output, _ = connected().execute("for i in 1 2 3 4 5; do echo $i; sleep 0.3; done", timeout=1)
+    assert output.split() == ['1', '2', '3', '4', '5']
+
+def test_silent_command_times_out():
+    with pytest.raises(TimeoutError):
+        connected().execute("sleep 3", timeout=1)
@@ -0,0 +1,29 @@
+import os
+from local_backend import LocalBackend
+from process_backends import SystemdBackend
+
+def test_systemd_run_argv(tmp_path, monkeypatch):
+    """systemd-run gets the pid wrapper with every $ doubled for ExecStart"""
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    argv_file = tmp_path / 'argv'
+    (bin_dir / 'systemd-run').write_text(f"#!/bin/sh\nprintf '%s\\0' \"$@\" > {argv_file}\n")
+    (bin_dir / 'systemctl').write_text("#!/bin/sh\nexit 0\n")
+    for tool in bin_dir.iterdir():
+        tool.chmod(0o755)
+    monkeypatch.setenv('PATH', f"{bin_dir}:{os.environ['PATH']}")
+    
+    mc_dir = tmp_path / 'mc'
+    mc_dir.mkdir()
+    ssh = LocalBackend()
+    ssh.connect()
+    backend = SystemdBackend(ssh, str(mc_dir), process_pattern='^no-such-process')
+    
+    assert backend.start("java -jar server.jar nogui") == (0, '')
+    user = [] if os.geteuid() == 0 else ['--user']
+    assert argv_file.read_bytes().decode().split('\0')[:-1] == user + [
+        '--quiet', '--collect', '--unit=minecraft', '-p', f'WorkingDirectory={mc_dir}',
+        'bash', '-c',
+        f'echo $$$$ > {mc_dir}/.msm/server.pid && exec java -jar server.jar nogui '
+        f'< <(tail -n 0 -F {mc_dir}/.msm/console.in)',
+    ]
@@ -0,0 +1,38 @@
+from process_backends import SessionError
+from tick_sampler import TickSampler
+
+class FakeServer:
+    """RCON configured but not answering, so send_commands falls back to the console"""
+    def __init__(self, error=None):
+        self.error = error
+        self.sent = []
+    
+    def get_rcon(self):
+        return object()
+    
+    def get_status(self):
+        return {'process': {'type': 'Paper'}}
+    
+    def send_commands(self, commands):
+        if self.error:
+            raise self.error
+        self.sent.append(commands)
+        return [None] * len(commands)
+
+def test_failed_rcon_backs_off_like_the_console():
+    server = FakeServer()
+    ticks = TickSampler(server, interval=5, console_interval=60, max_backoff=1800)
+    periods = []
+    for _ in range(7):
+        assert ticks.sample() is None
+        periods.append(ticks.period())
+    assert periods == [120, 240, 480, 960, 1800, 1800, 1800]
+    # Only the first strategy is tried each round, the rest would be more console noise
+    assert server.sent == [['tps', 'mspt']] * 7
+    assert not ticks.unsupported
+
+def test_server_down_backs_off():
+    ticks = TickSampler(FakeServer(SessionError("No screen session to send to")), interval=5)
+    assert ticks.sample() is None
+    assert ticks.sample() is None
+    assert ticks.period() == 20
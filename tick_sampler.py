@@ -0,0 +1,243 @@
+"""TPS/MSPT sampling from the server's own tick reports"""
+import re
+import threading
+import time
+from collections import deque
+from process_backends import SessionError
+
+_COLOR = re.compile(r'§.')
+
+def parse_paper(text):
+    """Output of Paper/Purpur's tps and mspt commands"""
+    tps = re.search(r'TPS from last 1m, 5m, 15m:\s*\*?([\d.]+),\s*\*?([\d.]+),\s*\*?([\d.]+)', text)
+    if not tps:
+        return None
+    sample = {'tps': float(tps.group(1)), 'tps_5m': float(tps.group(2)),
+              'tps_15m': float(tps.group(3)), 'mspt': None, 'mspt_max': None}
+    # avg/min/max for the last 5s, 10s and 1m, the first triple is the freshest
+    mspt = re.search(r'from last 5s[^:]*:\s*[^\d]*([\d.]+)/([\d.]+)/([\d.]+)', text)
+    if mspt:
+        sample['mspt'] = float(mspt.group(1))
+        sample['mspt_max'] = float(mspt.group(3))
+    return sample
+
+def parse_vanilla(text):
+    """Output of /tick query on vanilla 1.20.3+ (and Fabric on top of it)"""
+    average = re.search(r'Average time per tick:\s*([\d.]+)\s*ms', text)
+    if not average:
+        return None
+    rate = re.search(r'Target tick rate:\s*([\d.]+)', text)
+    p95 = re.search(r'P95:\s*([\d.]+)\s*ms', text)
+    mspt = float(average.group(1))
+    target = float(rate.group(1)) if rate else 20.0
+    return {
+        # A server only runs slower than its target rate once ticks overrun
+        'tps': min(target, 1000 / mspt) if mspt > 0 else target,
+        'mspt': mspt,
+        'mspt_max': float(p95.group(1)) if p95 else None,
+    }
+
+def parse_forge(text):
+    """Overall line of forge tps / neoforge tps, old and new wording"""
+    old = re.search(r'Overall\s*:\s*Mean tick time:\s*([\d.]+)\s*ms\.?\s*Mean TPS:\s*([\d.]+)', text)
+    if old:
+        return {'tps': float(old.group(2)), 'mspt': float(old.group(1)), 'mspt_max': None}
+    new = re.search(r'Overall\s*:\s*([\d.]+)\s*TPS\s*\(([\d.]+)\s*ms/tick\)', text)
+    if new:
+        return {'tps': float(new.group(1)), 'mspt': float(new.group(2)), 'mspt_max': None}
+    return None
+
+# name, console commands, parser
+STRATEGIES = [
+    ('paper', ['tps', 'mspt'], parse_paper),
+    ('vanilla', ['tick query'], parse_vanilla),
+    ('forge', ['forge tps'], parse_forge),
+    ('neoforge', ['neoforge tps'], parse_forge),
+]
+
+# Which strategy fits a detected server type, the only one tried through the console
+_PREFERRED = {'Paper': 'paper', 'Purpur': 'paper', 'Forge': 'forge', 'NeoForge': 'neoforge',
+              'Fabric': 'vanilla', 'Quilt': 'vanilla', 'Vanilla': 'vanilla'}
+
+class TickSampler:
+    """Polls tick performance into a ring buffer plus per-minute averages
+    
+    Every interval seconds over RCON. Without RCON each sample is typed
+    into the console and shows up in the log, so it runs every
+    console_interval seconds instead. Rounds that get no answer back off
+    exponentially up to max_backoff.
+    """
+    def __init__(self, server, interval=5, console_interval=60, max_backoff=1800, raw_size=720,
+                 minute_size=1440):
+        self.server = server
+        self.interval = interval
+        self.console_interval = console_interval
+        self.max_backoff = max_backoff
+        # 720 samples at 5s is the last hour, 1440 minutes the last day
+        self.raw = deque(maxlen=raw_size)
+        self.minutes = deque(maxlen=minute_size)
+        self.strategy = None
+        self.unsupported = False
+        self.listeners = []
+        self.event_listeners = []
+        self._bucket = []
+        self._misses = 0
+        self._rcon = True
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+    
+    def add_listener(self, callback):
+        """callback(sample) is called from the sampler thread"""
+        self.listeners.append(callback)
+    
+    def add_event_listener(self, callback):
+        """callback(event, info) for 'unsupported' when no strategy gets an answer, and 'supported' after"""
+        self.event_listeners.append(callback)
+    
+    def _emit(self, event, info):
+        for callback in list(self.event_listeners):
+            try:
+                callback(event, info)
+            except Exception:
+                pass
+    
+    def period(self):
+        """Seconds until the next sample, longer through the console and after misses"""
+        base = self.interval if self._rcon else self.console_interval
+        return min(base * 2 ** self._misses, max(self.max_backoff, base))
+    
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stopped.set()
+    
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self.sample()
+            except Exception:
+                pass
+            self._stopped.wait(self.period())
+    
+    def _collect(self, commands):
+        """Console output for commands, pipelined over RCON or read back from the log"""
+        if self._rcon:
+            outputs = self.server.send_commands(commands)
+            if None in outputs:
+                # RCON failed and the commands went through the console instead,
+                # so this round is paced like one
+                self._rcon = False
+                return None
+            return '\n'.join(outputs)
+        
+        position = self.server.logs.position()
+        self.server.send_commands(commands)
+        time.sleep(0.5)
+        output, _ = self.server.ssh.execute(
+            f"tail -c +{position['size'] + 1} {self.server.mc_dir}/logs/latest.log 2>/dev/null"
+        )
+        return output
+    
+    def _candidates(self):
+        if self.strategy:
+            return [s for s in STRATEGIES if s[0] == self.strategy]
+        process = self.server.get_status()['process']
+        if not process:
+            # Nothing to ask while the server is down
+            return []
+        preferred = _PREFERRED.get(process['type'], 'vanilla')
+        if not self._rcon:
+            # Every wrong guess is an "Unknown command" in the console and the log
+            return [s for s in STRATEGIES if s[0] == preferred]
+        return sorted(STRATEGIES, key=lambda s: s[0] != preferred)
+    
+    def sample(self):
+        """Take one sample now, returns it or None when the server did not answer"""
+        self._rcon = self.server.get_rcon() is not None
+        candidates = self._candidates()
+        if not candidates:
+            return None
+        sample = None
+        answered = True
+        for name, commands, parse in candidates:
+            try:
+                output = self._collect(commands)
+            except SessionError:
+                # Gone between the status check and the send
+                output = None
+            if output is None:
+                answered = False
+                break
+            sample = parse(_COLOR.sub('', output))
+            if sample:
+                self.strategy = name
+                break
+        
+        if not sample:
+            # Backs off either way, but only answers that did not parse say anything about the strategy.
+            # A few of those in a row (server restarted as something else) means detect again
+            self._misses += 1
+            if answered and self._misses >= 3:
+                self.strategy = None
+                if not self.unsupported:
+                    self.unsupported = True
+                    self._emit('unsupported', {'rcon': self._rcon, 'retry': self.period()})
+            return None
+        self._misses = 0
+        if self.unsupported:
+            self.unsupported = False
+            self._emit('supported', {'source': self.strategy})
+        
+        sample['time'] = time.time()
+        sample['source'] = self.strategy
+        with self._lock:
+            self.raw.append(sample)
+            self._add_to_minute(sample)
+        for callback in list(self.listeners):
+            try:
+                callback(sample)
+            except Exception:
+                pass
+        return sample
+    
+    def _add_to_minute(self, sample):
+        minute = int(sample['time'] // 60) * 60
+        if self._bucket and self._bucket[0]['time'] // 60 * 60 != minute:
+            self.minutes.append(self._summarize(self._bucket))
+            self._bucket = []
+        self._bucket.append(sample)
+    
+    def _summarize(self, samples):
+        tps = [s['tps'] for s in samples]
+        mspt = [s['mspt'] for s in samples if s['mspt'] is not None]
+        return {
+            'time': int(samples[0]['time'] // 60) * 60,
+            'tps': sum(tps) / len(tps),
+            'tps_min': min(tps),
+            'mspt': sum(mspt) / len(mspt) if mspt else None,
+            'mspt_max': max(mspt) if mspt else None,
+            'samples': len(samples),
+        }
+    
+    def history(self, resolution='raw', since=None):
+        """Samples ('raw') or per-minute summaries ('minute'), oldest first"""
+        with self._lock:
+            if resolution == 'minute':
+                points = list(self.minutes)
+                if self._bucket:
+                    points.append(self._summarize(self._bucket))
+            else:
+                points = list(self.raw)
+        if since is not None:
+            points = [p for p in points if p['time'] >= since]
+        return points
+    
+    def latest(self):
+        with self._lock:
+            return self.raw[-1] if self.raw else None
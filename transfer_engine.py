@@ -0,0 +1,279 @@
+"""Parallel, resumable SFTP transfers with progress reporting"""
+import hashlib
+import json
+import os
+import shlex
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+class TransferProgress:
+    """Tracks bytes moved and reports rate/ETA to a callback at a bounded rate"""
+    def __init__(self, total, already=0, callback=None, interval=0.5):
+        self.total = total
+        self.done = already
+        self.resumed = already
+        self.callback = callback
+        self.interval = interval
+        self.started = time.monotonic()
+        self._last_report = 0
+        self._lock = threading.Lock()
+    
+    def add(self, count):
+        with self._lock:
+            self.done += count
+            now = time.monotonic()
+            if now - self._last_report < self.interval:
+                return
+            self._last_report = now
+        self.report()
+    
+    def snapshot(self):
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        rate = (self.done - self.resumed) / elapsed
+        remaining = self.total - self.done
+        return {
+            'bytes': self.done,
+            'total': self.total,
+            'percent': 100.0 * self.done / self.total if self.total else 100.0,
+            'rate': rate,
+            'eta': remaining / rate if rate > 0 else None,
+            'elapsed': elapsed,
+        }
+    
+    def report(self):
+        if self.callback:
+            try:
+                self.callback(self.snapshot())
+            except Exception:
+                pass
+
+class TransferEngine:
+    BLOCK_SIZE = 32768
+    
+    def __init__(self, ssh_manager, workers=4, range_size=8 * 1024 * 1024, retries=3,
+                 state_dir=None):
+        self.ssh = ssh_manager
+        self.workers = workers
+        self.range_size = range_size
+        self.retries = retries
+        if state_dir is None:
+            state_dir = Path.home() / '.minecraft_server_manager' / 'transfers'
+        self.state_dir = Path(state_dir)
+    
+    def download(self, remote_path, local_path, progress=None, verify=True):
+        """Fetch a remote file in parallel ranges, resuming a previous partial download"""
+        with self.ssh.sftp_session() as sftp:
+            attrs = sftp.stat(remote_path)
+            if attrs.st_size <= self.range_size:
+                tracker = TransferProgress(attrs.st_size, callback=progress)
+                sftp.get(remote_path, local_path,
+                         callback=lambda done, total: tracker.add(done - tracker.done))
+                tracker.report()
+                return self._result(tracker, None)
+        
+        part_path = f"{local_path}.part"
+        state = self._load_state('download', remote_path, local_path, attrs)
+        if not os.path.exists(part_path):
+            state['done'] = []
+        with open(part_path, 'ab') as f:
+            f.truncate(attrs.st_size)
+        
+        def fetch(sftp, offset, length, tracker):
+            blocks = [
+                (pos, min(self.BLOCK_SIZE, offset + length - pos))
+                for pos in range(offset, offset + length, self.BLOCK_SIZE)
+            ]
+            with sftp.open(remote_path, 'rb') as remote, open(part_path, 'r+b') as local:
+                local.seek(offset)
+                # readv keeps many read requests in flight on the one session
+                for data in remote.readv(blocks):
+                    local.write(data)
+                    tracker.add(len(data))
+        
+        tracker = self._transfer(state, attrs.st_size, fetch, progress)
+        
+        verified = None
+        if verify:
+            verified = self._verify(remote_path, part_path)
+            if verified is False:
+                self._clear_state(state)
+                os.remove(part_path)
+                raise Exception(f"Checksum mismatch downloading {remote_path}")
+        
+        os.replace(part_path, local_path)
+        self._clear_state(state)
+        return self._result(tracker, verified)
+    
+    def upload(self, local_path, remote_path, progress=None, verify=True):
+        """Send a local file in parallel ranges, resuming a previous partial upload"""
+        attrs = os.stat(local_path)
+        if attrs.st_size <= self.range_size:
+            tracker = TransferProgress(attrs.st_size, callback=progress)
+            with self.ssh.sftp_session() as sftp:
+                sftp.put(local_path, remote_path,
+                         callback=lambda done, total: tracker.add(done - tracker.done))
+            tracker.report()
+            return self._result(tracker, None)
+        
+        part_path = f"{remote_path}.part"
+        state = self._load_state('upload', remote_path, local_path, attrs)
+        with self.ssh.sftp_session() as sftp:
+            try:
+                existing = sftp.stat(part_path).st_size
+            except IOError:
+                existing = None
+            if existing != attrs.st_size:
+                state['done'] = []
+                with sftp.open(part_path, 'wb') as f:
+                    f.truncate(attrs.st_size)
+        
+        def send(sftp, offset, length, tracker):
+            with open(local_path, 'rb') as local, sftp.open(part_path, 'r+b') as remote:
+                remote.set_pipelined(True)
+                local.seek(offset)
+                remote.seek(offset)
+                remaining = length
+                while remaining > 0:
+                    data = local.read(min(self.BLOCK_SIZE, remaining))
+                    if not data:
+                        break
+                    remote.write(data)
+                    remaining -= len(data)
+                    tracker.add(len(data))
+        
+        tracker = self._transfer(state, attrs.st_size, send, progress)
+        
+        verified = None
+        if verify:
+            verified = self._verify(part_path, local_path)
+            if verified is False:
+                self._clear_state(state)
+                self.ssh.execute(f"rm -f {shlex.quote(part_path)}")
+                raise Exception(f"Checksum mismatch uploading {local_path}")
+        
+        self.ssh.execute(f"mv -f {shlex.quote(part_path)} {shlex.quote(remote_path)}")
+        self._clear_state(state)
+        return self._result(tracker, verified)
+    
+    def _transfer(self, state, size, work, progress):
+        """Run work over every range not yet done, reconnecting between attempts"""
+        ranges = [
+            (offset, min(self.range_size, size - offset))
+            for offset in range(0, size, self.range_size)
+        ]
+        done = set(state['done'])
+        already = sum(length for offset, length in ranges if offset in done)
+        tracker = TransferProgress(size, already, progress)
+        
+        for attempt in range(self.retries + 1):
+            pending = [r for r in ranges if r[0] not in set(state['done'])]
+            try:
+                self._run_ranges(pending, work, tracker, state)
+                break
+            except self.ssh.LINK_ERRORS:
+                if attempt == self.retries or self.ssh.is_connected():
+                    raise
+                self.ssh.reconnect()
+        
+        tracker.report()
+        return tracker
+    
+    def _run_ranges(self, pending, work, tracker, state):
+        queue = deque(pending)
+        lock = threading.Lock()
+        errors = []
+        
+        def worker():
+            try:
+                with self.ssh.sftp_session() as sftp:
+                    while True:
+                        with lock:
+                            if not queue or errors:
+                                return
+                            offset, length = queue.popleft()
+                        work(sftp, offset, length, tracker)
+                        with lock:
+                            state['done'].append(offset)
+                            self._save_state(state)
+            except Exception as e:
+                with lock:
+                    errors.append(e)
+        
+        count = min(self.workers, self.ssh.sftp_pool.size, len(pending))
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        if errors:
+            raise errors[0]
+    
+    def _verify(self, remote_path, local_path):
+        """Compare sha256 on both ends, None when the remote can't hash"""
+        timeout = 60 + os.path.getsize(local_path) // (50 * 1024 * 1024)
+        output, _ = self.ssh.execute(f"sha256sum {shlex.quote(remote_path)} 2>/dev/null", timeout=timeout)
+        if not output.strip():
+            return None
+        
+        digest = hashlib.sha256()
+        with open(local_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return output.split()[0] == digest.hexdigest()
+    
+    def _result(self, tracker, verified):
+        snapshot = tracker.snapshot()
+        return {
+            'bytes': snapshot['bytes'],
+            'resumed_bytes': tracker.resumed,
+            'seconds': snapshot['elapsed'],
+            'rate': snapshot['rate'],
+            'verified': verified,
+        }
+    
+    def _state_file(self, direction, remote_path, local_path):
+        key = hashlib.sha1(f"{direction}|{remote_path}|{os.path.abspath(local_path)}".encode()).hexdigest()
+        return self.state_dir / f"{key}.json"
+    
+    def _load_state(self, direction, remote_path, local_path, attrs):
+        path = self._state_file(direction, remote_path, local_path)
+        fresh = {
+            'path': str(path),
+            'size': attrs.st_size,
+            'mtime': int(attrs.st_mtime or 0),
+            'range_size': self.range_size,
+            'done': [],
+        }
+        try:
+            with open(path, 'r') as f:
+                saved = json.load(f)
+            # Only resume if the source and the range layout are unchanged
+            if all(saved.get(k) == fresh[k] for k in ('size', 'mtime', 'range_size')):
+                fresh['done'] = saved.get('done', [])
+        except Exception:
+            pass
+        return fresh
+    
+    def _save_state(self, state):
+        try:
+            self.state_dir.mkdir(parents=True, exist_ok=True)
+            with open(state['path'], 'w') as f:
+                json.dump(state, f)
+        except Exception:
+            pass
+    
+    def _clear_state(self, state):
+        try:
+            os.remove(state['path'])
+        except OSError:
+            pass
+
+def format_progress(info):
+    """Human readable progress line for the console"""
+    rate = info['rate'] / (1024 * 1024)
+    eta = info['eta']
+    eta_text = f"{int(eta // 60)}m{int(eta % 60):02d}s" if eta is not None else "--"
+    return f"{info['percent']:.0f}% of {info['total'] / (1024 * 1024):.1f} MB at {rate:.1f} MB/s, ETA {eta_text}"
@@ -0,0 +1,184 @@
+"""Notice when the server JVM dies, keep the evidence and bring it back up"""
+import os
+import threading
+import time
+from collections import deque
+from log_watcher import classify
+
+class Watchdog:
+    """Follows the server process over one long-lived remote command instead of polling
+    
+    A crash is a java exit that ServerManager did not ask for and that the
+    log does not show as a normal shutdown. Crashes are restarted with
+    exponential backoff until max_crashes happen inside window seconds.
+    """
+    def __init__(self, server, archive_dir=None, auto_restart=True, max_crashes=4, window=900,
+                 backoff=15, max_backoff=300):
+        self.server = server
+        # Local folder crash reports and log tails are copied into
+        self.archive_dir = archive_dir
+        self.auto_restart = auto_restart
+        self.max_crashes = max_crashes
+        self.window = window
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.listeners = []
+        self.crashes = deque()
+        self.recoveries = deque(maxlen=50)
+        self.gave_up = False
+        self._stopped = threading.Event()
+        self._thread = None
+    
+    def add_listener(self, callback):
+        """callback(event, info) from the watchdog thread: up, exited, crash, restarting, recovered, gave_up"""
+        self.listeners.append(callback)
+    
+    def _emit(self, event, info):
+        for callback in list(self.listeners):
+            try:
+                callback(event, info)
+            except Exception:
+                pass
+    
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stopped.set()
+    
+    def _watch_script(self):
+        # Blocks remotely: "up PID" when java appears, "down PID" when it exits. The
+        # heartbeats in between make the loop die of SIGPIPE once nobody is reading
+        return '\n'.join([
+            "while :; do",
+            f"  {self.server.backend.pid_script()}",
+            "  if [ -n \"$pid\" ]; then",
+            "    echo \"up $pid\"",
+            "    while [ -d /proc/$pid ]; do",
+            "      timeout 30 tail --pid=$pid -f /dev/null",
+            "      echo \"alive $pid\"",
+            "    done",
+            "    echo \"down $pid\"",
+            "  else",
+            "    echo idle",
+            "    sleep 2",
+            "  fi",
+            "done",
+        ])
+    
+    def _run(self):
+        while not self._stopped.is_set():
+            stream = None
+            try:
+                # Unpooled so the watch never holds one of the command slots
+                stream = self.server.ssh.execute_stream(self._watch_script(), pooled=False)
+                for name, line in stream:
+                    if self._stopped.is_set():
+                        break
+                    kind, _, pid = line.partition(' ')
+                    if name != 'stdout' or not pid:
+                        continue
+                    if kind == 'up':
+                        self._on_up(pid)
+                    elif kind == 'down':
+                        self._on_down(pid)
+            except Exception:
+                # Link dropped or the backend went away, pick the watch up again shortly
+                pass
+            finally:
+                if stream:
+                    stream.close()
+            self._stopped.wait(5)
+    
+    def _on_up(self, pid):
+        if self.gave_up:
+            # Someone started it by hand after a crash loop, give it a clean slate
+            self.gave_up = False
+            self.crashes.clear()
+        self._emit('up', {'pid': pid})
+    
+    def _on_down(self, pid):
+        detected = time.monotonic()
+        if pid in self.server.expected_exits:
+            self.server.expected_exits.discard(pid)
+            self._emit('exited', {'pid': pid, 'expected': True})
+            return
+        
+        evidence = self.collect(pid)
+        if evidence['clean']:
+            # stop typed into the console or a plugin shutting down, not a crash
+            self._emit('exited', {'pid': pid, 'expected': False})
+            return
+        
+        now = time.time()
+        self.crashes.append(now)
+        while self.crashes and self.crashes[0] < now - self.window:
+            self.crashes.popleft()
+        self._emit('crash', dict(evidence, pid=pid, count=len(self.crashes)))
+        
+        if not self.auto_restart:
+            return
+        if len(self.crashes) > self.max_crashes:
+            self.gave_up = True
+            self._emit('gave_up', {'crashes': len(self.crashes), 'window': self.window})
+            return
+        
+        delay = min(self.max_backoff, self.backoff * 2 ** (len(self.crashes) - 1))
+        self._emit('restarting', {'attempt': len(self.crashes), 'delay': delay})
+        if self._stopped.wait(delay) or self.server.get_status()['running']:
+            # Watchdog stopped, or someone already started it again meanwhile
+            return
+        
+        status = self.server.start(on_event=None)
+        if status.get('ready'):
+            recovery = time.monotonic() - detected
+            self.recoveries.append(recovery)
+            self._emit('recovered', {'seconds': recovery, 'mttr': self.mttr()})
+        # A failed start shows up on the watch as another down and goes round again
+    
+    def collect(self, pid):
+        """Newest crash report, any JVM fatal error log and the log tail, copied locally when archive_dir is set"""
+        mc_dir = self.server.mc_dir
+        output, _ = self.server.ssh.execute(
+            f"cd {mc_dir} && "
+            # Only reports written in the last 10 minutes belong to this exit
+            "for f in $(ls -t crash-reports/*.txt hs_err_pid*.log 2>/dev/null | head -n 2); do "
+            "[ $(( $(date +%s) - $(stat -c %Y \"$f\") )) -lt 600 ] && echo \"report $f\"; done; "
+            "echo '---'; tail -n 200 logs/latest.log 2>/dev/null"
+        )
+        head, _, tail = output.partition('---\n')
+        reports = [line[7:] for line in head.split('\n') if line.startswith('report ')]
+        events = {classify(line)[0] for line in tail.split('\n')}
+        evidence = {
+            'reports': reports,
+            'log_tail': tail,
+            # A shutdown that got as far as saving, with nothing crash-like, was deliberate
+            'clean': not reports and 'crash' not in events and 'stopping' in events,
+            'saved_to': None,
+        }
+        
+        if self.archive_dir and not evidence['clean']:
+            try:
+                evidence['saved_to'] = self._archive(pid, reports, tail)
+            except Exception:
+                pass
+        return evidence
+    
+    def _archive(self, pid, reports, tail):
+        folder = os.path.join(str(self.archive_dir), time.strftime('%Y-%m-%d_%H-%M-%S') + f'_{pid}')
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, 'latest.log'), 'w', encoding='utf-8') as f:
+            f.write(tail)
+        if reports:
+            with self.server.ssh.sftp_session() as sftp:
+                for report in reports:
+                    sftp.get(f"{self.server.mc_dir}/{report}", os.path.join(folder, os.path.basename(report)))
+        return folder
+    
+    def mttr(self):
+        """Mean seconds from detecting a crash to the server being ready again"""
+        return sum(self.recoveries) / len(self.recoveries) if self.recoveries else None